@@ -5,6 +5,10 @@ from .graph.memory_graph import MemoryGraph
 from .state import AgentState, MemoryState
 from ..models import BaseModel
 from ..browser import Browser
+from ..browser.screenshot import ScreenshotOptions
+from .budget import SessionBudget
+from ..cache.screenshots import ScreenshotStore
+from ..tracing import export_trace
 from typing import AsyncGenerator, Optional, Dict, Any
 from colorama import Fore, Style
 from uuid import uuid4
@@ -22,6 +26,12 @@ class Agent(BaseAgent):
         model (BaseModel): The model instance to use for the agent
         max_iterations (int): The maximum number of iterations to run the agent for
         scraper_response_json_format (Optional[Dict[str, Any]]): The JSON format to use for the scraper response
+        page_state_token_budget (Optional[int]): Approximate token limit of the page state sent to the model at each step
+        screenshot_options (Optional[ScreenshotOptions]): Format, size and deduplication of the step screenshots
+        screenshot_store (Optional[ScreenshotStore]): Where the step screenshots are kept, None sends them inline in the stream
+        budget (Optional[SessionBudget]): Token, time and model call limits, past which the agent stops with what it has
+        history_steps (int): Last steps sent to the model verbatim, older ones are summarized
+        history_token_budget (Optional[int]): Approximate token limit of the action history in the prompt, None sends every step
     """
 
     def __init__(
@@ -30,11 +40,23 @@ class Agent(BaseAgent):
             model: BaseModel, 
             max_iterations: int = 100, 
             scraper_response_json_format: Optional[Dict[str, Any]] = None,
+            page_state_token_budget: Optional[int] = None,
+            screenshot_options: Optional[ScreenshotOptions] = None,
+            screenshot_store: Optional[ScreenshotStore] = None,
+            budget: Optional[SessionBudget] = None,
+            history_steps: int = 5,
+            history_token_budget: Optional[int] = 2000,
         ) -> None:
         self._executor = AgentExecutor(
             model = model,
             browser = browser,
             scraper_response_json_format = scraper_response_json_format,
+            page_state_token_budget = page_state_token_budget,
+            screenshot_options = screenshot_options,
+            screenshot_store = screenshot_store,
+            budget = budget,
+            history_steps = history_steps,
+            history_token_budget = history_token_budget,
             session = str(uuid4())
         )
         self.max_iterations = max_iterations
@@ -46,7 +68,8 @@ class Agent(BaseAgent):
             verbose: bool = False, 
             wait_between_actions: int = 0,
             memorize: bool = False,
-            screenshot_each_step: bool = True
+            screenshot_each_step: bool = True,
+            timing_events: bool = False
         ) -> AsyncGenerator[str | dict | list, None]:
         """
         The arun as Async Run method is the driver method to run the agent to do the task.
@@ -57,6 +80,7 @@ class Agent(BaseAgent):
             verbose (bool): Whether to print verbose output
             wait_between_actions (int): Wait between actions in seconds (default: 0)
             memorize (bool): Whether to memorize the steps being taken
+            timing_events (bool): Whether to stream a `timing` event for every latency span
 
         Returns:
             AsyncGenerator[str | dict | list, None]: The final output of the agent
@@ -81,17 +105,31 @@ class Agent(BaseAgent):
             wait_between_actions = wait_between_actions,
             memorize = memorize,
             screenshot_each_step = screenshot_each_step,
-            screenshot_base64 = None
+            screenshot_base64 = None,
+            screenshot_url = None,
+            screenshot_mime_type = None
         )
 
         prev_iteration = -1
+        tracer = self._executor.tracer
+        budget = self._executor.budget
+        budget.start()
         
         # Stream graph states
         try:
-            async for chunk in graph.astream(
+            async for mode, chunk in graph.astream(
                 initial_state, { 'recursion_limit': self.max_iterations }, 
-                stream_mode = 'updates'
+                stream_mode = ['updates', 'custom']
             ):  
+                # Events written by the nodes while they run, e.g. thought_delta
+                if mode == 'custom':
+                    yield json.dumps(chunk, ensure_ascii=False)
+                    continue
+
+                if timing_events:
+                    for span in tracer.drain():
+                        yield json.dumps({"type": "timing", "data": span.to_event()}, ensure_ascii=False)
+
                 # yield iteration count at every chunk
                 if prev_iteration != self._executor._iterations:
                     yield json.dumps({"type": "iteration", "data": self._executor._iterations}, ensure_ascii=False)
@@ -119,12 +157,20 @@ class Agent(BaseAgent):
                         previous_actions = node_output.get("previous_actions") or []
                         last_tool_response = previous_actions[-1].get("tool_response")
                         screenshot = node_output.get("screenshot_base64")
+                        screenshot_url = node_output.get("screenshot_url")
+                        mime_type = node_output.get("screenshot_mime_type") or "image/png"
                         if last_tool_response:
                             yield json.dumps({"type": "tool_response", "data": last_tool_response}, ensure_ascii=False)
                         if screenshot:
-                            yield json.dumps({"type": "screenshot", "data": screenshot}, ensure_ascii=False)
+                            # Base64 needs no escaping, skip serializing megabytes of it
+                            yield '{"type": "screenshot", "data": "' + screenshot + '", "mime_type": "' + mime_type + '"}'
+                        if screenshot_url:
+                            yield json.dumps({"type": "screenshot_url", "data": screenshot_url, "mime_type": mime_type}, ensure_ascii=False)
 
                     elif node_name == "output_node":
+                        if budget.exhausted:
+                            yield json.dumps({"type": "budget_exhausted", "data": {"reason": budget.exhausted, "usage": budget.usage.to_dict()}}, ensure_ascii=False)
+
                         text_output = node_output.get("text_output", "")
                         json_output = node_output.get("json_output", "")
                         result_output = node_output.get("result_output", "")
@@ -138,6 +184,15 @@ class Agent(BaseAgent):
                             yield json.dumps({"type": "result_output", "data": result_output}, ensure_ascii=False)
                         if error_output:
                             yield json.dumps({"type": "error_output", "data": error_output}, ensure_ascii=False)
+
+                        cache_stats = self._executor._model.cache_stats if self._executor._model else None
+                        if cache_stats and (cache_stats.hits or cache_stats.misses):
+                            yield json.dumps({"type": "prefix_cache", "data": cache_stats.to_dict()}, ensure_ascii=False)
+                        if timing_events:
+                            tracer.root.set(iterations = self._executor._iterations)
+                            tracer.finish()
+                            for span in tracer.drain() + [tracer.root]:
+                                yield json.dumps({"type": "timing", "data": span.to_event()}, ensure_ascii=False)
                         return
         except asyncio.CancelledError:
             yield json.dumps({"type": "cancelled", "data": "Request cancelled by the server"}, ensure_ascii=False)
@@ -146,6 +201,19 @@ class Agent(BaseAgent):
             print(Fore.RED + Style.BRIGHT + f'Error: {str(e)}\n' + Style.RESET_ALL)
             yield json.dumps({"type": "error", "data": str(e)}, ensure_ascii=False)
         finally:
+            tracer.root.set(iterations = self._executor._iterations)
+            await export_trace(tracer)
+            # A tool started while a response was streaming must not outlive the page
+            pending = self._executor._pending_tool
+            self._executor._pending_tool = None
+            if pending:
+                pending[2].cancel()
+                try:
+                    await pending[2]
+                except asyncio.CancelledError:
+                    pass
+                except Exception as e:
+                    print(Fore.RED + Style.BRIGHT + f'Error in cancelled tool {pending[0]}: {str(e)}' + Style.RESET_ALL)
             await self.browser.close_browser()
             self._executor._model = None
             self._executor = None
@@ -0,0 +1,108 @@
+from dataclasses import dataclass, asdict
+from typing import Optional
+from ..models import TokenUsage
+from ..dom import CHARS_PER_TOKEN
+import time
+
+@dataclass(frozen = True)
+class SessionBudget:
+    """
+    Limits of a session, None leaves a limit out.
+
+    Attributes:
+        max_input_tokens (Optional[int]): Prompt tokens of all model calls
+        max_output_tokens (Optional[int]): Completion tokens of all model calls
+        max_seconds (Optional[float]): Wall-clock time of the agent loop
+        max_llm_calls (Optional[int]): Model calls which plan a step, tool and summary calls only count their tokens
+    """
+
+    max_input_tokens: Optional[int] = None
+    max_output_tokens: Optional[int] = None
+    max_seconds: Optional[float] = None
+    max_llm_calls: Optional[int] = None
+
+@dataclass
+class BudgetUsage:
+    """
+    What a session has spent of its budget.
+
+    Attributes:
+        input_tokens (int): Prompt tokens so far
+        output_tokens (int): Completion tokens so far
+        llm_calls (int): Model calls which planned a step so far
+        estimated (bool): Whether some token counts were estimated from the text length,
+            for calls whose response carried no usage
+        elapsed (float): Seconds since the session started
+    """
+
+    input_tokens: int = 0
+    output_tokens: int = 0
+    llm_calls: int = 0
+    estimated: bool = False
+    elapsed: float = 0.0
+
+    def to_dict(self) -> dict:
+        usage = asdict(self)
+        usage['elapsed'] = round(self.elapsed, 2)
+        return usage
+
+class BudgetTracker:
+    """
+    Counts the tokens, model calls and time of a session against its budget.
+
+    Attributes:
+        budget (SessionBudget): The limits
+        usage (BudgetUsage): What has been spent
+        exhausted (Optional[str]): The limit which ended the session, None while within budget
+    """
+
+    def __init__(self, budget: Optional[SessionBudget] = None) -> None:
+        self.budget = budget or SessionBudget()
+        self.usage = BudgetUsage()
+        self.exhausted: Optional[str] = None
+        self._started = time.monotonic()
+
+    def start(self) -> None:
+        self._started = time.monotonic()
+
+    def record(self, usage: Optional[TokenUsage], prompt_chars: int = 0, completion_chars: int = 0, step: bool = True) -> None:
+        """
+        Adds a model call.
+
+        Args:
+            usage (Optional[TokenUsage]): Token counts reported with the response
+            prompt_chars (int): Length of the prompt, estimates the tokens when there is no usage
+            completion_chars (int): Length of the completion, estimates the tokens when there is no usage
+            step (bool): Whether the call planned a step and counts against `max_llm_calls`
+        """
+
+        if step:
+            self.usage.llm_calls += 1
+        if usage is not None and (usage.prompt_tokens or usage.completion_tokens):
+            self.usage.input_tokens += usage.prompt_tokens
+            self.usage.output_tokens += usage.completion_tokens
+        else:
+            self.usage.input_tokens += prompt_chars // CHARS_PER_TOKEN
+            self.usage.output_tokens += completion_chars // CHARS_PER_TOKEN
+            self.usage.estimated = True
+
+    def check(self) -> Optional[str]:
+        """
+        Returns:
+            Optional[str]: The first limit reached, e.g. 'max_input_tokens', None while within budget
+        """
+
+        self.usage.elapsed = time.monotonic() - self._started
+        if self.exhausted:
+            return self.exhausted
+
+        budget = self.budget
+        if budget.max_input_tokens is not None and self.usage.input_tokens >= budget.max_input_tokens:
+            self.exhausted = 'max_input_tokens'
+        elif budget.max_output_tokens is not None and self.usage.output_tokens >= budget.max_output_tokens:
+            self.exhausted = 'max_output_tokens'
+        elif budget.max_llm_calls is not None and self.usage.llm_calls >= budget.max_llm_calls:
+            self.exhausted = 'max_llm_calls'
+        elif budget.max_seconds is not None and self.usage.elapsed >= budget.max_seconds:
+            self.exhausted = 'max_seconds'
+        return self.exhausted
@@ -1,21 +1,52 @@
 from ..dom import DOM
 from ..browser import Browser
-from ..tools.register import get_tool_classes
+from ..browser.screenshot import ScreenshotEncoder, ScreenshotOptions
+from ..browser.settle import PageSettler
+from ..tracing import Tracer
+from ..cache.screenshots import ScreenshotStore
+from ..tools.register import get_tool_registry
 from .state import AgentState, MemoryState
-from .utils import extract_json, read_markdown_file
+from .budget import BudgetTracker, SessionBudget
+from .history import ActionHistory
+from .utils import extract_json, read_prompt_template, build_scraper_prompt
+from ..workers import cpu_pool
 from playwright.async_api import Page
 from typing import Optional, Dict, Any, List
 from pydantic import Field, ValidationError, BaseModel
 from colorama import Fore, Style
-import inspect
+from functools import lru_cache
 import asyncio
+import copy
 import json
 import os
+import time
 
 # These tools wont be available for the agent
 # The name of the tools must be the same, i.e. the name of the file of the tool
 IGNORE_TOOLS = ['scroll_and_scrape', 'get_html', 'get_markdown']
 
+SYSTEM_PROMPT_PATH = os.path.join(os.path.dirname(__file__), '../prompts', 'system.md')
+OUTPUT_PROMPT_PATH = os.path.join(os.path.dirname(__file__), '../prompts', 'output.md')
+
+@lru_cache(maxsize = 8)
+def render_system_prompt(template: str, tools_markdown: str) -> str:
+    """Fills the tool registry into the system prompt template, once per template and tool set."""
+    return template.replace("TOOL_REGISTRY", tools_markdown)
+
+def preload() -> None:
+    """
+    Builds the tool registry and reads the prompt templates ahead of the first session,
+    meant to be called at startup.
+    """
+    render_system_prompt(read_prompt_template(SYSTEM_PROMPT_PATH), get_tool_registry(IGNORE_TOOLS).markdown)
+    read_prompt_template(OUTPUT_PROMPT_PATH)
+    build_scraper_prompt()
+    build_scraper_prompt({})
+
+def fingerprint_items(items: list) -> list[Optional[str]]:
+    """Order-independent fingerprints of the dict items, None for anything else."""
+    return [json.dumps(item, sort_keys=True) if isinstance(item, dict) else None for item in items]
+
 class ToolExecutionResult(BaseModel):
     tool_response: List | Dict | str | None
     scraped_data_accumulator: List[Dict | str | None]
@@ -34,6 +65,13 @@ class AgentExecutor:
         messages (List[BaseMessage]): The messages to be sent to the model
         dom (DOM): The DOM instance to use for the agent
         scraper_response_json_format (Optional[Dict[str, Any]]): The JSON format to use for the scraper response
+        page_state_token_budget (Optional[int]): Approximate token limit of the page state in the prompt
+        screenshots (ScreenshotEncoder): Captures the step screenshots
+        settler (PageSettler): Waits for the page to settle after each tool
+        tracer (Tracer): Records the latency spans of the session
+        screenshot_store (Optional[ScreenshotStore]): Keeps the screenshots out of the stream, None sends them inline
+        budget (BudgetTracker): Tokens, model calls and time spent against the session budget
+        history (ActionHistory): Keeps the action history in the prompt under its token budget
         session (str): The session ID for the agent
     """
 
@@ -42,6 +80,12 @@ class AgentExecutor:
             model: BaseModel = Field(..., description="Model to use for agent"), 
             browser: Browser = Field(..., description="Browser to use for agent"), 
             scraper_response_json_format: Optional[Dict[str, Any]] = None,
+            page_state_token_budget: Optional[int] = None,
+            screenshot_options: Optional[ScreenshotOptions] = None,
+            screenshot_store: Optional[ScreenshotStore] = None,
+            budget: Optional[SessionBudget] = None,
+            history_steps: int = 5,
+            history_token_budget: Optional[int] = 2000,
             session: str = ''
         ) -> None:
         self._model = model
@@ -51,8 +95,18 @@ class AgentExecutor:
         self._messages = []
         self.dom = None
         self._scraper_response_json_format = scraper_response_json_format
+        self.page_state_token_budget = page_state_token_budget
+        self.screenshots = ScreenshotEncoder(screenshot_options)
+        self.screenshot_store = screenshot_store
+        self.tracer = Tracer(session = session)
+        self.budget = BudgetTracker(budget)
+        self.history = ActionHistory(recent_steps = history_steps, token_budget = history_token_budget)
         self._session = session
         self._tools = []
+        # (tool_name, tool_args, task) of a tool started while the model response was streaming
+        self._pending_tool = None
+        self._scraped_fingerprints = set()
+        self._fingerprinted_items = 0
         self._system_prompt = ''
         self._output_prompt = ''
 
@@ -63,52 +117,26 @@ class AgentExecutor:
 
         self._page = page
         self.dom = DOM(page = self._page)
+        self.settler = PageSettler(self._page)
 
         available_dependencies = {
             "page": self._page,
             "dom": self.dom,
-            "model": self._model,
-            "scraper_response_json_format": self._scraper_response_json_format
+            # Tools can start while the model response is still streaming (see AgentGraph._dispatch_tool_early),
+            # their calls must not replace the messages or the usage of that response
+            "model": copy.copy(self._model),
+            "scraper_response_json_format": self._scraper_response_json_format,
+            "budget": self.budget
         }
 
-        self.tools = []
-        markdown_list = []
-        for tool_class in get_tool_classes():
-            sig = inspect.signature(tool_class.__init__)
-            tool_kwargs = {}
-
-            if tool_class.name in IGNORE_TOOLS:
-                continue
-
-            markdown_list.append(f"- {tool_class.name}: {tool_class.description}")
-            args_schema = tool_class.args_schema
-
-            if args_schema and args_schema.model_fields:
-                for field_name, field_info in args_schema.model_fields.items():
-                    if field_info.is_required():
-                        req_or_default = "required"
-                    else:   
-                        req_or_default = f"default = {field_info.default}"
-                    
-                    arg_type = field_info.annotation.__name__
-                    arg_desc = field_info.description or ""
-                    
-                    markdown_list.append(f"    - Args: `{field_name}` ({arg_type}, {req_or_default}) - {arg_desc}")
-
-            for param in sig.parameters.values():
-                if param.name in available_dependencies:
-                    tool_kwargs[param.name] = available_dependencies[param.name]
-            
-            self.tools.append(tool_class(**tool_kwargs))
-
-        tools_markdown = "\n".join(markdown_list)
-        system_prompt_template = read_markdown_file(os.path.join(os.path.dirname(__file__), '../prompts', 'system.md'))
-        final_system_prompt = system_prompt_template.replace("TOOL_REGISTRY", tools_markdown)
-        output_prompt_template = read_markdown_file(os.path.join(os.path.dirname(__file__), '../prompts', 'output.md'))
+        # Tool discovery and prompt templates are shared by every session,
+        # only binding the tools to this page happens per session
+        registry = get_tool_registry(IGNORE_TOOLS)
+        self.tools = registry.bind(available_dependencies)
 
         # initialize prompts
-        self._system_prompt = final_system_prompt
-        self._output_prompt = output_prompt_template
+        self._system_prompt = render_system_prompt(read_prompt_template(SYSTEM_PROMPT_PATH), registry.markdown)
+        self._output_prompt = read_prompt_template(OUTPUT_PROMPT_PATH)
 
         print(Fore.LIGHTWHITE_EX + "Tools:")
         for tool in self.tools:
@@ -159,18 +187,27 @@ class AgentExecutor:
         if found_tool:
             try:
                 args_model = found_tool.args_schema(**tool_args)
-                tool_response = await found_tool.run(args=args_model)
+                with self.tracer.span('tool.execute', tool = tool_name, step = self._iterations) as span:
+                    tool_response = await found_tool.run(args=args_model)
+                    span.set(response_chars = len(str(tool_response)))
 
                 if state.get('verbose'):
                     print(Fore.GREEN + Style.BRIGHT + f'Tool response: {str(tool_response)}' + Style.RESET_ALL, '\n')
-                    print(Fore.LIGHTYELLOW_EX + 'Waiting for networkidle...' + Style.RESET_ALL)
-                
-                await self._page.wait_for_load_state("networkidle", timeout=10000)
+                    print(Fore.LIGHTYELLOW_EX + 'Waiting for the page to settle...' + Style.RESET_ALL)
 
-                if state.get('wait_between_actions'):
+                # The only wait of the step, wait_between_actions is a minimum on top of it
+                settle_start = time.monotonic()
+                with self.tracer.span('page.settle', timeout = round(self.settler.timeout, 2)) as span:
+                    settled = await self.settler.wait()
+                    span.set(settled = settled)
+                if state.get('verbose') and not settled:
+                    print(Fore.LIGHTYELLOW_EX + f'Page did not settle within {self.settler.last_duration:.1f} seconds' + Style.RESET_ALL)
+
+                remaining_wait = (state.get('wait_between_actions') or 0) - (time.monotonic() - settle_start)
+                if remaining_wait > 0:
                     if state.get('verbose'):
-                        print(Fore.LIGHTYELLOW_EX + 'Waiting for ' + str(state.get('wait_between_actions')) + ' seconds...' + Style.RESET_ALL)
-                    await asyncio.sleep(state.get('wait_between_actions'))
+                        print(Fore.LIGHTYELLOW_EX + f'Waiting for {remaining_wait:.1f} more seconds...' + Style.RESET_ALL)
+                    await asyncio.sleep(remaining_wait)
 
             except ValidationError as e:
                 tool_response = f"Error: Tool argument validation error: {e}"
@@ -189,18 +226,23 @@ class AgentExecutor:
                         if not isinstance(newly_scraped_data, list):
                             newly_scraped_data = [newly_scraped_data]
                         
-                        existing_items_set = {json.dumps(item, sort_keys=True) for item in scraped_data_accumulator if isinstance(item, dict)}
+                        # Fingerprints of the saved items are kept between steps, only
+                        # rebuilt when the accumulator changed elsewhere
+                        if self._fingerprinted_items != len(scraped_data_accumulator):
+                            fingerprints = await cpu_pool.run_in_thread(fingerprint_items, scraped_data_accumulator)
+                            self._scraped_fingerprints = {fingerprint for fingerprint in fingerprints if fingerprint}
+                        existing_items_set = self._scraped_fingerprints
+                        new_fingerprints = await cpu_pool.run_in_thread(fingerprint_items, newly_scraped_data)
                         unique_new_items = []
-                        for item in newly_scraped_data:
-                            if isinstance(item, dict):
-                                item_fingerprint = json.dumps(item, sort_keys=True)
-                                if item_fingerprint not in existing_items_set:
-                                    unique_new_items.append(item)
-                                    existing_items_set.add(item_fingerprint)
+                        for item, item_fingerprint in zip(newly_scraped_data, new_fingerprints):
+                            if item_fingerprint and item_fingerprint not in existing_items_set:
+                                unique_new_items.append(item)
+                                existing_items_set.add(item_fingerprint)
                         if unique_new_items:
                             scraped_data_accumulator.extend(unique_new_items)
                             if state.get('verbose'):
                                 print(Fore.WHITE + Style.BRIGHT + f"Implicitly saved {len(unique_new_items)} new JSON items. Total items: {len(scraped_data_accumulator)}.\n" + Style.RESET_ALL)
+                        self._fingerprinted_items = len(scraped_data_accumulator)
                     else:
                         if isinstance(tool_response, str) and tool_response not in scraped_data_accumulator and isinstance(tool_response, str):
                             if state.get('verbose'):
@@ -209,6 +251,12 @@ class AgentExecutor:
                 except Exception as e:
                     print(Fore.RED + Style.BRIGHT + '❗' + f"Could not automatically save scraper output: {e}" + Style.RESET_ALL)
 
+                # The data is saved as is, only the model is told that part of the page is missing
+                failed, total = getattr(found_tool, 'failed_chunks', (0, 0))
+                if failed:
+                    scraped = f"Scraped {len(tool_response)} items" if isinstance(tool_response, list) else str(tool_response)
+                    tool_response = f"{scraped}\nPartial result: {failed} of {total} chunks of the page failed to scrape, scrape again to retry them."
+
             return ToolExecutionResult(
                 tool_response=tool_response,
                 scraped_data_accumulator=scraped_data_accumulator
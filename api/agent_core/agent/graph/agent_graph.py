@@ -1,7 +1,9 @@
 from ..executor import AgentExecutor
 from ..state import AgentState
 from ...message import SystemMessage, UserMessage
-from ..utils import extract_json
+from ..utils import extract_json, is_extracted_prefix, IncrementalJSONParser
+from ...workers import cpu_pool, encode_base64
+from ...dom import CHARS_PER_TOKEN
 from langgraph.graph import StateGraph, END
 from langgraph.graph.state import CompiledStateGraph
 from langgraph.config import get_stream_writer
@@ -9,10 +11,17 @@ from colorama import Fore, Style
 from datetime import datetime
 from json import JSONDecodeError
 import asyncio
-import base64
 import json
 import os
 
+# Page state categories sent to the model after each tool call, along with the
+# heading they are given in the prompt. Only these are extracted from the page.
+PAGE_STATE_PROMPTS = {
+    'interactive_elements': 'Current interactive elements on the page',
+    # 'informative_elements': 'Current informative elements on the page',
+    # 'scrollable_elements': 'Current scrollable elements on the page',
+}
+
 class AgentGraph:
     """
     Manages the stateful, cyclical execution of the web agent using a LangGraph state machine.
@@ -56,64 +65,98 @@ class AgentGraph:
         user_prompt = UserMessage(content = f'User Query: {state["input"]}').to_dict()
         model_messages = [system_prompt, user_prompt]
         self._executor._model.messages = model_messages
+        # The system prompt and the query do not change during the session
+        self._executor._model.cache_prefix(len(model_messages))
 
         if state.get('previous_actions'):
-            history = []
-            for ind, action in enumerate(state['previous_actions']):
-                thought = action.get('thought')
-                tool_call = action.get('tool_name')
-                tool_args = action.get('tool_args')
-                tool_response = action.get('tool_response')
-                
-                if isinstance(tool_response, list):
-                    response_summary = f"Successfully scraped {len(tool_response)} items."
-                else:
-                    response_summary = str(tool_response)[:500] 
-
-                if ind == len(state['previous_actions']) - 1:
-                    history.append(f"LAST ACTION:\nThought: {thought}\nTool Call: {tool_call}\nTool Args: {tool_args}\nResponse: {response_summary}")
-                else:
-                    if tool_call == 'web_search':
-                        history.append(f"Step {ind + 1}: Called tool: `{tool_call}`\nArgs: {tool_args}\nResponse: {tool_response}")
-                    else:
-                        history.append(f"Step {ind + 1}: Called tool: `{tool_call}`\nArgs: {tool_args}")
-                
-            history_str = "\n".join(history)
+            # The last steps verbatim and a summary of the older ones, the same size however long the session
+            history_str = self._executor.history.render(state['previous_actions'])
             self._executor._model.add_message(UserMessage(content = f'Previous Actions Summary:\n{history_str}').to_dict())
-            self._executor._model.add_message(UserMessage(content = f"Current interactive elements on the page:\n{state.get('page_state').get('interactive_elements')}").to_dict())
-            # self._executor._model.add_message(UserMessage(content = f"Current informative elements on the page:\n{state.get('page_state').get('informative_elements')}").to_dict())
-            # self._executor._model.add_message(UserMessage(content = f"Current scrollable elements on the page:\n{state.get('page_state').get('scrollable_elements')}").to_dict())
-
+            page_state = state.get('page_state') or {}
+            for category, heading in PAGE_STATE_PROMPTS.items():
+                self._executor._model.add_message(UserMessage(content = f"{heading}:\n{page_state.get(category)}").to_dict())
+
+        # The response is parsed while it streams: the thought is forwarded as it is written
+        # and the tool starts as soon as its name and arguments are complete
+        writer = get_stream_writer()
+        parser = IncrementalJSONParser(stream_keys = ('thought',))
+        model = self._executor._model
+        response_content = ''
+        prompt_chars = sum(len(str(message.get('content', ''))) for message in model.messages)
         try:
-            response = await self._executor._model.generate()
-            # response_content = response['choices'][0]['message']['content']
-            response_content = response.choices[0].message.content
+            with self._executor.tracer.span(
+                'llm.generate',
+                step = self._executor._iterations,
+                model = getattr(model, 'model', type(model).__name__),
+                prompt_messages = len(model.messages),
+                prompt_chars = prompt_chars
+            ) as span:
+                try:
+                    async for chunk in model.generate_stream():
+                        response_content += chunk
+                        for event, key, value in parser.feed(chunk):
+                            if event == 'delta':
+                                writer({'type': 'thought_delta', 'data': value})
+                            elif key in ('tool_name', 'tool_args'):
+                                self._dispatch_tool_early(parser, state)
+                finally:
+                    # Counted once, failed calls too, or a failing model would never run out of budget
+                    usage = model.last_usage
+                    self._executor.budget.record(usage, prompt_chars, len(response_content))
+                span.set(completion_chars = len(response_content), **(usage.to_dict() if usage else {}))
+
             json_response = extract_json(response_content)
+            if json_response is None and parser.done:
+                json_response = parser.fields
 
             print(Fore.CYAN + Style.BRIGHT + f'Iteration: {self._executor._iterations}' + Style.RESET_ALL)
-            print(Fore.GREEN + Style.BRIGHT + f'Model thought: {json_response.get("thought")}' + Style.RESET_ALL)
+            print(Fore.GREEN + Style.BRIGHT + f'Model thought: {json_response.get("thought") if json_response else None}' + Style.RESET_ALL)
 
             if json_response is not None:
                 return { 'response': json_response }
             else: 
+                pending = self._executor._pending_tool
                 return { 
                     'response': {
-                        'tool_name': '',
-                        'tool_args': {},
+                        'tool_name': pending[0] if pending else '',
+                        'tool_args': pending[1] if pending else {},
                         'thought': 'The response from the model was not a valid JSON object. Please try again.',
                         'observation': 'The response from the model was not a valid JSON object. Please try again.'
                     } 
                 }
         except Exception as e:
+            # A tool which already started is still collected by the tool_node
+            pending = self._executor._pending_tool
             return { 
                 'response': {
-                    'tool_name': '',
-                    'tool_args': {},
+                    'tool_name': pending[0] if pending else '',
+                    'tool_args': pending[1] if pending else {},
                     'thought': f'An error occurred while generating a response: {str(e)}',
                     'observation': f'An error occurred while generating a response: {str(e)}'
                 } 
             }
         
+    def _dispatch_tool_early(self, parser: IncrementalJSONParser, state: AgentState) -> None:
+        """
+        Starts the tool call of a response which is still streaming, once both
+        `tool_name` and `tool_args` are complete. The tool_node then awaits it.
+        Only done when the streamed object is the one `extract_json` picks from the
+        full response, text before it could be followed by another object.
+        """
+
+        if parser.prefix is None or not is_extracted_prefix(parser.prefix):
+            return
+        fields = parser.fields
+        if self._executor._pending_tool is not None or 'tool_name' not in fields or 'tool_args' not in fields:
+            return
+        tool_name, tool_args = fields['tool_name'], fields['tool_args']
+        if not isinstance(tool_name, str) or not isinstance(tool_args, dict):
+            return
+        if not any(tool.name == tool_name for tool in self._executor.tools):
+            return
+        task = asyncio.create_task(self._executor._execute_tool(tool_name, tool_args, state))
+        self._executor._pending_tool = (tool_name, tool_args, task)
+
     async def tool_node(self, state: AgentState) -> dict:
         """
         It executes the tool call planned by the model_node.
@@ -129,7 +172,28 @@ class AgentGraph:
         tool_name = state.get('response', {}).get('tool_name')
         tool_args = state.get('response', {}).get('tool_args', {})
 
-        result = await self._executor._execute_tool(tool_name, tool_args, state)
+        # Element ids are only valid in this session, the xpath is kept for the memory
+        element_xpath = None
+        if self._executor.dom and isinstance(tool_args, dict) and tool_args.get('element_id') is not None:
+            element_xpath = tool_args.get('xpath') or self._executor.dom.xpaths.get(tool_args['element_id'])
+
+        pending = self._executor._pending_tool
+        self._executor._pending_tool = None
+        early_action = None
+        if pending and pending[0] == tool_name and pending[1] == tool_args:
+            result = await pending[2]
+        else:
+            if pending:
+                # Never run two tools on the page at once, the early one already acted on it so it is kept
+                early = await pending[2]
+                print(Fore.YELLOW + Style.BRIGHT + f"Tool {pending[0]} {pending[1]} started from the streamed response differs from the final {tool_name} {tool_args}, recording both" + Style.RESET_ALL)
+                early_action = {
+                    'thought': 'Started while the response was streaming, with arguments which differ from the final response',
+                    'tool_name': pending[0],
+                    'tool_args': pending[1],
+                    'tool_response': early.tool_response if early else f"Error: Tool '{pending[0]}' not found or failed to execute."
+                }
+            result = await self._executor._execute_tool(tool_name, tool_args, state)
         tool_response = f"Error: Tool '{tool_name}' not found or failed to execute."
 
         scraped_data_accumulator = state.get('scraped_data', [])
@@ -139,12 +203,26 @@ class AgentGraph:
 
         page_state_dict = {}
         try:
-            dom_state = await self._executor.dom.get_state()
-            page_state_dict = {
-                'interactive_elements': self._executor.dom.format_elements_for_prompt(dom_state.get('interactive_elements', [])),
-                'informative_elements': self._executor.dom.format_elements_for_prompt(dom_state.get('informative_elements', [])),
-                'scrollable_elements': self._executor.dom.format_elements_for_prompt(dom_state.get('scrollable_elements', []))
-            }
+            # Only the categories which end up in the prompt are extracted and formatted,
+            # compactly and sharing the page state token budget
+            tracer = self._executor.tracer
+            with tracer.span('dom.get_state') as span:
+                dom_state = await self._executor.dom.get_state(list(PAGE_STATE_PROMPTS))
+                if not isinstance(dom_state, Exception):
+                    span.set(elements = sum(len(dom_state[category]) for category in PAGE_STATE_PROMPTS))
+            budget = self._executor.page_state_token_budget
+            with tracer.span('dom.format', token_budget = budget) as span:
+                page_state_dict = {
+                    category: self._executor.dom.format_elements_for_prompt(
+                        dom_state.get(category, []),
+                        compact = True,
+                        token_budget = budget // len(PAGE_STATE_PROMPTS) if budget else None,
+                        include_xpath = False
+                    )
+                    for category in PAGE_STATE_PROMPTS
+                }
+                chars = sum(len(text) for text in page_state_dict.values())
+                span.set(chars = chars, approx_tokens = chars // CHARS_PER_TOKEN)
         except Exception as e:
             print(Fore.RED + Style.BRIGHT + '❗' + f"Error getting DOM state: {e}" + Style.RESET_ALL)
 
@@ -154,21 +232,35 @@ class AgentGraph:
             'tool_args': tool_args,
             'tool_response': tool_response
         }
+        if element_xpath:
+            new_action['element_xpath'] = element_xpath
         all_actions = state.get('previous_actions', [])
+        if early_action:
+            all_actions.append(early_action)
         all_actions.append(new_action)
 
         # screenshot at each step
+        screenshot = screenshot_base64 = screenshot_url = None
         if state.get('screenshot_each_step') and tool_name in ["click_element", "click_and_type_text", "inject_code", "scroll_site", "navigate", "press_key"]:
-            screenshot_bytes = await self._executor._page.screenshot() 
-            screenshot_base64 = base64.b64encode(screenshot_bytes).decode('utf-8')
-        else:
-            screenshot_base64 = None
+            with self._executor.tracer.span('screenshot', format = self._executor.screenshots.format) as span:
+                # None when the page looks the same as in the last screenshot sent
+                screenshot = await self._executor.screenshots.capture(self._executor._page)
+                # Served separately when there is a store, the stream only carries its URL
+                if screenshot and self._executor.screenshot_store:
+                    screenshot_url = await self._executor.screenshot_store.put(
+                        self._executor._session, self._executor._iterations, screenshot.data, screenshot.mime_type
+                    )
+                elif screenshot:
+                    screenshot_base64 = await cpu_pool.run_in_thread(encode_base64, screenshot.data)
+                span.set(skipped = screenshot is None, bytes = len(screenshot.data) if screenshot else None)
 
         return {
             "page_state": page_state_dict,
             "previous_actions": all_actions,
             "scraped_data": scraped_data_accumulator,
-            "screenshot_base64": screenshot_base64
+            "screenshot_base64": screenshot_base64,
+            "screenshot_url": screenshot_url,
+            "screenshot_mime_type": screenshot.mime_type if screenshot else None
         }
 
     async def output_node(self, state: AgentState) -> AgentState:
@@ -213,10 +305,15 @@ class AgentGraph:
             steps = []
             for action in state.get('previous_actions', []):
                 if 'Error' not in action['tool_response']:
+                    tool_args = action['tool_args']
+                    if action.get('element_xpath'):
+                        # Replayed sessions act on the xpath, the element ids do not carry over
+                        tool_args = {key: value for key, value in tool_args.items() if key != 'element_id'}
+                        tool_args['xpath'] = action['element_xpath']
                     steps.append({
                         'thought': action['thought'],
                         'tool_call': action['tool_name'],
-                        'tool_args': action['tool_args'],
+                        'tool_args': tool_args,
                         'tool_response': action['tool_response'] if isinstance(action['tool_response'], str) else "Scraped data"
                     })
 
@@ -251,10 +348,17 @@ class AgentGraph:
                     'memorized_steps': steps 
                 }
 
+        history = "\n".join([f"Step {i + 1}: {action['thought']}" for i, action in enumerate(state.get('previous_actions', []))])
+        if self._executor.budget.exhausted:
+            # No summary call past the budget, the steps taken are the partial result
+            return {
+                'result_output': f'Stopped before completing the task, the session reached its {self._executor.budget.exhausted} limit.\nSteps taken:\n{history}',
+                'memorized_steps': steps
+            }
+
         try:
             system_prompt = SystemMessage(content=self._executor._output_prompt).to_dict()
             # history = "\n".join([f"Step {i+1}: {action[0]}" for i, action in enumerate(state.get('previous_actions', []))])
-            history = "\n".join([f"Step {i + 1}: {action['thought']}" for i, action in enumerate(state.get('previous_actions', []))])
 
             messages = [
                 system_prompt,
@@ -265,6 +369,12 @@ class AgentGraph:
             self._executor._model.messages = messages
             response = await self._executor._model.generate()
             response_content = response['choices'][0]['message']['content']
+            self._executor.budget.record(
+                self._executor._model.last_usage,
+                sum(len(str(message.get('content', ''))) for message in messages),
+                len(response_content or ''),
+                step = False
+            )
             final_output = json.loads(response_content).get("response", "Task completed.")
 
             return {
@@ -287,17 +397,26 @@ class AgentGraph:
         Returns:
             str: The name of the next node to execute ('call_tool' or 'call_output').
         """
-        if state.get('wait_between_actions', 0) > 0:
-            if state.get('verbose'):
-                print(Fore.YELLOW + Style.BRIGHT + f'Waiting for {state.get("wait_between_actions", 0)} seconds' + Style.RESET_ALL)
-            await asyncio.sleep(state.get('wait_between_actions', 0))
-
         self._executor._iterations += 1
         tool_name = state.get('response', {}).get('tool_name', '').lower().strip()
         if tool_name == 'finish':
             return 'call_output'
+        # Out of budget, a tool which already started still finishes, its result may be scraped data
+        if self._executor.budget.check() and self._executor._pending_tool is None:
+            return 'call_output'
         return 'call_tool'
 
+    async def _tool_router(self, state: AgentState) -> str:
+        """
+        A conditional edge after the tool_node, which ends the session once its budget is spent.
+
+        Returns:
+            str: 'call_model' or 'call_output'
+        """
+        if self._executor.budget.check():
+            return 'call_output'
+        return 'call_model'
+
     def create_graph(self) -> CompiledStateGraph:
         graph = StateGraph(AgentState)
         graph.add_node('model_node', self.model_node)
@@ -312,7 +431,14 @@ class AgentGraph:
                 'call_output': 'output_node'
             }
         )
-        graph.add_edge('tool_node', 'model_node')
+        graph.add_conditional_edges(
+            'tool_node',
+            self._tool_router,
+            {
+                'call_model': 'model_node',
+                'call_output': 'output_node'
+            }
+        )
         graph.add_edge('output_node', END)
         graph.set_entry_point('model_node')
 
@@ -3,7 +3,6 @@ from ..state import MemoryState
 from langgraph.graph import StateGraph, END
 from langgraph.graph.state import CompiledStateGraph
 from colorama import Fore, Style
-import asyncio
 import os
 
 class MemoryGraph:
@@ -81,11 +80,6 @@ class MemoryGraph:
         return { 'output': state.get('step_results')[-1] }
 
     async def _router(self, state: MemoryState) -> str:
-        if state.get('wait_between_actions') > 0:
-            if state.get('verbose'):
-                print(Fore.YELLOW + Style.BRIGHT + f'Waiting for {state.get('wait_between_actions')} seconds' + Style.RESET_ALL)
-            await asyncio.sleep(state.get('wait_between_actions'))
-
         self._executor._iterations += 1
 
         if state.get('current_step_index') < len(state.get('steps')):
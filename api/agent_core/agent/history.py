@@ -0,0 +1,171 @@
+from ..dom import CHARS_PER_TOKEN
+from .state import Action
+from collections import Counter
+from typing import Optional
+import json
+
+# Longest tool response of a recent step kept in the prompt, web_search results can be pages long
+RECENT_RESPONSE_CHARS = 1500
+LAST_RESPONSE_CHARS = 500
+# Longest arguments and outcome of a step in the summary
+SUMMARY_FIELD_CHARS = 80
+# Share of the history token budget the summary of the older steps may take
+SUMMARY_SHARE = 0.3
+# Visited URLs kept in the condensed part of the summary
+MAX_VISITED_URLS = 5
+# Shortest the thought, arguments and response of the last step are cut to when it alone is over the budget
+MIN_FIELD_CHARS = 40
+SUMMARY_HEADER = "Earlier steps:\n"
+
+def _clip(text: str, limit: int) -> str:
+    text = ' '.join(text.split())
+    return text if len(text) <= limit else text[:limit - 3] + '...'
+
+def _response_text(response) -> str:
+    if isinstance(response, list):
+        return f"Successfully scraped {len(response)} items."
+    return str(response)
+
+def _failed(response) -> bool:
+    if isinstance(response, dict):
+        return 'error' in response
+    return isinstance(response, str) and 'Error' in response
+
+class ActionHistory:
+    """
+    The action history sent to the model at each step, kept under a token budget so the
+    prompt stays the same size however long the session runs.
+    The last `recent_steps` steps are sent as they are, older ones are rolled into a
+    summary of one line per step. Once those lines outgrow their share of the budget,
+    the oldest are merged into a condensed count of the tools used and pages visited.
+    Steps are rolled in once and the summary is only extended, never rebuilt.
+
+    Attributes:
+        recent_steps (int): Steps sent verbatim
+        token_budget (Optional[int]): Approximate token limit of the history, None keeps every step
+    """
+
+    def __init__(self, recent_steps: int = 5, token_budget: Optional[int] = 2000) -> None:
+        self.recent_steps = max(1, recent_steps)
+        self.token_budget = token_budget
+        self._rolled = 0
+        # (step, line, tool name, failed, visited url) of the steps summarized one per line
+        self._lines: list[tuple[int, str, str, bool, Optional[str]]] = []
+        self._lines_chars = 0
+        self._condensed_until = 0
+        self._condensed_tools: Counter = Counter()
+        self._condensed_errors = 0
+        self._visited: list[str] = []
+        self._summary: Optional[str] = None
+
+    @property
+    def _budget_chars(self) -> Optional[int]:
+        return self.token_budget * CHARS_PER_TOKEN if self.token_budget else None
+
+    def render(self, actions: list[Action]) -> str:
+        """
+        Formats the history of the session.
+
+        Args:
+            actions (list[Action]): Every step of the session so far, in order
+
+        Returns:
+            str: The summary of the older steps followed by the recent steps
+        """
+
+        start = max(self._rolled, len(actions) - self.recent_steps) if self.token_budget else 0
+        for index in range(self._rolled, start):
+            self._roll(index + 1, actions[index])
+        self._rolled = max(self._rolled, start)
+
+        recent = [
+            self._format_recent(index + 1, actions[index], last = index == len(actions) - 1)
+            for index in range(start, len(actions))
+        ]
+
+        # Recent steps which do not fit next to the summary are rolled in early
+        budget = self._budget_chars
+        if budget:
+            while len(recent) > 1 and len(self._join(recent)) > budget:
+                self._roll(self._rolled + 1, actions[self._rolled])
+                self._rolled += 1
+                recent.pop(0)
+            # The last step alone can still be over, its fields are cut down to what is left
+            if recent and len(self._join(recent)) > budget:
+                action = actions[-1]
+                available = budget - len(self._join(['']))
+                limit = max(len(str(action.get('thought'))), len(str(action.get('tool_args'))), LAST_RESPONSE_CHARS)
+                while len(recent[-1]) > available and limit > MIN_FIELD_CHARS:
+                    limit = max(MIN_FIELD_CHARS, limit - (len(recent[-1]) - available) // 3 - 1)
+                    recent[-1] = self._format_recent(len(actions), action, last = True, limit = limit)
+
+        return self._join(recent)
+
+    def _join(self, recent: list[str]) -> str:
+        if self.summary:
+            return "\n".join([self.summary] + recent)
+        return "\n".join(recent)
+
+    @property
+    def summary(self) -> str:
+        """The summary of the steps which are no longer sent verbatim, empty if there are none."""
+        if self._summary is None:
+            parts = [self._condensed()] if self._condensed_until else []
+            parts.extend(line for _, line, _, _, _ in self._lines)
+            self._summary = SUMMARY_HEADER + "\n".join(parts) if parts else ''
+        return self._summary
+
+    def _condensed(self) -> str:
+        if not self._condensed_until:
+            return ''
+        tools = ', '.join(f"{tool} x{count}" for tool, count in self._condensed_tools.most_common())
+        condensed = f"Steps 1-{self._condensed_until}: {tools}"
+        if self._condensed_errors:
+            condensed += f"; {self._condensed_errors} failed"
+        if self._visited:
+            condensed += f"; visited {', '.join(self._visited)}"
+        return condensed
+
+    def _roll(self, step: int, action: Action) -> None:
+        tool_name = action.get('tool_name')
+        tool_args = action.get('tool_args')
+        args = _clip(json.dumps(tool_args, ensure_ascii = False) if isinstance(tool_args, dict) else str(tool_args), SUMMARY_FIELD_CHARS)
+        outcome = _clip(_response_text(action.get('tool_response')), SUMMARY_FIELD_CHARS)
+        line = f"Step {step}: {tool_name} {args} -> {outcome}"
+        url = tool_args.get('url') if tool_name == 'navigate' and isinstance(tool_args, dict) else None
+        self._lines.append((step, line, str(tool_name), _failed(action.get('tool_response')), url))
+        self._lines_chars += len(line) + 1
+        self._summary = None
+
+        budget = self._budget_chars
+        if not budget:
+            return
+        # Every line condensed frees its length, so this runs once per rolled step on average
+        while self._lines and len(SUMMARY_HEADER) + len(self._condensed()) + 1 + self._lines_chars > budget * SUMMARY_SHARE:
+            self._condense(self._lines.pop(0))
+        # The oldest visited URLs make way when the condensed line alone is over the share
+        while len(self._visited) > 1 and len(SUMMARY_HEADER) + len(self._condensed()) > budget * SUMMARY_SHARE:
+            self._visited.pop(0)
+
+    def _condense(self, entry: tuple[int, str, str, bool, Optional[str]]) -> None:
+        step, line, tool_name, failed, url = entry
+        self._lines_chars -= len(line) + 1
+        self._condensed_until = step
+        self._condensed_tools[tool_name] += 1
+        if failed:
+            self._condensed_errors += 1
+        if url:
+            self._visited = (self._visited + [_clip(str(url), SUMMARY_FIELD_CHARS)])[-MAX_VISITED_URLS:]
+
+    def _format_recent(self, step: int, action: Action, last: bool, limit: int = RECENT_RESPONSE_CHARS) -> str:
+        thought = _clip(str(action.get('thought')), limit)
+        tool_call = action.get('tool_name')
+        tool_args = _clip(str(action.get('tool_args')), limit)
+        tool_response = action.get('tool_response')
+
+        if last:
+            response_summary = _response_text(tool_response)[:min(limit, LAST_RESPONSE_CHARS)]
+            return f"LAST ACTION:\nThought: {thought}\nTool Call: {tool_call}\nTool Args: {tool_args}\nResponse: {response_summary}"
+        if tool_call == 'web_search':
+            return f"Step {step}: Called tool: `{tool_call}`\nArgs: {tool_args}\nResponse: {_response_text(tool_response)[:limit]}"
+        return f"Step {step}: Called tool: `{tool_call}`\nArgs: {tool_args}"
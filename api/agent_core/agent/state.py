@@ -1,5 +1,5 @@
 from ..dom.state import DOMState
-from typing import TypedDict, Optional
+from typing import TypedDict, Optional, NotRequired
 
 class Response(TypedDict):
     tool_name: str
@@ -13,6 +13,7 @@ class Action(TypedDict):
     tool_call: str | None
     tool_args: dict | None
     tool_response: str | None
+    element_xpath: NotRequired[str]
 
 class AgentState(TypedDict):
     input: str
@@ -30,6 +31,8 @@ class AgentState(TypedDict):
     memorized_steps: list[Action]
     screenshot_each_step: bool
     screenshot_base64: str | None
+    screenshot_url: NotRequired[str | None]
+    screenshot_mime_type: NotRequired[str | None]
 
 class MemoryState(TypedDict):
     input: str
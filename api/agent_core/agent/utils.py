@@ -1,12 +1,47 @@
 import re
 import json
 import os
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 
 def read_markdown_file(file_path: str) -> str:
     with open(file_path, "r", encoding="utf-8") as f:
         return f.read()
 
+def dev_reload_enabled() -> bool:
+    """
+    Whether tools and prompt templates are reloaded when their files change,
+    enabled with WEB_AGENT_DEV_RELOAD=1. Off by default, everything is loaded once per process.
+    """
+    return os.getenv("WEB_AGENT_DEV_RELOAD", "").lower() in ("1", "true", "yes")
+
+# Absolute path -> (modification time, content)
+_prompt_templates: Dict[str, Tuple[float, str]] = {}
+
+def read_prompt_template(file_path: str) -> str:
+    """
+    Reads a prompt template once per process, or again whenever the file
+    changes in dev reload mode.
+    """
+
+    file_path = os.path.abspath(file_path)
+    cached = _prompt_templates.get(file_path)
+    if cached is not None and not dev_reload_enabled():
+        return cached[1]
+
+    mtime = os.path.getmtime(file_path)
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, read_markdown_file(file_path))
+        _prompt_templates[file_path] = cached
+    return cached[1]
+
+def is_extracted_prefix(prefix: str) -> bool:
+    """
+    Whether a JSON object following `prefix` is the one `extract_json` picks: the
+    response starts with it, or with the ```json fence around it.
+    """
+    prefix = prefix.lstrip()
+    return not prefix or (prefix.startswith('```json\n') and not prefix[len('```json\n'):].strip())
+
 def extract_json(json_str: str) -> dict:
     json_match = re.search(r"```json\n(.*?)\n```", json_str, re.DOTALL)
     raw_json_string = json_match.group(1) if json_match else json_str
@@ -24,14 +59,134 @@ def build_scraper_prompt(scraper_output_json_schema: Optional[Dict[str, Any]] =
     Dynamically assembles the scraper system prompt from template files
     based on whether a JSON schema is provided.
     """
-    base_template = read_markdown_file(os.path.join(PROMPTS_DIR, "scraper.md"))
+    base_template = read_prompt_template(os.path.join(PROMPTS_DIR, "scraper.md"))
 
     if scraper_output_json_schema:
-        instruction_template = read_markdown_file(os.path.join(PROMPTS_DIR, "scraper_schema.md"))
+        instruction_template = read_prompt_template(os.path.join(PROMPTS_DIR, "scraper_schema.md"))
         schema_as_string = json.dumps(scraper_output_json_schema, indent=2)
         instructions = instruction_template.replace("[JSON_SCHEMA_HERE]", schema_as_string)
     else:
-        instructions = read_markdown_file(os.path.join(PROMPTS_DIR, "scraper_non_schema.md"))
+        instructions = read_prompt_template(os.path.join(PROMPTS_DIR, "scraper_non_schema.md"))
 
     final_prompt = base_template.replace("[OUTPUT_FORMAT_INSTRUCTIONS]", instructions)
-    return final_prompt
\ No newline at end of file
+    return final_prompt
+
+class IncrementalJSONParser:
+    """
+    Parses the top-level JSON object of a streamed model response while it arrives.
+
+    `feed` takes the next chunk of text and returns what it completed:
+    ('delta', key, text) as the string value of one of `stream_keys` grows, and
+    ('field', key, value) once a top-level value is complete. Anything before
+    the opening brace (e.g. a ```json fence) is skipped.
+
+    Attributes:
+        fields (dict): The top-level values completed so far
+        done (bool): Whether the closing brace of the object was seen
+        prefix (Optional[str]): The text before the opening brace, None until it is seen
+    """
+
+    def __init__(self, stream_keys: tuple[str, ...] = ('thought',)) -> None:
+        self.stream_keys = set(stream_keys)
+        self.fields: dict = {}
+        self.done = False
+        self.prefix: Optional[str] = None
+        self._text = ''
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._expect = 'key'
+        self._key = None
+        self._start = None
+        self._streamed = 0
+
+    def feed(self, chunk: str) -> list[tuple]:
+        events = []
+        self._text += chunk
+        text = self._text
+
+        for i in range(self._pos, len(text)):
+            if self.done:
+                break
+            char = text[i]
+
+            if self._depth == 0:
+                if char == '{':
+                    self._depth = 1
+                    self.prefix = text[:i]
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._expect == 'key':
+                        self._key = json.loads(text[self._start:i + 1])
+                        self._expect = 'colon'
+                    elif self._depth == 1 and self._expect == 'value':
+                        self._complete(text[self._start:i + 1], events)
+                continue
+
+            if char == '"':
+                self._in_string = True
+                if self._depth == 1 and self._expect in ('key', 'value'):
+                    self._start = i
+                    self._streamed = 0
+            elif char in '{[':
+                if self._depth == 1 and self._expect == 'value':
+                    self._start = i
+                self._depth += 1
+            elif char in '}]':
+                self._depth -= 1
+                if self._depth == 1 and self._expect == 'value':
+                    self._complete(text[self._start:i + 1], events)
+                elif self._depth == 0:
+                    if self._expect == 'value' and self._start is not None:
+                        self._complete(text[self._start:i].strip(), events)
+                    self.done = True
+            elif self._depth == 1:
+                if char == ':' and self._expect == 'colon':
+                    self._expect = 'value'
+                    self._start = None
+                elif char == ',':
+                    if self._expect == 'value' and self._start is not None:
+                        self._complete(text[self._start:i].strip(), events)
+                    self._expect = 'key'
+                elif self._expect == 'value' and self._start is None and not char.isspace():
+                    self._start = i
+
+        self._pos = len(text)
+        if self._in_string and self._depth == 1 and self._expect == 'value' and self._key in self.stream_keys:
+            self._stream(self._decode_partial(text[self._start + 1:]), events)
+        return events
+
+    def _complete(self, raw: str, events: list) -> None:
+        try:
+            value = json.loads(raw)
+        except json.JSONDecodeError:
+            value = raw
+        if self._key in self.stream_keys and isinstance(value, str):
+            self._stream(value, events)
+        self.fields[self._key] = value
+        events.append(('field', self._key, value))
+        self._expect = 'comma'
+        self._start = None
+
+    def _stream(self, value: str, events: list) -> None:
+        if len(value) > self._streamed:
+            events.append(('delta', self._key, value[self._streamed:]))
+            self._streamed = len(value)
+
+    @staticmethod
+    def _decode_partial(raw: str) -> str:
+        # Drops a trailing incomplete escape sequence (at most 6 characters, e.g. \u00e)
+        for cut in range(0, min(len(raw), 6) + 1):
+            try:
+                return json.loads(f'"{raw[:len(raw) - cut]}"')
+            except json.JSONDecodeError:
+                continue
+        return ''
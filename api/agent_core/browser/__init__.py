@@ -1,23 +1,22 @@
-import asyncio
 from playwright.async_api import (
     Page, 
-    Playwright, 
     Browser, 
-    async_playwright, 
     BrowserContext
 )
-from playwright_stealth import Stealth
 from fake_useragent import UserAgent
+from .pool import context_pool
 
 class Browser:
     """
     Browser class for managing browser instances.
+    The Playwright driver and the connection to the ws endpoint are shared across
+    sessions (see `BrowserManager`), a session only owns its context and page,
+    which are taken pre-warmed from the `ContextPool` and discarded on close.
 
     Attributes:
         user_agent (str): The user agent to use for the browser
         random_user_agent (bool): Whether to use a random user agent
-        playwright (Playwright): The Playwright instance
-        browser_instance (Browser): The browser instance
+        browser_instance (Browser): The shared browser connection
         browser_context (BrowserContext): The browser context
         page (Page): The page instance
     """
@@ -31,7 +30,6 @@ class Browser:
     ) -> None:
         self.user_agent = user_agent
         self.random_user_agent = random_user_agent
-        self.playwright: Playwright = None
         self.browser_instance: Browser | None = None
         self.browser_context: BrowserContext = None
         self.page: Page = None
@@ -54,40 +52,20 @@ class Browser:
         await self.close_browser()
     
     async def init_browser(self) -> Browser:
-        self.playwright = await async_playwright().start()
-
         if self.ws_endpoint:
-            for _ in range(10):
-                try:
-                    browser_instance = await self.playwright.chromium.connect(
-                        self.ws_endpoint, 
-                        timeout = 1230000, 
-                        slow_mo = self.slow_mo
-                    )
-                    self.browser_instance = browser_instance
-                    break
-                except Exception as e:
-                    print(f"Browser not ready yet: {e}")
-                    await asyncio.sleep(3)
-            
-            else:
-                raise RuntimeError("Failed to connect to browser instance")
-    
-            self.browser_context = await self.browser_instance.new_context(
-                user_agent = self.user_agent
+            self.browser_context, self.page = await context_pool.acquire(
+                self.ws_endpoint,
+                user_agent = self.user_agent,
+                slow_mo = self.slow_mo
             )
-
-            stealth = Stealth()
-            await stealth.apply_stealth_async(self.browser_context)
-            self.page = await self.browser_context.new_page()
-            await self.page.set_viewport_size({'width': 1920, 'height': 1080})
-            await self.page.goto('about:blank') # default page to be opened
+            self.browser_instance = self.browser_context.browser
 
         return self
 
     async def close_browser(self) -> None:
         """
-        Closes the browser instance and releases resources.
+        Closes the session's page and context. The shared connection and driver
+        are left running for the next session.
         """
 
         try:
@@ -99,12 +77,6 @@ class Browser:
                 await self.browser_context.close()
                 self.browser_context = None
 
-            if self.browser_instance:
-                await self.browser_instance.close_browser()
-                self.browser_instance = None
-
-            if self.playwright:
-                await self.playwright.stop()
-                self.playwright = None
+            self.browser_instance = None
         except Exception as e:
             print(f"Error closing browser: {e}")
\ No newline at end of file
@@ -0,0 +1,105 @@
+import asyncio
+from playwright.async_api import (
+    Playwright,
+    Browser as PlaywrightBrowser,
+    async_playwright
+)
+
+class BrowserManager:
+    """
+    Owns the Playwright driver and the browser connections of the worker process.
+
+    A single driver subprocess is started lazily and every ws endpoint keeps one
+    persistent connection which is shared by all the sessions running on it.
+    Sessions only create and dispose of their own BrowserContext.
+
+    Attributes:
+        playwright (Playwright): The shared Playwright driver
+        connections (dict[str, PlaywrightBrowser]): Connected browsers keyed by ws endpoint
+    """
+
+    def __init__(self, connect_retries: int = 10, retry_delay: float = 3) -> None:
+        self.playwright: Playwright | None = None
+        self.connections: dict[str, PlaywrightBrowser] = {}
+        self.connect_retries = connect_retries
+        self.retry_delay = retry_delay
+        self._driver_lock = asyncio.Lock()
+        self._endpoint_locks: dict[str, asyncio.Lock] = {}
+
+    async def get_playwright(self) -> Playwright:
+        """
+        Returns the shared driver, starting it on first use.
+        """
+
+        if self.playwright is None:
+            async with self._driver_lock:
+                if self.playwright is None:
+                    self.playwright = await async_playwright().start()
+        return self.playwright
+
+    async def get_browser(self, ws_endpoint: str, slow_mo: float = None) -> PlaywrightBrowser:
+        """
+        Returns the persistent connection to the given ws endpoint, (re)connecting
+        if there is none or the previous one was dropped.
+
+        Args:
+            ws_endpoint (str): The websocket endpoint of the browser instance
+            slow_mo (float): Slows down Playwright operations, only used when connecting
+
+        Returns:
+            PlaywrightBrowser: The connected browser
+        """
+
+        browser = self.connections.get(ws_endpoint)
+        if browser is not None and browser.is_connected():
+            return browser
+
+        lock = self._endpoint_locks.setdefault(ws_endpoint, asyncio.Lock())
+        async with lock:
+            browser = self.connections.get(ws_endpoint)
+            if browser is not None and browser.is_connected():
+                return browser
+
+            playwright = await self.get_playwright()
+            for _ in range(self.connect_retries):
+                try:
+                    browser = await playwright.chromium.connect(
+                        ws_endpoint,
+                        timeout = 1230000,
+                        slow_mo = slow_mo
+                    )
+                    break
+                except Exception as e:
+                    print(f"Browser not ready yet: {e}")
+                    await asyncio.sleep(self.retry_delay)
+            else:
+                raise RuntimeError("Failed to connect to browser instance")
+
+            browser.on("disconnected", lambda _browser: self._forget(ws_endpoint, _browser))
+            self.connections[ws_endpoint] = browser
+            return browser
+
+    def _forget(self, ws_endpoint: str, browser: PlaywrightBrowser) -> None:
+        if self.connections.get(ws_endpoint) is browser:
+            del self.connections[ws_endpoint]
+
+    async def close(self) -> None:
+        """
+        Closes every connection and stops the driver, meant for process shutdown.
+        """
+
+        for ws_endpoint, browser in list(self.connections.items()):
+            try:
+                await browser.close()
+            except Exception as e:
+                print(f"Error closing browser connection {ws_endpoint}: {e}")
+        self.connections.clear()
+
+        if self.playwright is not None:
+            try:
+                await self.playwright.stop()
+            except Exception as e:
+                print(f"Error stopping playwright: {e}")
+            self.playwright = None
+
+browser_manager = BrowserManager()
@@ -0,0 +1,134 @@
+import asyncio
+import time
+from collections import deque
+from playwright.async_api import BrowserContext, Page
+from playwright_stealth import Stealth
+from .manager import BrowserManager, browser_manager
+
+DEFAULT_VIEWPORT = {'width': 1920, 'height': 1080}
+
+class ContextPool:
+    """
+    Keeps a few ready-to-use contexts per ws endpoint, with stealth, the viewport
+    and a blank page already set up, and refills them in the background.
+    A context is handed out once and closed by its session, never reused.
+    Ready contexts are not counted by the ws endpoint leases, so a browser holds up to
+    `size` of them on top of its BROWSER_POOL_SIZE sessions. They are closed once idle
+    for `max_idle` seconds, an endpoint without traffic holds none.
+
+    Attributes:
+        manager (BrowserManager): Provides the shared browser connections
+        size (int): Number of ready contexts to keep per ws endpoint
+        max_idle (float): Seconds a ready context is kept before it is closed
+    """
+
+    def __init__(self, manager: BrowserManager, size: int = 2, max_idle: float = 120) -> None:
+        self.manager = manager
+        self.size = size
+        self.max_idle = max_idle
+        # (context, page, monotonic time it was made ready), oldest first
+        self._ready: dict[str, deque[tuple[BrowserContext, Page, float]]] = {}
+        self._refills: dict[str, asyncio.Task] = {}
+        self._reapers: dict[str, asyncio.Task] = {}
+
+    async def create_context(
+            self,
+            ws_endpoint: str,
+            user_agent: str = None,
+            slow_mo: float = None
+        ) -> tuple[BrowserContext, Page]:
+        """
+        Creates a stealth-patched context with a blank page, bypassing the pool.
+        """
+
+        browser = await self.manager.get_browser(ws_endpoint, slow_mo = slow_mo)
+        context = await browser.new_context(user_agent = user_agent, viewport = DEFAULT_VIEWPORT)
+        try:
+            await Stealth().apply_stealth_async(context)
+            page = await context.new_page()
+            await page.goto('about:blank')
+        except Exception:
+            await context.close()
+            raise
+        return context, page
+
+    async def acquire(
+            self,
+            ws_endpoint: str,
+            user_agent: str = None,
+            slow_mo: float = None
+        ) -> tuple[BrowserContext, Page]:
+        """
+        Takes a ready context for the endpoint, or creates one if the pool is empty.
+        Contexts with a custom user agent are always created on demand.
+
+        Returns:
+            tuple[BrowserContext, Page]: The context and its page
+        """
+
+        if user_agent is None:
+            ready = self._ready.setdefault(ws_endpoint, deque())
+            self._refill(ws_endpoint)
+            while ready:
+                context, page, _created = ready.popleft()
+                if self._is_usable(context, page):
+                    return context, page
+                await self._discard(context)
+
+        return await self.create_context(ws_endpoint, user_agent = user_agent, slow_mo = slow_mo)
+
+    def _is_usable(self, context: BrowserContext, page: Page) -> bool:
+        browser = context.browser
+        return browser is not None and browser.is_connected() and not page.is_closed()
+
+    async def _discard(self, context: BrowserContext) -> None:
+        try:
+            await context.close()
+        except Exception:
+            pass
+
+    def _refill(self, ws_endpoint: str) -> None:
+        task = self._refills.get(ws_endpoint)
+        if self.size <= 0 or (task is not None and not task.done()):
+            return
+        self._refills[ws_endpoint] = asyncio.create_task(self._fill(ws_endpoint))
+
+    async def _fill(self, ws_endpoint: str) -> None:
+        ready = self._ready.setdefault(ws_endpoint, deque())
+        while len(ready) < self.size:
+            try:
+                context, page = await self.create_context(ws_endpoint)
+            except Exception as e:
+                print(f"Error pre-warming browser context for {ws_endpoint}: {e}")
+                return
+            ready.append((context, page, time.monotonic()))
+            reaper = self._reapers.get(ws_endpoint)
+            if reaper is None or reaper.done():
+                self._reapers[ws_endpoint] = asyncio.create_task(self._reap(ws_endpoint))
+
+    async def _reap(self, ws_endpoint: str) -> None:
+        ready = self._ready.setdefault(ws_endpoint, deque())
+        while ready:
+            expires = ready[0][2] + self.max_idle
+            if time.monotonic() < expires:
+                await asyncio.sleep(expires - time.monotonic())
+                continue
+            context, _page, _created = ready.popleft()
+            await self._discard(context)
+
+    async def close(self) -> None:
+        """
+        Stops refilling and closes every idle context, meant for process shutdown.
+        """
+
+        for task in [*self._refills.values(), *self._reapers.values()]:
+            task.cancel()
+        self._refills.clear()
+        self._reapers.clear()
+
+        for ready in self._ready.values():
+            while ready:
+                context, _page, _created = ready.popleft()
+                await self._discard(context)
+
+context_pool = ContextPool(browser_manager)
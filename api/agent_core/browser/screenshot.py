@@ -0,0 +1,151 @@
+from playwright.async_api import Page
+from dataclasses import dataclass
+from typing import Optional
+from ..workers import cpu_pool
+import hashlib
+import io
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+FORMATS = ('png', 'jpeg', 'webp')
+
+@dataclass(frozen = True)
+class ScreenshotOptions:
+    """
+    How the step screenshots are captured and encoded.
+
+    Attributes:
+        format (str): 'png', 'jpeg' or 'webp' (webp needs Pillow, jpeg is used without it)
+        quality (int): Quality of the lossy formats, 1-100
+        max_width (Optional[int]): Wider screenshots are downscaled to this width (needs Pillow)
+        full_page (bool): Capture the whole scrollable page instead of the viewport
+        dedupe_distance (Optional[int]): Frames whose perceptual hash differs from the last sent
+            one by at most this many bits are skipped, None sends every frame
+    """
+
+    format: str = 'jpeg'
+    quality: int = 60
+    max_width: Optional[int] = 1280
+    full_page: bool = False
+    dedupe_distance: Optional[int] = 0
+
+@dataclass
+class Screenshot:
+    """
+    An encoded screenshot.
+
+    Attributes:
+        data (bytes): The image
+        mime_type (str): MIME type of the image
+    """
+
+    data: bytes
+    mime_type: str
+
+def difference_hash(image) -> int:
+    """
+    64-bit dHash: the brightness gradients of a 9x8 grayscale thumbnail. Unchanged or
+    near-identical frames (a blinking cursor, a spinner) land within a few bits.
+    """
+
+    pixels = list(image.convert('L').resize((9, 8), Image.BILINEAR).getdata())
+    value = 0
+    for row in range(8):
+        for column in range(8):
+            left = pixels[row * 9 + column]
+            value = (value << 1) | (left > pixels[row * 9 + column + 1])
+    return value
+
+def process_screenshot(raw: bytes, options: ScreenshotOptions, last_hash: Optional[int]) -> tuple[int, Optional[bytes]]:
+    """
+    Hashes, downscales and re-encodes a captured screenshot with Pillow, meant for a
+    worker thread (Pillow releases the GIL while resizing and encoding).
+
+    Returns:
+        tuple[int, Optional[bytes]]: The perceptual hash and the encoded image,
+            None when the frame is a near duplicate of the last one
+    """
+
+    image = Image.open(io.BytesIO(raw))
+    image_hash = difference_hash(image)
+    if (
+        last_hash is not None and options.dedupe_distance is not None
+        and (image_hash ^ last_hash).bit_count() <= options.dedupe_distance
+    ):
+        return image_hash, None
+
+    resized = options.max_width and image.width > options.max_width
+    if resized:
+        height = max(1, round(image.height * options.max_width / image.width))
+        image = image.resize((options.max_width, height), Image.LANCZOS)
+    if not resized and options.format != 'webp':
+        # Playwright already encoded it in the requested format
+        return image_hash, raw
+
+    output = io.BytesIO()
+    if options.format == 'png':
+        image.save(output, format = 'PNG', optimize = True)
+    elif options.format == 'webp':
+        image.save(output, format = 'WEBP', quality = options.quality, method = 4)
+    else:
+        image.convert('RGB').save(output, format = 'JPEG', quality = options.quality, optimize = True)
+    return image_hash, output.getvalue()
+
+class ScreenshotEncoder:
+    """
+    Captures the step screenshots of a session in the configured format and skips
+    frames which look the same as the last one sent.
+
+    Attributes:
+        options (ScreenshotOptions): Capture and encoding options
+    """
+
+    def __init__(self, options: Optional[ScreenshotOptions] = None) -> None:
+        self.options = options or ScreenshotOptions()
+        self._last_hash: Optional[int] = None
+        self._last_digest: Optional[bytes] = None
+
+    @property
+    def format(self) -> str:
+        if self.options.format == 'webp' and Image is None:
+            return 'jpeg'
+        return self.options.format if self.options.format in FORMATS else 'jpeg'
+
+    async def capture(self, page: Page) -> Optional[Screenshot]:
+        """
+        Captures the page.
+
+        Args:
+            page (Page): The page to capture
+
+        Returns:
+            Optional[Screenshot]: The screenshot, None if it is a near duplicate of the last one
+        """
+
+        image_format = self.format
+        # WebP is encoded from a lossless capture, jpeg straight from the browser
+        capture_type = 'jpeg' if image_format == 'jpeg' else 'png'
+        raw = await page.screenshot(
+            type = capture_type,
+            quality = self.options.quality if capture_type == 'jpeg' else None,
+            full_page = self.options.full_page,
+            scale = 'css'
+        )
+
+        if Image is not None:
+            image_hash, data = await cpu_pool.run_in_thread(process_screenshot, raw, self.options, self._last_hash)
+            if data is None:
+                return None
+            self._last_hash = image_hash
+        else:
+            # Without Pillow only byte-identical frames are skipped
+            digest = hashlib.blake2b(raw, digest_size = 16).digest()
+            if self.options.dedupe_distance is not None and digest == self._last_digest:
+                return None
+            self._last_digest = digest
+            data = raw
+
+        return Screenshot(data = data, mime_type = f'image/{image_format}')
@@ -0,0 +1,153 @@
+from playwright.async_api import Page, Request, Error as PlaywrightError
+from urllib.parse import urlsplit
+from typing import Optional
+import asyncio
+import time
+
+# Requests which never finish or do not change the page
+IGNORED_RESOURCE_TYPES = {'websocket', 'eventsource', 'media', 'ping', 'manifest'}
+
+# Analytics, ads and session-recording hosts, whose beacons keep pages from ever being idle
+TRACKER_HOSTS = (
+    'google-analytics.com', 'googletagmanager.com', 'doubleclick.net', 'googlesyndication.com',
+    'googleadservices.com', 'facebook.net', 'facebook.com/tr', 'connect.facebook.net', 'hotjar.com',
+    'segment.io', 'segment.com', 'mixpanel.com', 'amplitude.com', 'clarity.ms', 'bing.com/bat',
+    'newrelic.com', 'nr-data.net', 'sentry.io', 'datadoghq.com', 'fullstory.com', 'intercom.io',
+    'criteo.com', 'taboola.com', 'outbrain.com', 'adnxs.com', 'scorecardresearch.com', 'quantserve.com'
+)
+
+# Resolves once no node or text has changed for `quietMs`, or with false at `timeoutMs`.
+# Attribute changes are left out, animations and carousels update them continuously.
+DOM_QUIET_SCRIPT = """([quietMs, timeoutMs]) => new Promise(resolve => {
+    const start = performance.now();
+    let last = start;
+    const observer = new MutationObserver(() => { last = performance.now(); });
+    observer.observe(document, { subtree: true, childList: true, characterData: true });
+    const check = () => {
+        const now = performance.now();
+        if (now - last >= quietMs || now - start >= timeoutMs) {
+            observer.disconnect();
+            resolve(now - last >= quietMs);
+        } else {
+            setTimeout(check, Math.max(10, Math.min(quietMs - (now - last), timeoutMs - (now - start))));
+        }
+    };
+    setTimeout(check, quietMs);
+})"""
+
+def is_tracker(url: str) -> bool:
+    parts = urlsplit(url)
+    address = f"{parts.hostname or ''}{parts.path}"
+    return any(host in address for host in TRACKER_HOSTS)
+
+class PageSettler:
+    """
+    Waits for a page to settle after an action: the document parsed, no request in
+    flight which matters (trackers, streams and requests open longer than
+    `long_request` are ignored) and no DOM change for `quiet_ms`.
+    The timeout adapts to how long the page has been taking to settle.
+
+    Attributes:
+        page (Page): The page to watch
+        quiet_ms (int): How long the DOM must stay unchanged
+        long_request (float): Seconds after which an open request is considered long-polling
+        min_timeout (float): Lower bound of the adaptive timeout in seconds
+        max_timeout (float): Upper bound of the adaptive timeout in seconds
+        timeout (float): Current timeout in seconds
+        last_duration (float): How long the last wait took in seconds
+        last_settled (bool): Whether the last wait ended settled rather than timed out
+    """
+
+    POLL_INTERVAL = 0.05
+    # Weight of the newest wait in the moving average of the settle durations
+    SMOOTHING = 0.3
+
+    def __init__(
+            self,
+            page: Page,
+            quiet_ms: int = 300,
+            long_request: float = 3.0,
+            min_timeout: float = 3.0,
+            max_timeout: float = 10.0
+        ) -> None:
+        self.page = page
+        self.quiet_ms = quiet_ms
+        self.long_request = long_request
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.timeout = (min_timeout + max_timeout) / 2
+        self.last_duration = 0.0
+        self.last_settled = True
+        self._average: Optional[float] = None
+        self._requests: dict[Request, float] = {}
+
+        page.on('request', self._on_request)
+        page.on('requestfinished', self._on_request_done)
+        page.on('requestfailed', self._on_request_done)
+
+    def _on_request(self, request: Request) -> None:
+        if request.resource_type in IGNORED_RESOURCE_TYPES or is_tracker(request.url):
+            return
+        self._requests[request] = time.monotonic()
+
+    def _on_request_done(self, request: Request) -> None:
+        self._requests.pop(request, None)
+
+    def pending_requests(self) -> int:
+        """
+        Number of requests in flight which the page may still be waiting for.
+        """
+
+        now = time.monotonic()
+        # Requests which were never reported done are dropped eventually
+        stale = [request for request, started in self._requests.items() if now - started > 60]
+        for request in stale:
+            del self._requests[request]
+        return sum(1 for started in self._requests.values() if now - started < self.long_request)
+
+    async def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Waits until the page settles or the timeout passes.
+
+        Args:
+            timeout (Optional[float]): Seconds to wait at most, defaults to the adaptive timeout
+
+        Returns:
+            bool: True if the page settled, False if the wait timed out
+        """
+
+        start = time.monotonic()
+        deadline = start + (timeout or self.timeout)
+        settled = False
+        try:
+            await self.page.wait_for_load_state('domcontentloaded', timeout = max(1, (deadline - time.monotonic()) * 1000))
+            while time.monotonic() < deadline:
+                while self.pending_requests() and time.monotonic() < deadline:
+                    await asyncio.sleep(self.POLL_INTERVAL)
+
+                remaining_ms = (deadline - time.monotonic()) * 1000
+                if remaining_ms <= 0:
+                    break
+                try:
+                    quiet = await self.page.evaluate(DOM_QUIET_SCRIPT, [self.quiet_ms, remaining_ms])
+                except PlaywrightError:
+                    # Navigated while waiting, wait for the new document
+                    await self.page.wait_for_load_state('domcontentloaded', timeout = max(1, (deadline - time.monotonic()) * 1000))
+                    continue
+                if quiet and not self.pending_requests():
+                    settled = True
+                    break
+        except PlaywrightError:
+            pass
+
+        self._adapt(time.monotonic() - start, settled)
+        return settled
+
+    def _adapt(self, duration: float, settled: bool) -> None:
+        self.last_duration = duration
+        self.last_settled = settled
+        self._average = duration if self._average is None else (
+            self.SMOOTHING * duration + (1 - self.SMOOTHING) * self._average
+        )
+        # Three times the usual settle time leaves room for slower steps on the same site
+        self.timeout = min(self.max_timeout, max(self.min_timeout, 3 * self._average))
@@ -0,0 +1,162 @@
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, Optional, Protocol
+import hashlib
+import json
+import re
+import time
+
+class CacheBackend(Protocol):
+    """
+    Optional second tier of a ResultCache, shared between processes (e.g. Redis or disk).
+    Values are JSON strings, expiring after `ttl` seconds.
+    """
+
+    async def get(self, key: str) -> Optional[str]: ...
+
+    async def set(self, key: str, value: str, ttl: int) -> None: ...
+
+@dataclass
+class CacheStats:
+    """
+    Counters of a ResultCache.
+
+    Attributes:
+        hits (int): Lookups answered by either tier
+        backend_hits (int): Lookups answered by the second tier only
+        misses (int): Lookups answered by neither
+        evictions (int): Entries dropped from memory to stay within the bounds
+        entries (int): Entries currently in memory
+        bytes (int): Approximate size of the entries in memory
+    """
+    hits: int = 0
+    backend_hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    entries: int = 0
+    bytes: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def to_dict(self) -> dict:
+        return {**asdict(self), 'hit_rate': round(self.hit_rate, 4)}
+
+class ResultCache:
+    """
+    Content-addressed cache of JSON-serializable results: an in-memory LRU tier with
+    a TTL, bounded by entry count and total size, in front of an optional backend.
+
+    Attributes:
+        ttl (int): Seconds an entry stays valid
+        max_entries (int): Maximum number of entries kept in memory
+        max_bytes (int): Maximum total size of the serialized entries kept in memory
+        backend (Optional[CacheBackend]): Second tier, looked up on a memory miss
+        stats (CacheStats): Hit, miss and eviction counters
+    """
+
+    def __init__(
+            self,
+            ttl: int = 900,
+            max_entries: int = 512,
+            max_bytes: int = 32 * 1024 * 1024,
+            backend: Optional[CacheBackend] = None
+        ) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.backend = backend
+        self.stats = CacheStats()
+        # key -> (expires at, serialized size, value), least recently used first
+        self._entries: OrderedDict[str, tuple[float, int, Any]] = OrderedDict()
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """Hashes the parts (anything JSON-serializable) into a cache key."""
+        payload = json.dumps(parts, sort_keys = True, ensure_ascii = False, default = str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    async def get(self, key: str) -> Any:
+        """
+        Returns the cached value, or None on a miss.
+        """
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.stats.hits += 1
+                return entry[2]
+            self._remove(key)
+
+        if self.backend is not None:
+            try:
+                raw = await self.backend.get(key)
+            except Exception as e:
+                print(f"Error reading the result cache backend: {e}")
+                raw = None
+            if raw is not None:
+                value = json.loads(raw)
+                self._store(key, value, len(raw))
+                self.stats.hits += 1
+                self.stats.backend_hits += 1
+                return value
+
+        self.stats.misses += 1
+        return None
+
+    async def set(self, key: str, value: Any) -> None:
+        """
+        Caches a value in memory and in the backend. None values are not cached.
+        """
+
+        if value is None:
+            return
+        raw = json.dumps(value, ensure_ascii = False)
+        self._store(key, value, len(raw))
+
+        if self.backend is not None:
+            try:
+                await self.backend.set(key, raw, self.ttl)
+            except Exception as e:
+                print(f"Error writing the result cache backend: {e}")
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.stats.entries = 0
+        self.stats.bytes = 0
+
+    def _store(self, key: str, value: Any, size: int) -> None:
+        if key in self._entries:
+            self._remove(key)
+        if size > self.max_bytes:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl, size, value)
+        self.stats.entries += 1
+        self.stats.bytes += size
+
+        while self.stats.entries > self.max_entries or self.stats.bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.stats.evictions += 1
+
+    def _remove(self, key: str) -> None:
+        _expires, size, _value = self._entries.pop(key)
+        self.stats.entries -= 1
+        self.stats.bytes -= size
+
+def normalize_markdown(markdown: str) -> str:
+    """Collapses whitespace so that layout-only differences map to the same cache key."""
+    return re.sub(r'\s+', ' ', markdown).strip()
+
+def scraper_cache_key(markdown: str, user_input: str, schema: Optional[Dict[str, Any]], model: str, prompt: str = '') -> str:
+    """
+    Cache key of a scraper result: the normalized markdown, the query, the output
+    schema, the model and the system prompt it was scraped with.
+    """
+    return ResultCache.make_key(normalize_markdown(markdown), user_input.strip(), schema, model, prompt)
+
+# Shared by every session of the process, configured at startup
+scraper_cache = ResultCache()
@@ -0,0 +1,88 @@
+from typing import Optional
+import asyncio
+import json
+import os
+import time
+
+class RedisCacheBackend:
+    """
+    Stores the entries in Redis with an expiry, shared by every worker.
+
+    Attributes:
+        client: A redis.asyncio client
+        prefix (str): Prefix of the keys
+    """
+
+    def __init__(self, client, prefix: str = 'scraper-cache:') -> None:
+        self.client = client
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Optional[str]:
+        return await self.client.get(self.prefix + key)
+
+    async def set(self, key: str, value: str, ttl: int) -> None:
+        await self.client.set(self.prefix + key, value, ex = ttl)
+
+class DiskCacheBackend:
+    """
+    Stores the entries as JSON files in a directory, shared by the workers of a host.
+    The oldest files are pruned once there are more than `max_files`.
+
+    Attributes:
+        directory (str): Directory of the cache files
+        max_files (int): Number of files above which the oldest are deleted
+    """
+
+    PRUNE_EVERY = 64
+
+    def __init__(self, directory: str, max_files: int = 4096) -> None:
+        self.directory = directory
+        self.max_files = max_files
+        self._writes = 0
+        os.makedirs(directory, exist_ok = True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _read(self, key: str) -> Optional[str]:
+        try:
+            with open(self._path(key), 'r', encoding = 'utf-8') as f:
+                entry = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if entry['expires'] < time.time():
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+            return None
+        return entry['value']
+
+    def _write(self, key: str, value: str, ttl: int) -> None:
+        # Written to a temporary file first so that readers never see a partial entry
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding = 'utf-8') as f:
+            json.dump({'expires': time.time() + ttl, 'value': value}, f, ensure_ascii = False)
+        os.replace(tmp_path, path)
+
+        self._writes += 1
+        if self._writes % self.PRUNE_EVERY == 0:
+            self._prune()
+
+    def _prune(self) -> None:
+        files = [entry for entry in os.scandir(self.directory) if entry.name.endswith('.json')]
+        if len(files) <= self.max_files:
+            return
+        files.sort(key = lambda entry: entry.stat().st_mtime)
+        for entry in files[:len(files) - self.max_files]:
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+
+    async def get(self, key: str) -> Optional[str]:
+        return await asyncio.to_thread(self._read, key)
+
+    async def set(self, key: str, value: str, ttl: int) -> None:
+        await asyncio.to_thread(self._write, key, value, ttl)
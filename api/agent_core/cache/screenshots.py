@@ -0,0 +1,216 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+import asyncio
+import hashlib
+import os
+import re
+import time
+
+SESSION_PATTERN = re.compile(r'^[A-Za-z0-9-]{1,64}$')
+
+# File extension of the stored images by MIME type, the directory is the index in disk mode
+EXTENSIONS = {'image/jpeg': 'jpg', 'image/png': 'png', 'image/webp': 'webp'}
+MIME_TYPES = {extension: mime_type for mime_type, extension in EXTENSIONS.items()}
+
+@dataclass
+class StoredScreenshot:
+    """
+    A screenshot kept by the store.
+
+    Attributes:
+        mime_type (str): MIME type of the image
+        etag (str): Content hash, for conditional requests
+        size (int): Size of the image in bytes
+        created (float): When it was stored, as a unix timestamp
+        data (Optional[bytes]): The image, None when it is kept on disk
+    """
+
+    mime_type: str
+    etag: str
+    size: int
+    created: float
+    data: Optional[bytes] = None
+
+class ScreenshotStore:
+    """
+    Bounded store of the step screenshots, keyed by session and step, so the agent
+    stream only carries a reference and the image is fetched separately.
+    Images are kept in memory, or as files in `directory`. Every screenshot is
+    dropped past `ttl`, and past `max_bytes` the least recently used ones in
+    memory, the oldest files on disk. Files are found and pruned by their name and
+    modification time alone, so they outlive a restart and every worker sharing
+    the directory can serve them.
+
+    Attributes:
+        ttl (int): Seconds a screenshot is kept
+        max_bytes (int): Approximate size limit of the stored images
+        directory (Optional[str]): Directory of the image files, None keeps them in memory
+        url_prefix (str): Path the screenshots are served under
+    """
+
+    def __init__(
+            self,
+            ttl: int = 3600,
+            max_bytes: int = 64 * 1024 * 1024,
+            directory: Optional[str] = None,
+            url_prefix: str = '/agent/screenshots'
+        ) -> None:
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.url_prefix = url_prefix
+        self._entries: OrderedDict[tuple[str, int], StoredScreenshot] = OrderedDict()
+        self._bytes = 0
+        # Files and bytes in the directory as of the last pruning
+        self._disk_entries = 0
+        self._disk_bytes = 0
+
+    def _path(self, key: tuple[str, int], extension: str) -> str:
+        return os.path.join(self.directory, f"{key[0]}_{key[1]}.{extension}")
+
+    async def put(self, session: str, step: int, data: bytes, mime_type: str) -> str:
+        """
+        Stores the screenshot of a step, replacing any previous one.
+
+        Returns:
+            str: The URL path the screenshot is served at
+        """
+
+        if not SESSION_PATTERN.match(session):
+            raise ValueError(f"Invalid session id: {session!r}")
+
+        key = (session, step)
+        if self.directory:
+            await asyncio.to_thread(self._write, key, EXTENSIONS.get(mime_type, 'jpg'), data)
+            await asyncio.to_thread(self._prune)
+            return f"{self.url_prefix}/{session}/{step}"
+
+        await self._remove(key)
+        entry = StoredScreenshot(
+            mime_type = mime_type,
+            etag = hashlib.blake2b(data, digest_size = 16).hexdigest(),
+            size = len(data),
+            created = time.time(),
+            data = data
+        )
+        self._entries[key] = entry
+        self._bytes += entry.size
+        await self._evict()
+        return f"{self.url_prefix}/{session}/{step}"
+
+    async def get(self, session: str, step: int) -> Optional[tuple[StoredScreenshot, bytes]]:
+        """
+        Returns:
+            Optional[tuple[StoredScreenshot, bytes]]: The entry and the image, None if unknown or expired
+        """
+
+        if not SESSION_PATTERN.match(session):
+            return None
+
+        key = (session, step)
+        if self.directory:
+            return await asyncio.to_thread(self._read, key)
+
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.created + self.ttl < time.time():
+            await self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry, entry.data
+
+    async def _evict(self) -> None:
+        now = time.time()
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if self._bytes <= self.max_bytes and entry.created + self.ttl >= now:
+                break
+            await self._remove(key)
+
+    async def _remove(self, key: tuple[str, int]) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+    def _write(self, key: tuple[str, int], extension: str, data: bytes) -> None:
+        os.makedirs(self.directory, exist_ok = True)
+        path = self._path(key, extension)
+        # A step captured again in another format replaces the earlier file
+        for other in MIME_TYPES:
+            if other != extension:
+                self._unlink(self._path(key, other))
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, 'wb') as f:
+            f.write(data)
+        os.replace(temporary, path)
+
+    def _read(self, key: tuple[str, int]) -> Optional[tuple[StoredScreenshot, bytes]]:
+        for extension, mime_type in MIME_TYPES.items():
+            path = self._path(key, extension)
+            try:
+                with open(path, 'rb') as f:
+                    modified = os.fstat(f.fileno()).st_mtime
+                    if modified + self.ttl < time.time():
+                        break
+                    data = f.read()
+            except FileNotFoundError:
+                continue
+            return StoredScreenshot(
+                mime_type = mime_type,
+                etag = hashlib.blake2b(data, digest_size = 16).hexdigest(),
+                size = len(data),
+                created = modified
+            ), data
+        else:
+            return None
+        self._unlink(path)
+        return None
+
+    def _prune(self) -> None:
+        """
+        Deletes the expired files, then the oldest ones until the directory fits in `max_bytes`.
+        """
+
+        now = time.time()
+        files = []
+        try:
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    try:
+                        info = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    if entry.name.endswith('.tmp'):
+                        # Left behind by a crashed write
+                        if info.st_mtime + 60 < now:
+                            self._unlink(entry.path)
+                    elif info.st_mtime + self.ttl < now:
+                        self._unlink(entry.path)
+                    else:
+                        files.append((info.st_mtime, info.st_size, entry.path))
+        except FileNotFoundError:
+            return
+
+        files.sort()
+        total = sum(size for _, size, _ in files)
+        while files and total > self.max_bytes:
+            _, size, path = files.pop(0)
+            self._unlink(path)
+            total -= size
+        self._disk_entries, self._disk_bytes = len(files), total
+
+    def _unlink(self, path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    @property
+    def stats(self) -> dict:
+        if self.directory:
+            return {'entries': self._disk_entries, 'bytes': self._disk_bytes}
+        return {'entries': len(self._entries), 'bytes': self._bytes}
+
+screenshot_store = ScreenshotStore()
@@ -1,66 +1,313 @@
-from playwright.async_api import Page
+from playwright.async_api import Page, ElementHandle, Locator, Frame
 from .state import DOMState
-from typing import List
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Optional
+import json
 import os
 
+SCRIPT_PATH = os.path.join(os.path.dirname(__file__), 'script.js')
+
+with open(SCRIPT_PATH) as f:
+    DOM_SCRIPT = f.read()
+
+# Defines the extraction helpers once per document under `window.__webAgentDom`,
+# registered as an init script so that every navigation in the context gets them
+# without re-sending the source on each observation.
+INSTALL_SCRIPT = f"""(() => {{
+    if (window.__webAgentDom) return;
+{DOM_SCRIPT}
+    window.__webAgentDom = {{ getElements, getElementsDelta, resolveElement, mark_page, unmark_page }};
+}})();"""
+
+GET_ELEMENTS_SCRIPT = "(categories) => window.__webAgentDom ? window.__webAgentDom.getElements(document.body, categories) : null"
+GET_ELEMENTS_DELTA_SCRIPT = "([reset, categories]) => window.__webAgentDom ? window.__webAgentDom.getElementsDelta(reset, categories) : null"
+RESOLVE_ELEMENT_SCRIPT = "(id) => window.__webAgentDom ? window.__webAgentDom.resolveElement(id) : null"
+
+# DOMState key -> key used by the extraction script
+CATEGORIES = {
+    'interactive_elements': 'interactiveElements',
+    'informative_elements': 'informativeElements',
+    'scrollable_elements': 'scrollableElements'
+}
+
+# Compact prompt encoding: rough characters per token used for the token budget
+# (no tokenizer round trip), and the length limits of the free text fields
+CHARS_PER_TOKEN = 4
+NAME_LIMIT = 80
+CONTENT_LIMIT = 200
+ATTRIBUTE_LIMIT = 60
+CLASS_LIMIT = 2
+
+FORM_TAGS = {'input', 'textarea', 'select', 'button', 'option'}
+HEADING_TAGS = {'h1', 'h2', 'h3', 'h4', 'h5', 'h6'}
+
+def compact_text(text: str | None, limit: int) -> str:
+    """Collapses whitespace and cuts the text to `limit` characters."""
+    text = ' '.join((text or '').split())
+    return text if len(text) <= limit else text[:limit - 1] + '…'
+
+def element_priority(element: dict) -> int:
+    """
+    Rank of an element when the prompt has to be truncated, lower is kept first:
+    form controls and headings, then named links and widgets, then other named
+    elements, then elements with nothing to read.
+    """
+
+    tag = element.get('tag')
+    label = element.get('name') or element.get('content')
+    has_label = bool(label) and label != 'none'
+    if tag in FORM_TAGS or tag in HEADING_TAGS:
+        return 0
+    if has_label and (tag == 'a' or element.get('role', 'none') != 'none'):
+        return 1
+    return 2 if has_label else 3
+
 class DOM:
     """
     DOM class for managing DOM instances.
 
+    In incremental mode the page keeps track of DOM mutations between two
+    observations and only sends back the elements which were added, changed
+    or removed, which are then merged into the elements cached here.
+
+    Every reported element is registered in the page under its id, which lets
+    tools act on it with `element` without evaluating its xpath again.
+
     Attributes:
         page (Page): The page instance to use for the DOM
+        incremental (bool): Whether to observe the page incrementally
+        xpaths (dict[int, str]): Xpath of every element reported in the current document, keyed by id
     """
 
-    def __init__(self, page: Page) -> None:
+    def __init__(self, page: Page, incremental: bool = True) -> None:
         self.page = page
+        self.incremental = incremental
+        self.xpaths: dict[int, str] = {}
+        self._installed = False
+        self._elements: dict[str, dict[int, dict]] | None = None
+        page.on('framenavigated', self._on_navigated)
+
+    def _on_navigated(self, frame: Frame) -> None:
+        # Ids restart in every document, an xpath of the previous page would point at an unrelated element
+        if frame == self.page.main_frame:
+            self.xpaths.clear()
+
+    async def install(self) -> None:
+        """
+        Registers the extraction script on the page's context and in the current document.
+        """
+
+        if self._installed:
+            return
+        await self.page.context.add_init_script(INSTALL_SCRIPT)
+        await self.page.evaluate(INSTALL_SCRIPT)
+        self._installed = True
+
+    async def _evaluate_elements(self, script_categories: List[str]) -> dict:
+        all_elements = await self.page.evaluate(GET_ELEMENTS_SCRIPT, script_categories)
+        if all_elements is None:
+            # Document created before the init script was registered (e.g. about:blank)
+            await self.page.evaluate(INSTALL_SCRIPT)
+            all_elements = await self.page.evaluate(GET_ELEMENTS_SCRIPT, script_categories)
+        return all_elements
+
+    async def _evaluate_delta(self, script_categories: List[str]) -> dict:
+        reset = self._elements is None or list(self._elements) != script_categories
+        delta = await self.page.evaluate(GET_ELEMENTS_DELTA_SCRIPT, [reset, script_categories])
+        if delta is None:
+            await self.page.evaluate(INSTALL_SCRIPT)
+            delta = await self.page.evaluate(GET_ELEMENTS_DELTA_SCRIPT, [True, script_categories])
+        return self._merge_delta(delta, script_categories)
+
+    def _merge_delta(self, delta: dict, script_categories: List[str]) -> dict:
+        """
+        Applies a delta from `getElementsDelta` to the cached elements and returns
+        the full element lists in document order.
+        """
+
+        if delta.get('full') or self._elements is None:
+            self._elements = {
+                key: {element['id']: element for element in delta.get(key, [])}
+                for key in script_categories
+            }
+            return {key: delta.get(key, []) for key in script_categories}
+
+        all_elements = {}
+        for key in script_categories:
+            elements = self._elements[key]
+            for element_id in delta['removed'][key]:
+                elements.pop(element_id, None)
+            for element in delta['added'][key] + delta['changed'][key]:
+                elements[element['id']] = element
+            all_elements[key] = [elements[element_id] for element_id in delta['order'][key] if element_id in elements]
+        return all_elements
+
+    async def get_state(self, categories: Optional[List[str]] = None) -> DOMState | Exception:
+        """
+        Extracts the elements of the page.
 
-    async def get_state(self) -> DOMState | Exception:
+        Args:
+            categories (Optional[List[str]]): DOMState keys to extract, e.g. ['interactive_elements'].
+                Categories which are not requested are not traversed in the page and are returned empty.
+                Defaults to all of them.
+        """
+
+        requested = categories or CATEGORIES
+        script_categories = [script_key for key, script_key in CATEGORIES.items() if key in requested]
         try:
-            script_path = os.path.join(os.path.dirname(__file__), 'script.js')
-            with open(script_path) as f:
-                script = f.read()
-            
-            await self.page.wait_for_load_state('networkidle', timeout=10000)
-            all_elements = await self.page.evaluate(f"""{script}\ngetElements()""") 
+            await self.install()
+            if self.incremental:
+                all_elements = await self._evaluate_delta(script_categories)
+            else:
+                all_elements = await self._evaluate_elements(script_categories)
             
+            for elements in all_elements.values():
+                self.xpaths.update((element['id'], element['xpath']) for element in elements)
+
             return DOMState(
                 interactive_elements = all_elements.get('interactiveElements', []),
                 informative_elements = all_elements.get('informativeElements', []),
                 scrollable_elements = all_elements.get('scrollableElements', [])
             )
         except Exception as e:
+            # Start over with a full observation next time
+            self._elements = None
             return e
 
+    @asynccontextmanager
+    async def element(self, element_id: Optional[int] = None, xpath: Optional[str] = None) -> AsyncIterator[ElementHandle | Locator]:
+        """
+        Resolves an element reported by `get_state` from the page-side registry, falling
+        back to a locator on its xpath when the handle is stale (e.g. the node was replaced).
+
+        Args:
+            element_id (Optional[int]): Id of the element in the page state
+            xpath (Optional[str]): Xpath of the element, defaults to the one reported with the id
+
+        Yields:
+            ElementHandle | Locator: The element, the handle is disposed of on exit
+        """
+
+        handle = None
+        if element_id is not None:
+            handle = await self.page.evaluate_handle(RESOLVE_ELEMENT_SCRIPT, element_id)
+            if handle.as_element() is None:
+                await handle.dispose()
+                handle = None
+
+        if handle is None:
+            xpath = xpath or self.xpaths.get(element_id)
+            if not xpath:
+                raise ValueError(f"Element {element_id} is not on the page anymore, and no xpath was given")
+            yield self.page.locator(f'xpath={xpath}')
+            return
+
+        try:
+            yield handle.as_element()
+        finally:
+            await handle.dispose()
+
     async def get_interactive_elements(self) -> List[dict]:
         """Returns the raw interactive elements as a list of dictionaries."""
-        state = await self.get_state()
+        state = await self.get_state(['interactive_elements'])
         return state.get('interactive_elements', [])
 
     async def get_informative_elements(self) -> List[dict]:
         """Returns the raw informative elements as a list of dictionaries."""
-        state = await self.get_state()
+        state = await self.get_state(['informative_elements'])
         return state.get('informative_elements', [])
 
     async def get_scrollable_elements(self) -> List[dict]:
         """Returns the raw scrollable elements as a list of dictionaries."""
-        state = await self.get_state()
+        state = await self.get_state(['scrollable_elements'])
         return state.get('scrollable_elements', [])
 
     async def get_formatted_interactive_elements(self) -> str:
-        raw_elements = await self.get_state()
+        raw_elements = await self.get_state(['interactive_elements'])
         return self.format_elements_for_prompt(raw_elements.get('interactive_elements', []))
 
     async def get_formatted_informative_elements(self) -> str:
-        raw_elements = await self.get_state()
+        raw_elements = await self.get_state(['informative_elements'])
         return self.format_elements_for_prompt(raw_elements.get('informative_elements', []))
 
     async def get_formatted_scrollable_elements(self) -> str:
-        raw_elements = await self.get_state()
+        raw_elements = await self.get_state(['scrollable_elements'])
         return self.format_elements_for_prompt(raw_elements.get('scrollable_elements', []))
 
-    def format_elements_for_prompt(self, elements: List[dict]) -> str:
-        """Helper method to convert a list of element dicts into a string."""
-        return '\n'.join([self.to_prompt_string(element, i) for i, element in enumerate(elements)])
+    def format_elements_for_prompt(
+            self,
+            elements: List[dict],
+            compact: bool = False,
+            token_budget: Optional[int] = None,
+            include_xpath: bool = True
+        ) -> str:
+        """
+        Converts a list of element dicts into a string for the prompt.
+
+        Args:
+            elements (List[dict]): Elements of one DOMState category
+            compact (bool): Use the compact encoding of `to_compact_string`
+            token_budget (Optional[int]): Approximate token limit of the compact encoding. Elements are
+                dropped by `element_priority` (document order breaks ties) until the rest fits.
+            include_xpath (bool): Whether the compact encoding keeps the xpath of the elements
+
+        Returns:
+            str: One line per element, in document order
+        """
+
+        if not compact:
+            return '\n'.join([self.to_prompt_string(element, i) for i, element in enumerate(elements)])
+
+        lines = [self.to_compact_string(element, include_xpath) for element in elements]
+        if token_budget is None or sum(len(line) + 1 for line in lines) <= token_budget * CHARS_PER_TOKEN:
+            return '\n'.join(lines)
+
+        # Leave room for the note about the omitted elements
+        budget = token_budget * CHARS_PER_TOKEN - 64
+        kept = set()
+        for i in sorted(range(len(elements)), key = lambda i: (element_priority(elements[i]), i)):
+            budget -= len(lines[i]) + 1
+            if budget < 0:
+                break
+            kept.add(i)
+
+        omitted = len(elements) - len(kept)
+        return '\n'.join([line for i, line in enumerate(lines) if i in kept] +
+                         [f"... {omitted} more elements omitted to fit the token budget"])
+
+    def to_compact_string(self, element: dict, include_xpath: bool = True) -> str:
+        """
+        Short single-line encoding of an element: `[id] tag role "name" attributes @x,y xpath`.
+        Empty fields and the role 'none' are left out, attributes repeating the name or role are
+        dropped, long values are cut and only the first classes are kept.
+        """
+
+        parts = [f"[{element.get('id')}]", element.get('tag') or '']
+
+        role = element.get('role')
+        if role and role not in ('none', element.get('tag')):
+            parts.append(role)
+
+        label = element.get('content') if 'content' in element else element.get('name')
+        label = compact_text(label, CONTENT_LIMIT if 'content' in element else NAME_LIMIT)
+        if label and label != 'none':
+            parts.append(json.dumps(label, ensure_ascii = False))
+
+        for key, value in (element.get('attributes') or {}).items():
+            value = compact_text(value, ATTRIBUTE_LIMIT)
+            if key == 'role' or value in (label, role):
+                continue
+            if key == 'class':
+                value = ' '.join(value.split(' ')[:CLASS_LIMIT])
+            parts.append(f"{key}={json.dumps(value, ensure_ascii = False)}" if value else key)
+
+        center = element.get('center')
+        if center:
+            parts.append(f"@{round(center['x'])},{round(center['y'])}")
+
+        if include_xpath and element.get('xpath'):
+            parts.append(element['xpath'])
+        return ' '.join(parts)
 
     def to_prompt_string(self, element: dict, index: int) -> str:
         if 'content' in element:
@@ -0,0 +1,458 @@
+"""
+Streaming HTML to markdown conversion, following the output of `markdownify` with its
+default options, without building a tree. The HTML is tokenized by lxml's C parser
+(or the standard library parser when lxml is not installed) and every element is
+converted as soon as it is closed.
+
+Unlike `markdownify(strip=[...])`, the text inside scripts, styles and other
+non-content elements is dropped instead of being kept as plain text.
+"""
+from ..workers import cpu_pool
+from html.parser import HTMLParser
+from typing import Optional
+import re
+
+try:
+    from lxml import etree
+except ImportError:
+    etree = None
+
+re_whitespace = re.compile(r'[\t ]+')
+re_all_whitespace = re.compile(r'[\t \r\n]+')
+re_newline_whitespace = re.compile(r'[\t \r\n]*[\r\n][\t \r\n]*')
+re_line_with_content = re.compile(r'^(.*)', flags = re.MULTILINE)
+re_extract_newlines = re.compile(r'^(\n*)((?:.*[^\n])?)(\n*)$', flags = re.DOTALL)
+re_backtick_runs = re.compile(r'`+')
+re_pre_lstrip = re.compile(r'^[ \n]*\n')
+re_pre_rstrip = re.compile(r'[ \n]*$')
+
+HEADINGS = {'h1', 'h2', 'h3', 'h4', 'h5', 'h6'}
+
+# Whitespace right inside / outside these elements is not significant
+BLOCK_ELEMENTS = HEADINGS | {
+    'p', 'blockquote', 'article', 'div', 'section', 'ol', 'ul', 'li', 'dl', 'dt', 'dd',
+    'table', 'thead', 'tbody', 'tfoot', 'tr', 'td', 'th'
+}
+
+# Elements whose content is never part of the page text
+SKIPPED_ELEMENTS = {
+    'script', 'style', 'noscript', 'template', 'iframe', 'object', 'embed',
+    'svg', 'canvas', 'head', 'title', 'link', 'meta'
+}
+
+VOID_ELEMENTS = {
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta',
+    'param', 'source', 'track', 'wbr'
+}
+
+TEXT = '#text'
+
+def _remove_inside(name: Optional[str]) -> bool:
+    return name in BLOCK_ELEMENTS
+
+def _remove_outside(name: Optional[str]) -> bool:
+    return name in BLOCK_ELEMENTS or name == 'pre'
+
+def _chomp(text: str) -> tuple[str, str, str]:
+    prefix = ' ' if text and text[0] == ' ' else ''
+    suffix = ' ' if text and text[-1] == ' ' else ''
+    return prefix, suffix, text.strip()
+
+def _colspan(attrs: dict) -> int:
+    colspan = attrs.get('colspan') or ''
+    return max(1, min(1000, int(colspan))) if colspan.isdigit() else 1
+
+class _Frame:
+    """An open element: its attributes, context and already converted children."""
+
+    __slots__ = (
+        'name', 'attrs', 'parent_tags', 'child_tags', 'children', 'elements',
+        'li_count', 'ul_depth', 'cells', 'has_thead', 'tr_count', 'first_in_parent'
+    )
+
+    def __init__(self, name: str, attrs: dict, parent: Optional['_Frame']) -> None:
+        self.name = name
+        self.attrs = attrs
+        self.parent_tags = parent.child_tags if parent else frozenset()
+        child_tags = set(self.parent_tags)
+        child_tags.add(name)
+        if name in HEADINGS or name in ('td', 'th'):
+            child_tags.add('_inline')
+        if name in ('pre', 'code', 'kbd', 'samp'):
+            child_tags.add('_noformat')
+        self.child_tags = frozenset(child_tags)
+        # (name, converted text), name is TEXT for text nodes
+        self.children: list[list] = []
+        self.elements = 0
+        self.li_count = 0
+        self.ul_depth = (parent.ul_depth if parent else 0) + (name == 'ul')
+        self.cells: list[tuple[str, int]] = []
+        self.has_thead = False
+        self.tr_count = 0
+        self.first_in_parent = parent is None or parent.elements == 0
+
+class MarkdownBuilder:
+    """
+    Parser target which receives start/end/data events and builds the markdown.
+    Works as an lxml parser target and is driven by `_StdlibDriver` otherwise.
+    """
+
+    def __init__(self) -> None:
+        self._stack = [_Frame('[document]', {}, None)]
+        self._skip_depth = 0
+        self._result = None
+
+    def start(self, tag: str, attrib) -> None:
+        tag = tag.lower()
+        if self._skip_depth:
+            if tag not in VOID_ELEMENTS:
+                self._skip_depth += 1
+            return
+        if tag in SKIPPED_ELEMENTS:
+            if tag not in VOID_ELEMENTS:
+                self._skip_depth = 1
+            return
+
+        parent = self._stack[-1]
+        frame = _Frame(tag, dict(attrib), parent)
+        self._on_open(frame, parent)
+        parent.elements += 1
+        self._stack.append(frame)
+        if tag in VOID_ELEMENTS:
+            self._close()
+
+    def end(self, tag: str) -> None:
+        tag = tag.lower()
+        if self._skip_depth:
+            if tag not in VOID_ELEMENTS:
+                self._skip_depth -= 1
+            return
+        if tag in VOID_ELEMENTS or tag in SKIPPED_ELEMENTS:
+            return
+        # Close everything left open inside the element (only happens without lxml)
+        if not any(frame.name == tag for frame in self._stack[1:]):
+            return
+        while self._stack[-1].name != tag:
+            self._close()
+        self._close()
+
+    def data(self, data: str) -> None:
+        if self._skip_depth or not data:
+            return
+        children = self._stack[-1].children
+        if children and children[-1][0] == TEXT:
+            children[-1][1] += data
+        else:
+            children.append([TEXT, data])
+
+    def comment(self, text: str) -> None:
+        pass
+
+    def close(self) -> str:
+        if self._result is None:
+            while len(self._stack) > 1:
+                self._close()
+            self._result = self._render(self._stack[0]).strip('\n')
+        return self._result
+
+    def _on_open(self, frame: _Frame, parent: _Frame) -> None:
+        if frame.name == 'li':
+            frame.attrs['_index'] = parent.li_count
+            frame.attrs['_ordered'] = parent.name == 'ol'
+            frame.attrs['_start'] = parent.attrs.get('start')
+            parent.li_count += 1
+        elif frame.name == 'tr':
+            frame.attrs['_first_row'] = parent.elements == 0
+            frame.attrs['_parent'] = parent.name
+            frame.attrs['_parent_first'] = parent.first_in_parent
+            frame.attrs['_thead_row'] = parent.name == 'thead' and parent.tr_count == 0
+            table = self._stack[-2] if parent.name in ('thead', 'tbody', 'tfoot') and len(self._stack) > 1 else parent
+            frame.attrs['_has_thead'] = table.has_thead
+            parent.tr_count += 1
+        elif frame.name in ('td', 'th'):
+            for open_frame in reversed(self._stack):
+                if open_frame.name == 'tr':
+                    open_frame.cells.append((frame.name, _colspan(frame.attrs)))
+                    break
+        elif frame.name == 'thead':
+            parent.has_thead = True
+
+    def _close(self) -> None:
+        frame = self._stack.pop()
+        self._stack[-1].children.append([frame.name, self._render(frame)])
+
+    def _render(self, frame: _Frame) -> str:
+        children = frame.children
+        child_tags = frame.child_tags
+        remove_inside = _remove_inside(frame.name)
+        in_pre = 'pre' in child_tags
+        count = len(children)
+
+        strings = []
+        for i, (name, value) in enumerate(children):
+            previous = children[i - 1][0] if i > 0 else None
+            following = children[i + 1][0] if i + 1 < count else None
+
+            if name == TEXT:
+                if not value.strip():
+                    if remove_inside and (i == 0 or i == count - 1):
+                        continue
+                    if _remove_outside(previous) or _remove_outside(following):
+                        continue
+                value = self._process_text(value, child_tags, remove_inside, i, count, previous, following)
+            elif name in ('ul', 'ol') and 'li' not in child_tags:
+                # A list followed by other content is separated from it by a blank line
+                for next_name, next_value in children[i + 1:]:
+                    if next_name != TEXT or next_value.strip():
+                        if next_name not in ('ul', 'ol'):
+                            value += '\n'
+                        break
+            if value:
+                strings.append(value)
+
+        if not in_pre:
+            collapsed = ['']
+            for string in strings:
+                leading, content, trailing = re_extract_newlines.match(string).groups()
+                if collapsed[-1] and leading:
+                    previous_trailing = collapsed.pop()
+                    leading = '\n' * min(2, max(len(previous_trailing), len(leading)))
+                collapsed.extend((leading, content, trailing))
+            strings = collapsed
+
+        return self._convert(frame, ''.join(strings))
+
+    @staticmethod
+    def _process_text(text: str, child_tags: frozenset, remove_inside: bool, index: int, count: int,
+                      previous: Optional[str], following: Optional[str]) -> str:
+        if 'pre' not in child_tags:
+            text = re_newline_whitespace.sub('\n', text)
+            text = re_whitespace.sub(' ', text)
+        if '_noformat' not in child_tags:
+            text = text.replace('*', r'\*').replace('_', r'\_')
+        if _remove_outside(previous) or (remove_inside and index == 0):
+            text = text.lstrip(' \t\r\n')
+        if _remove_outside(following) or (remove_inside and index == count - 1):
+            text = text.rstrip()
+        return text
+
+    def _convert(self, frame: _Frame, text: str) -> str:
+        name = frame.name
+        parent_tags = frame.parent_tags
+        inline = '_inline' in parent_tags
+        noformat = '_noformat' in parent_tags
+
+        if name in ('p', 'div', 'article', 'section', 'dl'):
+            if inline:
+                return ' ' + text.strip(' \t\r\n') + ' '
+            text = text.strip(' \t\r\n') if name == 'p' else text.strip()
+            return f'\n\n{text}\n\n' if text else ''
+
+        if name in HEADINGS:
+            if inline:
+                return text
+            text = text.strip()
+            if name in ('h1', 'h2'):
+                text = text.rstrip()
+                return f"\n\n{text}\n{('=' if name == 'h1' else '-') * len(text)}\n\n" if text else ''
+            return f"\n\n{'#' * int(name[1])} {re_all_whitespace.sub(' ', text)}\n\n"
+
+        if name in ('b', 'strong', 'em', 'i', 'del', 's'):
+            if noformat:
+                return text
+            prefix, suffix, text = _chomp(text)
+            if not text:
+                return ''
+            markup = '**' if name in ('b', 'strong') else '*' if name in ('em', 'i') else '~~'
+            return f'{prefix}{markup}{text}{markup}{suffix}'
+
+        if name == 'a':
+            if noformat:
+                return text
+            prefix, suffix, text = _chomp(text)
+            if not text:
+                return ''
+            href = frame.attrs.get('href')
+            title = frame.attrs.get('title')
+            if text.replace(r'\_', '_') == href and not title:
+                return f'<{href}>'
+            title_part = ' "%s"' % title.replace('"', r'\"') if title else ''
+            return f'{prefix}[{text}]({href}{title_part}){suffix}' if href else text
+
+        if name in ('code', 'kbd', 'samp'):
+            if noformat:
+                return text
+            prefix, suffix, text = _chomp(text)
+            if not text:
+                return ''
+            max_backticks = max((len(run) for run in re_backtick_runs.findall(text)), default = 0)
+            delimiter = '`' * (max_backticks + 1)
+            if max_backticks > 0:
+                text = f' {text} '
+            return f'{prefix}{delimiter}{text}{delimiter}{suffix}'
+
+        if name == 'pre':
+            if not text:
+                return ''
+            text = re_pre_rstrip.sub('', re_pre_lstrip.sub('', text))
+            return f'\n\n```\n{text}\n```\n\n'
+
+        if name == 'br':
+            return ' ' if inline else '  \n'
+
+        if name == 'hr':
+            return '\n\n---\n\n'
+
+        if name == 'img':
+            alt = frame.attrs.get('alt') or ''
+            if inline:
+                return alt
+            src = frame.attrs.get('src') or ''
+            title = frame.attrs.get('title') or ''
+            title_part = ' "%s"' % title.replace('"', r'\"') if title else ''
+            return f'![{alt}]({src}{title_part})'
+
+        if name == 'blockquote':
+            text = (text or '').strip(' \t\r\n')
+            if inline:
+                return ' ' + text + ' '
+            if not text:
+                return '\n'
+            text = re_line_with_content.sub(lambda match: '> ' + match.group(1) if match.group(1) else '>', text)
+            return '\n' + text + '\n\n'
+
+        if name in ('ul', 'ol'):
+            if 'li' in parent_tags:
+                return '\n' + text.rstrip()
+            # The blank line before following content is added by the parent
+            return '\n\n' + text
+
+        if name == 'li':
+            text = (text or '').strip()
+            if not text:
+                return '\n'
+            if frame.attrs['_ordered']:
+                start = frame.attrs['_start']
+                start = int(start) if start and str(start).isnumeric() else 1
+                bullet = f"{start + frame.attrs['_index']}. "
+            else:
+                bullet = '*+-'[(frame.ul_depth - 1) % 3] + ' '
+            indent = ' ' * len(bullet)
+            text = re_line_with_content.sub(lambda match: indent + match.group(1) if match.group(1) else '', text)
+            return bullet + text[len(bullet):] + '\n'
+
+        if name == 'dt':
+            text = re_all_whitespace.sub(' ', (text or '').strip())
+            if inline:
+                return ' ' + text + ' '
+            return f'\n\n{text}\n' if text else '\n'
+
+        if name == 'dd':
+            text = (text or '').strip()
+            if inline:
+                return ' ' + text + ' '
+            if not text:
+                return '\n'
+            text = re_line_with_content.sub(lambda match: '    ' + match.group(1) if match.group(1) else '', text)
+            return ':' + text[1:] + '\n'
+
+        if name == 'table':
+            return '\n\n' + text.strip() + '\n\n'
+
+        if name == 'caption':
+            return text.strip() + '\n\n'
+
+        if name == 'figcaption':
+            return '\n\n' + text.strip() + '\n\n'
+
+        if name in ('td', 'th'):
+            return ' ' + text.strip().replace('\n', ' ') + ' |' * _colspan(frame.attrs)
+
+        if name == 'tr':
+            return self._convert_tr(frame, text)
+
+        if name == 'q':
+            return '"' + text + '"'
+
+        if name in ('sub', 'sup'):
+            prefix, suffix, text = _chomp(text)
+            return f'{prefix}{text}{suffix}' if text else ''
+
+        return text
+
+    @staticmethod
+    def _convert_tr(frame: _Frame, text: str) -> str:
+        attrs = frame.attrs
+        cells = frame.cells
+        is_first_row = attrs['_first_row']
+        parent = attrs['_parent']
+        is_headrow = all(cell == 'th' for cell, _colspan in cells) or attrs['_thead_row']
+        is_head_row_missing = (
+            (is_first_row and parent != 'tbody')
+            or (is_first_row and parent == 'tbody' and not attrs['_has_thead'])
+        )
+        full_colspan = sum(colspan for _cell, colspan in cells)
+
+        overline = underline = ''
+        if is_headrow and is_first_row:
+            underline = '| ' + ' | '.join(['---'] * full_colspan) + ' |\n'
+        elif is_head_row_missing or (is_first_row and (parent == 'table' or (parent == 'tbody' and attrs['_parent_first']))):
+            overline = '| ' + ' | '.join([''] * full_colspan) + ' |\n'
+            overline += '| ' + ' | '.join(['---'] * full_colspan) + ' |\n'
+        return overline + '|' + text + '\n' + underline
+
+class _StdlibDriver(HTMLParser):
+    """Feeds a MarkdownBuilder from the standard library parser, used without lxml."""
+
+    def __init__(self, builder: MarkdownBuilder) -> None:
+        super().__init__(convert_charrefs = True)
+        self.builder = builder
+
+    def handle_starttag(self, tag, attrs):
+        self.builder.start(tag, {key: value or '' for key, value in attrs})
+
+    def handle_startendtag(self, tag, attrs):
+        self.builder.start(tag, {key: value or '' for key, value in attrs})
+        if tag.lower() not in VOID_ELEMENTS:
+            self.builder.end(tag)
+
+    def handle_endtag(self, tag):
+        self.builder.end(tag)
+
+    def handle_data(self, data):
+        self.builder.data(data)
+
+def html_to_markdown(html: str) -> str:
+    """
+    Converts an HTML document or fragment to markdown.
+
+    Args:
+        html (str): The HTML, e.g. the inner HTML of the body
+
+    Returns:
+        str: The markdown
+    """
+
+    builder = MarkdownBuilder()
+    if etree is not None:
+        parser = etree.HTMLParser(target = builder, remove_comments = True, remove_pis = True)
+        # libxml2 refuses empty input
+        parser.feed(html or ' ')
+        return parser.close()
+
+    driver = _StdlibDriver(builder)
+    driver.feed(html)
+    driver.close()
+    return builder.close()
+
+async def convert_html_to_markdown(html: str, inline_chars: int = 20000) -> str:
+    """
+    Converts the HTML in the shared worker processes, so converting a long page does
+    not block the event loop (and every other session) for its whole duration.
+    Documents up to `inline_chars` are converted inline, where the round trip would
+    cost more than the conversion.
+    """
+
+    if len(html) <= inline_chars:
+        return html_to_markdown(html)
+    return await cpu_pool.run_in_process(html_to_markdown, html)
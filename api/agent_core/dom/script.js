@@ -44,6 +44,8 @@ const SAFE_ATTRIBUTES = new Set([
 
 const labels = [];
 
+const ALL_CATEGORIES = ['interactiveElements', 'informativeElements', 'scrollableElements'];
+
 function getXPath(element) {
     if (!element || element.nodeType !== Node.ELEMENT_NODE) return "";
     let parts = [];
@@ -65,6 +67,21 @@ function getXPath(element) {
     return "/" + parts.join("/");
 }
 
+// XPaths are built top-down during the traversal: every traversed element gets a
+// node holding its parent's node and its own `tag[index]` segment, and the full
+// string is only joined (and memoized) for the elements which are reported.
+// A node can also point at an element directly, which falls back to getXPath.
+const SHADOW_ROOT_XPATH = { xpath: '' };
+
+function resolveXPath(xpathNode) {
+    if (xpathNode.xpath === undefined) {
+        xpathNode.xpath = xpathNode.element
+            ? getXPath(xpathNode.element)
+            : resolveXPath(xpathNode.parent) + '/' + xpathNode.segment;
+    }
+    return xpathNode.xpath;
+}
+
 function waitForPageToLoad() {
     return new Promise((resolve, reject) => {
         if (document.readyState === 'complete') {
@@ -75,153 +92,224 @@ function waitForPageToLoad() {
     });
 } 
 
-// Extract visible elements
-async function getElements(node=document.body) {
-    const interactiveElements = [];
-    const informativeElements = [];
-    const scrollableElements = [];
-    // Function to wait for the page to be fully loaded
-    await waitForPageToLoad();
+// Stable per-element ids, used to match elements between two observations
+const elementIds = new WeakMap();
+let nextElementId = 1;
 
-    function isElementVisible(element) {
-        let type = element.getAttribute('type');
-        // The radio and checkbox elements are all ready invisible so we can skip them
-        if(new Set(['radio', 'checkbox']).has(type)) return true;
-        const style = window.getComputedStyle(element);
-        const onScreen = element.offsetWidth > 0 && element.offsetHeight > 0;
-        return style.display !== 'none' &&
-        style.visibility !== 'hidden' &&
-        style.opacity !== '0' && 
-        !element.hasAttribute('hidden') &&
-        onScreen;
-    }
-
-    function isElementScrollable(element) {
-        const style = window.getComputedStyle(element);
-        const isOverflow = /(auto|scroll|overlay)/.test(style.overflowY);
-        const isScrollable = element.scrollHeight > element.clientHeight;
-        const isBigEnough = element.clientHeight >= 0.5*window.innerHeight;
-        return isOverflow && isScrollable && isBigEnough;
-    }
-
-    function isElementInViewport(element) {
-        if (!element || element.offsetParent === null) {
-            return false; // Hidden elements (display: none)
-        }
+function getElementId(element) {
+    let id = elementIds.get(element);
+    if (id === undefined) {
+        id = nextElementId++;
+        elementIds.set(element, id);
+    }
+    return id;
+}
 
-        const rect = element.getBoundingClientRect();
-        const style = window.getComputedStyle(element);
-        const windowHeight = window.innerHeight || document.documentElement.clientHeight;
-        const windowWidth = window.innerWidth || document.documentElement.clientWidth;
-    
-        // Always consider fixed elements in the viewport if they have dimensions
-        if (style.position === "fixed") {
-            return rect.width > 0 && rect.height > 0;
-        }
-        // Sticky elements: Check if they are visible inside their parent
-        if (style.position === "sticky") {
-            const parent = element.offsetParent;
-            if (parent) {
-                const parentRect = parent.getBoundingClientRect();
-                if (rect.bottom < parentRect.top || rect.top > parentRect.bottom) {
-                    return false; // Sticky element is outside its parent's view
-                }
+// Registry of the reported elements keyed by id, so that tools can act on an
+// element by its id without evaluating its xpath again
+const elementRegistry = new Map();
+
+function registerElement(id, element) {
+    elementRegistry.set(id, new WeakRef(element));
+}
+
+function resolveElement(id) {
+    const element = elementRegistry.get(id)?.deref();
+    if (element && element.isConnected) return element;
+    elementRegistry.delete(id);
+    return null;
+}
+
+function pruneElementRegistry() {
+    for (const [id, ref] of elementRegistry) {
+        const element = ref.deref();
+        if (!element || !element.isConnected) elementRegistry.delete(id);
+    }
+}
+
+function isElementVisible(element, style) {
+    let type = element.getAttribute('type');
+    // The radio and checkbox elements are all ready invisible so we can skip them
+    if(new Set(['radio', 'checkbox']).has(type)) return true;
+    const onScreen = element.offsetWidth > 0 && element.offsetHeight > 0;
+    return style.display !== 'none' &&
+    style.visibility !== 'hidden' &&
+    style.opacity !== '0' && 
+    !element.hasAttribute('hidden') &&
+    onScreen;
+}
+
+function isElementScrollable(element, style) {
+    const isOverflow = /(auto|scroll|overlay)/.test(style.overflowY);
+    const isScrollable = element.scrollHeight > element.clientHeight;
+    const isBigEnough = element.clientHeight >= 0.5*window.innerHeight;
+    return isOverflow && isScrollable && isBigEnough;
+}
+
+function isElementInViewport(element, style, rect) {
+    if (!element || element.offsetParent === null) {
+        return false; // Hidden elements (display: none)
+    }
+
+    const windowHeight = window.innerHeight || document.documentElement.clientHeight;
+    const windowWidth = window.innerWidth || document.documentElement.clientWidth;
+
+    // Always consider fixed elements in the viewport if they have dimensions
+    if (style.position === "fixed") {
+        return rect.width > 0 && rect.height > 0;
+    }
+    // Sticky elements: Check if they are visible inside their parent
+    if (style.position === "sticky") {
+        const parent = element.offsetParent;
+        if (parent) {
+            const parentRect = parent.getBoundingClientRect();
+            if (rect.bottom < parentRect.top || rect.top > parentRect.bottom) {
+                return false; // Sticky element is outside its parent's view
             }
         }
-        // Check if any part of the element is inside the viewport
-        return (
-            rect.bottom >= 0 &&
-            rect.right >= 0 &&
-            rect.top <= windowHeight &&
-            rect.left <= windowWidth
-        );
-    }
-
-    function isElementClickable(element) {
-        const style = window.getComputedStyle(element);
-        const isPointer = style.cursor === 'pointer';
-        const hasAttributeWithValue = (attr) => {
-            const value = element.getAttribute(attr);
-            return value !== null && value.trim().length > 0;
-        };
-        const isClickable = isPointer || Array('onclick', 'v-on:click', '@click', "ng-click").some(e=>hasAttributeWithValue(e));
-        const hasEvents= Array('onfocus', 'onblur', 'onchange', 'oninput', 'onkeydown', 'onkeyup', 'onmousedown', 'onmouseup').some(e=>hasAttributeWithValue(e))
-        const isLink=Array('href', 'download').some(e=>hasAttributeWithValue(e))
-        const isContentEditable = element.isContentEditable|| element.hasAttribute('contenteditable')==='true';
-        const hasAttribute=Array('data-tooltip', 'data-testid','title').some(e=>hasAttributeWithValue(e))
-        return isClickable||isLink||isContentEditable||hasAttribute||hasEvents
-    }
-
-    function isElementCovered(element) {
-        let type = element.getAttribute('type');
-        // The radio and checkbox elements are all ready covered so we can skip them
-        if(new Set(['radio', 'checkbox']).has(type)) return false;
-        // Get the bounding box of the element to find its center point
-        const boundingBox = element.getBoundingClientRect();
-        const x = boundingBox.left + boundingBox.width / 2;
-        const y = boundingBox.top + boundingBox.height / 2;
-        // Get the top element under the center of the current element
-        const topElement = document.elementFromPoint(x, y);
-        // If no element is found at the point, return false (no element is covering it)
-        if (!topElement) return false;
-        // Compare if topElement is inside the current element
-        const isInside = element.contains(topElement);
-        // If topElement is inside the current element, it means it's not covered by it
-        if (isInside) return false;        
-        return true;  // If no coverage, return true
-    }
-
-    function traverseDom(currentNode) {
-        if (!currentNode) return;
-        if (currentNode.nodeType !== Node.ELEMENT_NODE) return;
-
-        const tagName = currentNode.tagName.toLowerCase();
-        if (EXCLUDED_TAGS.has(tagName)) return;
-
-        const role = currentNode.getAttribute('role');
+    }
+    // Check if any part of the element is inside the viewport
+    return (
+        rect.bottom >= 0 &&
+        rect.right >= 0 &&
+        rect.top <= windowHeight &&
+        rect.left <= windowWidth
+    );
+}
+
+function isElementClickable(element, style) {
+    const isPointer = style.cursor === 'pointer';
+    const hasAttributeWithValue = (attr) => {
+        const value = element.getAttribute(attr);
+        return value !== null && value.trim().length > 0;
+    };
+    const isClickable = isPointer || Array('onclick', 'v-on:click', '@click', "ng-click").some(e=>hasAttributeWithValue(e));
+    const hasEvents= Array('onfocus', 'onblur', 'onchange', 'oninput', 'onkeydown', 'onkeyup', 'onmousedown', 'onmouseup').some(e=>hasAttributeWithValue(e))
+    const isLink=Array('href', 'download').some(e=>hasAttributeWithValue(e))
+    const isContentEditable = element.isContentEditable|| element.hasAttribute('contenteditable')==='true';
+    const hasAttribute=Array('data-tooltip', 'data-testid','title').some(e=>hasAttributeWithValue(e))
+    return isClickable||isLink||isContentEditable||hasAttribute||hasEvents
+}
+
+function isElementCovered(element, boundingBox) {
+    let type = element.getAttribute('type');
+    // The radio and checkbox elements are all ready covered so we can skip them
+    if(new Set(['radio', 'checkbox']).has(type)) return false;
+    // Get the center point of the element's bounding box
+    const x = boundingBox.left + boundingBox.width / 2;
+    const y = boundingBox.top + boundingBox.height / 2;
+    // Get the top element under the center of the current element
+    const topElement = document.elementFromPoint(x, y);
+    // If no element is found at the point, return false (no element is covering it)
+    if (!topElement) return false;
+    // Compare if topElement is inside the current element
+    const isInside = element.contains(topElement);
+    // If topElement is inside the current element, it means it's not covered by it
+    if (isInside) return false;        
+    return true;  // If no coverage, return true
+}
+
+function getBoundingBox(rect) {
+    let left = rect.left;
+    let top = rect.top;
+    let width = rect.width;
+    let height = rect.height;
+    let frame = window.frameElement;
+    // If the element is in an iframe, adjust the coordinates
+    while (frame!=null) {
+        let frameRect = frame.getBoundingClientRect();
+        left += frameRect.left;
+        top += frameRect.top;
+        frame = frame.ownerDocument.defaultView?.frameElement;
+    }
+    return { left, top, width, height };
+}
+
+function getElementName(element) {
+    return element.getAttribute('name') || element.getAttribute('aria-label') || element.getAttribute('title') ||
+    element.getAttribute('aria-labelledby') || element.getAttribute('aria-describedby') || 
+    element.getAttribute('label') || element.innerText?.trim() || 'none';
+}
+
+function getSafeAttributes(element) {
+    return Object.fromEntries(
+        Array.from(element.attributes)
+            .filter(attr => SAFE_ATTRIBUTES.has(attr.name))
+            .map(attr => [attr.name, attr.value]));
+}
+
+// Only the requested categories are extracted, `trackElements` also keeps the
+// id -> element mapping, which cannot be returned to Python
+function newCollection(categories = ALL_CATEGORIES, trackElements = false) {
+    const collected = {};
+    for (const category of categories) collected[category] = [];
+    Object.defineProperty(collected, 'categories', { value: new Set(categories), enumerable: false });
+    if (trackElements) Object.defineProperty(collected, 'elements', { value: new Map(), enumerable: false });
+    return collected;
+}
+
+function pushElement(collected, category, element, data) {
+    collected[category].push(data);
+    registerElement(data.id, element);
+    if (collected.elements) collected.elements.set(data.id, element);
+}
+
+// Everything the checks need about an element, read once per element.
+// The bounding rect is only read when a check actually needs it.
+function readFacts(element, xpathNode = { element }) {
+    const style = window.getComputedStyle(element);
+    let rect;
+    return {
+        style,
+        clickable: isElementClickable(element, style),
+        xpathNode,
+        get rect() {
+            if (rect === undefined) rect = element.getBoundingClientRect();
+            return rect;
+        },
+    };
+}
+
+// Whether the traversal goes on into the light DOM children of an element
+function shouldDescend(element, tagName, clickable = isElementClickable(element, window.getComputedStyle(element))) {
+    return !clickable || EXPLORABLE_TAGS.has(tagName);
+}
+
+// Evaluates a single element and pushes it into every requested category it belongs to
+function collectElement(currentNode, tagName, collected, facts = readFacts(currentNode)) {
+    const categories = collected.categories;
+    const style = facts.style;
+    const role = currentNode.getAttribute('role');
+    let isVisible;
+    const checkVisible = () => {
+        if (isVisible === undefined) isVisible = isElementVisible(currentNode, style) && isElementInViewport(currentNode, style, facts.rect);
+        return isVisible;
+    };
+
+    if (categories.has('interactiveElements')) {
         // Checks for standard and non-standard interactive elements
         const hasInteractiveTag = INTERACTIVE_TAGS.has(tagName) || tagName.split('-').some(part => INTERACTIVE_TAGS.has(part));
         const hasInteractiveRole = role && INTERACTIVE_ROLES.has(role);
 
         // Get Interactive Elements
-        const isClickable = isElementClickable(currentNode) || hasInteractiveTag || hasInteractiveRole
-        const isVisible = isElementVisible(currentNode) && isElementInViewport(currentNode)
-        const isScrollable = isElementScrollable(currentNode)
-        if ((isClickable && isVisible)) {
+        const isClickable = facts.clickable || hasInteractiveTag || hasInteractiveRole
+        if ((isClickable && checkVisible())) {
             // Check if the element is covered by another element
-            const isCovered = !isElementCovered(currentNode);
+            const isCovered = !isElementCovered(currentNode, facts.rect);
             if (isCovered) {
-                const rect = currentNode.getBoundingClientRect();
-                let left = rect.left;
-                let top = rect.top;
-                let width = rect.width;
-                let height = rect.height;
-                let frame = window.frameElement;
-                // If the element is in an iframe, adjust the coordinates
-                while (frame!=null) {
-                    let frameRect = frame.getBoundingClientRect();
-                    left += frameRect.left;
-                    top += frameRect.top;
-                    frame = frame.ownerDocument.defaultView?.frameElement;
-                }
-                const tagName = currentNode.tagName.toLowerCase();
-                const boundingBox = { left, top, width, height };
+                const boundingBox = getBoundingBox(facts.rect);
                 const x = Math.floor(boundingBox.left + boundingBox.width / 2);
                 const y = Math.floor(boundingBox.top + boundingBox.height / 2);
-                const xpath=getXPath(currentNode)
+                const xpath=resolveXPath(facts.xpathNode)
                 const role = currentNode.getAttribute('role') || 'none';
-                const name = currentNode.getAttribute('name') || currentNode.getAttribute('aria-label') || currentNode.getAttribute('title') ||
-                currentNode.getAttribute('aria-labelledby') || currentNode.getAttribute('aria-describedby') || 
-                currentNode.getAttribute('label') || currentNode.innerText?.trim() || 'none';
+                const name = getElementName(currentNode);
                 if((role!=='none' || name!=='none'||isClickable)){
-                    interactiveElements.push({
+                    pushElement(collected, 'interactiveElements', currentNode, {
+                        id: getElementId(currentNode),
                         tag: tagName,
                         role: role,  // Default to 'none' if no role is found
                         name: name, // Trim textContent if it exists
-                        attributes: Object.fromEntries(
-                            Array.from(currentNode.attributes)
-                                .filter(attr => SAFE_ATTRIBUTES.has(attr.name))
-                                .map(attr => [attr.name, attr.value])),
+                        attributes: getSafeAttributes(currentNode),
                         box: boundingBox || null,  // Avoid undefined errors
                         center: { x, y },
                         xpath: xpath,
@@ -229,55 +317,39 @@ async function getElements(node=document.body) {
                 }
             }
         }
+    }
 
-        if (isScrollable){
-            const tagName = currentNode.tagName.toLowerCase();
-            const role = currentNode.getAttribute('role') || 'none';
-            const name = currentNode.getAttribute('name') || currentNode.getAttribute('aria-label') || currentNode.getAttribute('title') ||
-            currentNode.getAttribute('aria-labelledby') || currentNode.getAttribute('aria-describedby') || 
-            currentNode.getAttribute('label') || currentNode.innerText?.trim() || 'none';
-            const xpath=getXPath(currentNode)
-            scrollableElements.push({
-                tag: tagName,
-                role: role,  // Default to 'none' if no role is found
-                name: name, // Trim textContent if it exists
-                attributes: Object.fromEntries(
-                    Array.from(currentNode.attributes)
-                        .filter(attr => SAFE_ATTRIBUTES.has(attr.name))
-                        .map(attr => [attr.name, attr.value])),
-                xpath: xpath,
-            });
-        }
+    if (categories.has('scrollableElements') && isElementScrollable(currentNode, style)){
+        const role = currentNode.getAttribute('role') || 'none';
+        const name = getElementName(currentNode);
+        const xpath=resolveXPath(facts.xpathNode)
+        pushElement(collected, 'scrollableElements', currentNode, {
+            id: getElementId(currentNode),
+            tag: tagName,
+            role: role,  // Default to 'none' if no role is found
+            name: name, // Trim textContent if it exists
+            attributes: getSafeAttributes(currentNode),
+            xpath: xpath,
+        });
+    }
 
+    if (categories.has('informativeElements')) {
         const hasInformativeTag = INFORMATIVE_TAGS.has(tagName);
         const hasInformativeRole = role && INFORMATIVE_ROLES.has(role);
-        const hasContent = currentNode.innerText?.trim()!==''
 
-        // Get Informative Elements
-        const isTextual = ((hasInformativeTag || hasInformativeRole) && hasContent) && !isElementClickable(currentNode)
-        if (isTextual && isVisible) {
+        // Get Informative Elements, innerText is only read once the cheap checks passed
+        const isTextual = (hasInformativeTag || hasInformativeRole) && currentNode.innerText?.trim()!=='' && !facts.clickable
+        if (isTextual && checkVisible()) {
             // Check if the element is covered by another element
-            const isCovered = !isElementCovered(currentNode);
+            const isCovered = !isElementCovered(currentNode, facts.rect);
             if (isCovered) {
-                const rect = currentNode.getBoundingClientRect();
-                let left = rect.left;
-                let top = rect.top;
-                let width = rect.width;
-                let height = rect.height;
-                let frame = window.frameElement;
-                // If the element is in an iframe, adjust the coordinates
-                while (frame!=null) {
-                    let frameRect = frame.getBoundingClientRect();
-                    left += frameRect.left;
-                    top += frameRect.top;
-                    frame = frame.ownerDocument.defaultView?.frameElement;
-                }
-                const boundingBox = { left, top, width, height };
+                const boundingBox = getBoundingBox(facts.rect);
                 const x = Math.floor(boundingBox.left + boundingBox.width / 2);
                 const y = Math.floor(boundingBox.top + boundingBox.height / 2);
-                const xpath=getXPath(currentNode)
-                informativeElements.push({
-                    tag: currentNode.tagName.toLowerCase(),
+                const xpath=resolveXPath(facts.xpathNode)
+                pushElement(collected, 'informativeElements', currentNode, {
+                    id: getElementId(currentNode),
+                    tag: tagName,
                     role: role,
                     content: currentNode.innerText?.trim(),
                     center:{x,y},
@@ -285,18 +357,325 @@ async function getElements(node=document.body) {
                 });
             }
         }
-        
-        // Handle shadow DOM
-        const shadowRoot=currentNode.shadowRoot
-        if(shadowRoot){
-            Array.from(shadowRoot.children).forEach(child => traverseDom(child));
+    }
+}
+
+function traverseDom(currentNode, collected, xpathNode = { element: currentNode }) {
+    if (!currentNode) return;
+    if (currentNode.nodeType !== Node.ELEMENT_NODE) return;
+
+    const tagName = currentNode.tagName.toLowerCase();
+    if (EXCLUDED_TAGS.has(tagName)) return;
+
+    const facts = readFacts(currentNode, xpathNode);
+    if (isOverlayStyle(facts.style)) trackOverlay(currentNode, facts.rect);
+    collectElement(currentNode, tagName, collected, facts);
+
+    // Handle shadow DOM
+    const shadowRoot=currentNode.shadowRoot
+    if(shadowRoot){
+        observeShadowRoot(shadowRoot);
+        traverseChildren(shadowRoot.children, collected, SHADOW_ROOT_XPATH);
+    }
+    if(shouldDescend(currentNode, tagName, facts.clickable)){
+        traverseChildren(currentNode.children, collected, xpathNode);
+    }
+}
+
+// Same-tag sibling indices are counted while iterating, instead of walking back
+// over the previous siblings of every element
+function traverseChildren(children, collected, parentXPathNode) {
+    const tagCounts = new Map();
+    for (const child of children) {
+        const index = (tagCounts.get(child.tagName) || 0) + 1;
+        tagCounts.set(child.tagName, index);
+        traverseDom(child, collected, { parent: parentXPathNode, segment: `${child.tagName.toLowerCase()}[${index}]` });
+    }
+}
+
+// Extract visible elements of the given categories
+async function getElements(node=document.body, categories=ALL_CATEGORIES) {
+    // Function to wait for the page to be fully loaded
+    await waitForPageToLoad();
+
+    pruneElementRegistry();
+    const collected = newCollection(categories);
+    traverseDom(node, collected);
+    return { ...collected };
+}
+
+// ---------------------------------------------------------------------------
+// Incremental observation
+// A MutationObserver records the elements touched since the last observation,
+// `getElementsDelta` then only re-traverses those subtrees and returns what
+// was added, changed and removed. Anything which can move elements it did
+// not re-traverse (scrolling, resizing, layout shifts, overlays) falls back
+// to a full traversal.
+// ---------------------------------------------------------------------------
+
+const MAX_DIRTY_ROOTS = 200;
+
+const domTracker = {
+    observer: null,
+    observedRoots: new WeakSet(),
+    dirty: new Set(),
+    snapshot: null,
+    // Positioned elements seen by a traversal, with their rect. Covering is read with
+    // elementFromPoint, so an overlay appearing, moving or going away changes elements
+    // which are not in any dirty subtree.
+    overlays: new WeakMap(),
+    overlaysChanged: false,
+};
+
+function trackOverlay(element, rect) {
+    const key = `${rect.left},${rect.top},${rect.width},${rect.height}`;
+    if (domTracker.overlays.get(element) !== key) {
+        domTracker.overlays.set(element, key);
+        domTracker.overlaysChanged = true;
+    }
+}
+
+function containsOverlay(node) {
+    if (domTracker.overlays.has(node)) return true;
+    for (const element of node.querySelectorAll('*')) {
+        if (domTracker.overlays.has(element)) return true;
+    }
+    return false;
+}
+
+function recordMutations(records) {
+    for (const record of records) {
+        const target = record.target.nodeType === Node.ELEMENT_NODE ? record.target : record.target.parentElement;
+        if (target) domTracker.dirty.add(target);
+        // A removed node has no style anymore, only what was seen of it tells whether it covered anything
+        if (record.type === 'childList' && !domTracker.overlaysChanged) {
+            for (const node of record.removedNodes) {
+                if (node.nodeType === Node.ELEMENT_NODE && containsOverlay(node)) {
+                    domTracker.overlaysChanged = true;
+                    break;
+                }
+            }
+        }
+    }
+}
+
+function startDomTracking() {
+    if (domTracker.observer) return;
+    domTracker.observer = new MutationObserver(recordMutations);
+    domTracker.observer.observe(document, { subtree: true, childList: true, attributes: true, characterData: true });
+}
+
+function observeShadowRoot(shadowRoot) {
+    if (!domTracker.observer || domTracker.observedRoots.has(shadowRoot)) return;
+    domTracker.observedRoots.add(shadowRoot);
+    domTracker.observer.observe(shadowRoot, { subtree: true, childList: true, attributes: true, characterData: true });
+}
+
+// Parent in the composed tree, crossing shadow roots to their host
+function getComposedParent(element) {
+    if (element.parentElement) return element.parentElement;
+    const root = element.getRootNode();
+    return root instanceof ShadowRoot ? root.host : null;
+}
+
+function isInsideAny(element, roots) {
+    for (let node = element; node; node = getComposedParent(node)) {
+        if (roots.has(node)) return true;
+    }
+    return false;
+}
+
+// Whether a full traversal from the body would reach this element
+function isReachable(element) {
+    let node = element;
+    while (node !== document.body) {
+        const parent = getComposedParent(node);
+        if (!parent) return false;
+        const tagName = parent.tagName.toLowerCase();
+        if (EXCLUDED_TAGS.has(tagName)) return false;
+        // Shadow children are always traversed, light DOM children only if the host is explorable
+        if (parent.shadowRoot !== node.getRootNode() && !shouldDescend(parent, tagName)) return false;
+        node = parent;
+    }
+    return true;
+}
+
+function isOverlayStyle(style) {
+    return style.position === 'fixed' || style.position === 'sticky' ||
+        (style.position === 'absolute' && style.zIndex !== 'auto');
+}
+
+function isOverlay(element) {
+    return isOverlayStyle(window.getComputedStyle(element));
+}
+
+function readViewport() {
+    return {
+        scrollX: window.scrollX,
+        scrollY: window.scrollY,
+        width: window.innerWidth,
+        height: window.innerHeight,
+        documentHeight: document.documentElement.scrollHeight,
+    };
+}
+
+function sameViewport(a, b) {
+    return a.scrollX === b.scrollX && a.scrollY === b.scrollY && a.width === b.width &&
+        a.height === b.height && a.documentHeight === b.documentHeight;
+}
+
+function readRect(element) {
+    const rect = element.getBoundingClientRect();
+    return [rect.left, rect.top, rect.width, rect.height];
+}
+
+function sameRect(a, b) {
+    return a[0] === b[0] && a[1] === b[1] && a[2] === b[2] && a[3] === b[3];
+}
+
+// Top-most dirty elements, or null if the changes are too broad for a partial update
+function takeDirtyRoots() {
+    recordMutations(domTracker.observer.takeRecords());
+    const dirty = domTracker.dirty;
+    domTracker.dirty = new Set();
+
+    const connected = new Set();
+    for (const element of dirty) {
+        if (!element.isConnected) continue;
+        if (element === document.body || element === document.documentElement || element === document.head) return null;
+        connected.add(element);
+    }
+
+    const roots = new Set();
+    for (const element of connected) {
+        const parent = getComposedParent(element);
+        if (!parent || !isInsideAny(parent, connected)) roots.add(element);
+    }
+    return roots.size > MAX_DIRTY_ROOTS ? null : roots;
+}
+
+function storeEntry(snapshot, category, element, data) {
+    snapshot.entries[category].set(data.id, { element, data, rect: readRect(element), json: JSON.stringify(data) });
+}
+
+function isTracked(snapshot, id) {
+    return snapshot.categories.some(category => snapshot.entries[category].has(id));
+}
+
+function fullObservation(viewport, categories) {
+    pruneElementRegistry();
+    const collected = newCollection(categories, true);
+    traverseDom(document.body, collected);
+    domTracker.overlaysChanged = false;
+
+    const snapshot = { viewport, categories, entries: {} };
+    for (const category of categories) {
+        snapshot.entries[category] = new Map();
+        for (const data of collected[category]) {
+            storeEntry(snapshot, category, collected.elements.get(data.id), data);
+        }
+    }
+    domTracker.snapshot = snapshot;
+
+    return { full: true, ...collected };
+}
+
+async function getElementsDelta(reset = false, categories = ALL_CATEGORIES) {
+    await waitForPageToLoad();
+    startDomTracking();
+
+    const viewport = readViewport();
+    const snapshot = domTracker.snapshot;
+    const roots = takeDirtyRoots();
+    const overlayRemoved = domTracker.overlaysChanged;
+    domTracker.overlaysChanged = false;
+
+    if (reset || !snapshot || roots === null || overlayRemoved || !sameViewport(snapshot.viewport, viewport) ||
+        snapshot.categories.join() !== categories.join()) {
+        return fullObservation(viewport, categories);
+    }
+
+    const reachableRoots = [];
+    for (const root of roots) {
+        if (isOverlay(root)) return fullObservation(viewport, categories);
+        if (isReachable(root)) reachableRoots.push(root);
+    }
+
+    // Entries outside the dirty subtrees are kept as they are, unless the layout
+    // moved them, in which case nothing cached can be trusted anymore
+    const affected = {};
+    for (const category of categories) {
+        affected[category] = [];
+        for (const [id, entry] of snapshot.entries[category]) {
+            if (!entry.element.isConnected || isInsideAny(entry.element, roots)) {
+                affected[category].push(id);
+            } else if (!sameRect(entry.rect, readRect(entry.element))) {
+                return fullObservation(viewport, categories);
+            }
+        }
+    }
+
+    // Ancestors of a dirty subtree (e.g. informative containers) derive their
+    // content from it, so they are re-evaluated on their own
+    const singles = new Set();
+    for (const root of roots) {
+        for (let node = getComposedParent(root); node; node = getComposedParent(node)) {
+            const id = elementIds.get(node);
+            if (id !== undefined && isTracked(snapshot, id) && !isInsideAny(node, roots)) singles.add(node);
         }
-        if(!isElementClickable(currentNode)||EXPLORABLE_TAGS.has(tagName)){
-            Array.from(currentNode.children).forEach(child => traverseDom(child));
+    }
+    for (const element of singles) {
+        const id = elementIds.get(element);
+        for (const category of categories) {
+            if (snapshot.entries[category].has(id)) affected[category].push(id);
         }
     }
-    traverseDom(node);
-    return {interactiveElements,informativeElements,scrollableElements};
+
+    const collected = newCollection(categories, true);
+    for (const root of reachableRoots) traverseDom(root, collected);
+    // A positioned descendant of a dirty subtree which appeared, moved or was hidden, e.g. a
+    // modal opened in a static portal container, can cover or uncover anything on the page
+    if (domTracker.overlaysChanged) {
+        domTracker.overlaysChanged = false;
+        return fullObservation(viewport, categories);
+    }
+    for (const element of singles) {
+        const tagName = element.tagName.toLowerCase();
+        if (!EXCLUDED_TAGS.has(tagName)) collectElement(element, tagName, collected);
+    }
+
+    const delta = { full: false, added: {}, changed: {}, removed: {}, order: {} };
+    for (const category of categories) {
+        const entries = snapshot.entries[category];
+        const fresh = new Map(collected[category].map(data => [data.id, data]));
+        delta.added[category] = [];
+        delta.changed[category] = [];
+        delta.removed[category] = [];
+
+        for (const id of affected[category]) {
+            if (!fresh.has(id)) {
+                entries.delete(id);
+                delta.removed[category].push(id);
+            }
+        }
+        for (const [id, data] of fresh) {
+            const previous = entries.get(id);
+            const element = collected.elements.get(id);
+            if (!previous) {
+                delta.added[category].push(data);
+            } else if (previous.json !== JSON.stringify(data)) {
+                delta.changed[category].push(data);
+            }
+            storeEntry(snapshot, category, element, data);
+        }
+
+        delta.order[category] = Array.from(entries.values())
+            .sort((a, b) => a.element.compareDocumentPosition(b.element) & Node.DOCUMENT_POSITION_FOLLOWING ? -1 : 1)
+            .map(entry => entry.data.id);
+    }
+
+    snapshot.viewport = viewport;
+    return delta;
 }
 
 function mark_page(boxes) {
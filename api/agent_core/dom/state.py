@@ -11,6 +11,7 @@ class CenterPoint(TypedDict):
     y: float
 
 class InteractiveElement(TypedDict):
+    id: int
     tag: str
     role: str
     name: str
@@ -20,6 +21,7 @@ class InteractiveElement(TypedDict):
     xpath: str
 
 class InformativeElement(TypedDict):
+    id: int
     tag: str
     role: str
     content: str
@@ -27,6 +29,7 @@ class InformativeElement(TypedDict):
     xpath: str
 
 class ScrollableElement(TypedDict):
+    id: int
     tag: str
     role: str
     name: str
@@ -1,11 +1,72 @@
 from abc import ABC, abstractmethod
-from typing import List, Any, Union
+from dataclasses import dataclass, asdict
+from typing import AsyncIterator, List, Any, Union, Optional
 from ..message import (
     AIMessage, 
     UserMessage, 
     SystemMessage
 )
 
+@dataclass
+class PrefixCacheStats:
+    """
+    Hit and miss counts of the cached prompt prefix.
+
+    Attributes:
+        hits (int): Calls which reused a cached prefix
+        misses (int): Calls which asked for the prefix to be cached but were billed for all of it
+        cached_tokens (int): Prompt tokens served from the cache
+        prompt_tokens (int): Prompt tokens of the calls which asked for caching
+    """
+    hits: int = 0
+    misses: int = 0
+    cached_tokens: int = 0
+    prompt_tokens: int = 0
+
+    def record(self, prompt_tokens: int, cached_tokens: int) -> None:
+        if cached_tokens:
+            self.hits += 1
+        else:
+            self.misses += 1
+        self.cached_tokens += cached_tokens
+        self.prompt_tokens += prompt_tokens
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+# Totals of every model instance in the process
+PREFIX_CACHE_STATS = PrefixCacheStats()
+
+@dataclass
+class TokenUsage:
+    """
+    Token counts of a model call.
+
+    Attributes:
+        prompt_tokens (int): Tokens of the prompt
+        completion_tokens (int): Tokens of the completion
+        cached_tokens (int): Prompt tokens served from the prefix cache
+    """
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0
+
+    @classmethod
+    def from_response(cls, response) -> Optional['TokenUsage']:
+        """Reads the usage of a litellm response or final stream chunk, None if it has none."""
+        usage = getattr(response, 'usage', None)
+        if usage is None:
+            return None
+        details = getattr(usage, 'prompt_tokens_details', None)
+        return cls(
+            prompt_tokens = getattr(usage, 'prompt_tokens', None) or 0,
+            completion_tokens = getattr(usage, 'completion_tokens', None) or 0,
+            cached_tokens = getattr(details, 'cached_tokens', None) or 0
+        )
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
 class BaseModel(ABC):
     @property
     @abstractmethod
@@ -25,6 +86,32 @@ class BaseModel(ABC):
     async def generate(self, query: str):
         pass
 
+    async def generate_stream(self) -> AsyncIterator[str]:
+        """
+        Generates the completion as a stream of text chunks. Providers without
+        streaming yield the whole completion at once.
+        """
+        response = await self.generate()
+        yield response.choices[0].message.content or ''
+
     @abstractmethod
     def configure(self, **kwargs):
-        pass
\ No newline at end of file
+        pass
+
+    def cache_prefix(self, count: int) -> None:
+        """
+        Marks the first `count` current messages as a static prefix which the provider
+        may cache and reuse on later calls. Setting `messages` clears it. Providers
+        without prompt caching ignore it.
+        """
+        pass
+
+    @property
+    def cache_stats(self) -> Optional[PrefixCacheStats]:
+        """Prefix cache statistics of this model instance, None when not supported."""
+        return None
+
+    @property
+    def last_usage(self) -> Optional[TokenUsage]:
+        """Token usage of the last call, None when the provider does not report it."""
+        return None
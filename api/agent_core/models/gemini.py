@@ -1,12 +1,14 @@
-from .__init__ import BaseModel
+from .__init__ import BaseModel, PrefixCacheStats, PREFIX_CACHE_STATS, TokenUsage
 from litellm import acompletion
 from ..message import (
     UserMessage, 
     SystemMessage, 
     AIMessage
 )
-from typing import List, Union, Any
+from typing import AsyncIterator, List, Union, Any, Optional
 
+# Gemini refuses to cache less than this many tokens (estimated at 4 characters per token)
+MIN_CACHED_PREFIX_TOKENS = 1024
 class GeminiProvider(BaseModel):
     """
     Gemini model for generating text completion
@@ -18,6 +20,8 @@ class GeminiProvider(BaseModel):
         reasoning_effort (str): The reasoning effort to use for text completion
         temperature (float): The temperature to use for text completion
         top_p (float): The top_p to use for text completion
+        prefix_caching (bool): Cache the prefix marked with `cache_prefix` through Gemini context caching
+        api_base (Optional[str]): Base URL of the API, e.g. a local Gemini-compatible stand-in
     """
     
     def __init__(
@@ -27,7 +31,9 @@ class GeminiProvider(BaseModel):
             max_tokens: int = 19334,
             reasoning_effort: str = 'disable',  
             temperature: float = 0.4,
-            top_p: float = 1.0
+            top_p: float = 1.0,
+            prefix_caching: bool = True,
+            api_base: Optional[str] = None
         ) -> None:
         self.api_key = api_key
         self.model = model
@@ -35,7 +41,12 @@ class GeminiProvider(BaseModel):
         self.reasoning_effort = reasoning_effort
         self.temperature = temperature
         self.top_p = top_p
+        self.prefix_caching = prefix_caching
+        self.api_base = api_base
         self._messages = []
+        self._cached_prefix = 0
+        self._cache_stats = PrefixCacheStats()
+        self._last_usage: Optional[TokenUsage] = None
         self.provider = 'gemini/'
 
     @property
@@ -45,10 +56,51 @@ class GeminiProvider(BaseModel):
     @messages.setter
     def messages(self, messages: List[Union[AIMessage, UserMessage, SystemMessage]]):
         self._messages = messages
+        self._cached_prefix = 0
 
     def add_message(self, message: Union[AIMessage, UserMessage, SystemMessage]):
         self._messages.append(message)
 
+    def cache_prefix(self, count: int) -> None:
+        self._cached_prefix = count
+
+    @property
+    def cache_stats(self) -> PrefixCacheStats:
+        return self._cache_stats
+
+    def _request_messages(self) -> tuple[List[dict], bool]:
+        """
+        Returns the messages to send and whether their prefix is marked for caching.
+        LiteLLM turns the `cache_control` blocks into a Gemini cached content, created
+        on the first call and referenced by the following calls with the same prefix.
+        """
+
+        prefix = self._messages[:self._cached_prefix]
+        prefix_chars = sum(len(message['content']) for message in prefix if isinstance(message.get('content'), str))
+        # Something has to follow the cached prefix in the request
+        has_suffix = len(self._messages) > self._cached_prefix
+        if not self.prefix_caching or not prefix or not has_suffix or prefix_chars < MIN_CACHED_PREFIX_TOKENS * 4:
+            return self._messages, False
+
+        cached = [
+            {**message, 'content': [{'type': 'text', 'text': message['content'], 'cache_control': {'type': 'ephemeral'}}]}
+            for message in prefix
+        ]
+        return cached + self._messages[self._cached_prefix:], True
+
+    @property
+    def last_usage(self) -> Optional[TokenUsage]:
+        return self._last_usage
+
+    def _record_usage(self, response, cached: bool) -> None:
+        usage = TokenUsage.from_response(response)
+        if usage is None:
+            return
+        self._last_usage = usage
+        if cached:
+            self._cache_stats.record(usage.prompt_tokens, usage.cached_tokens)
+            PREFIX_CACHE_STATS.record(usage.prompt_tokens, usage.cached_tokens)
+
     async def generate(self) -> str:
         """
         Generates text completion from Gemini model
@@ -60,19 +112,63 @@ class GeminiProvider(BaseModel):
             str: The generated text completion
         """
                
-        response = await acompletion(
+        self._last_usage = None
+        messages, cached = self._request_messages()
+        try:
+            response = await self._completion(messages)
+        except Exception as e:
+            if not cached:
+                raise
+            # The prefix could not be cached (e.g. model without context caching), go on without it
+            print(f"Prompt prefix caching failed, disabling it for this session: {e}")
+            self.prefix_caching = False
+            response = await self._completion(self._messages)
+            cached = False
+
+        self._record_usage(response, cached)
+        return response
+
+    async def generate_stream(self) -> AsyncIterator[str]:
+        """
+        Streams the text completion from Gemini model as it is generated.
+
+        Yields:
+            str: The next chunk of the completion
+        """
+
+        self._last_usage = None
+        messages, cached = self._request_messages()
+        try:
+            response = await self._completion(messages, stream = True)
+        except Exception as e:
+            if not cached:
+                raise
+            print(f"Prompt prefix caching failed, disabling it for this session: {e}")
+            self.prefix_caching = False
+            cached = False
+            response = await self._completion(self._messages, stream = True)
+
+        async for chunk in response:
+            if getattr(chunk, 'usage', None):
+                self._record_usage(chunk, cached)
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    async def _completion(self, messages: List[dict], stream: bool = False):
+        return await acompletion(
             model = self.provider + self.model,
-            messages = self.messages,
+            messages = messages,
             max_tokens = self.max_tokens,
             api_key = self.api_key,
+            api_base = self.api_base,
             reasoning_effort = self.reasoning_effort,
             response_format = { "type": "json_object" },
-            stream = False,
+            stream = stream,
+            stream_options = { "include_usage": True } if stream else None,
             temperature = self.temperature,
             top_p = self.top_p,
             timeout = 10000,
         )
-        return response
     
     def configure(
         self, 
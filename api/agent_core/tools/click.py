@@ -1,30 +1,33 @@
 from .base_tool import BaseTool
+from ..dom import DOM
 from playwright.async_api import Page
-from typing import Union, Dict
+from typing import Union, Dict, Optional
 from pydantic import BaseModel, Field
 
 class ClickElementArgs(BaseModel):
     """Arguments for the ClickElement tool."""
-    xpath: str = Field(..., description="XPath of the element to click.")
+    element_id: Optional[int] = Field(None, description="Id of the element to click, the number in brackets in the page state.")
+    xpath: Optional[str] = Field(None, description="XPath of the element to click, only needed when the element has no id.")
     x: float = Field(..., description="X coordinate to click at.")
     y: float = Field(..., description="Y coordinate to click at.")
 
 class ClickElementTool(BaseTool):
     name: str = "click_element"
-    description: str = "Clicks an element on the page using its coordinates (x and y). Must provide the X and Y coordinates along with the Xpath."
+    description: str = "Clicks an element on the page. Must provide the element id from the page state along with the X and Y coordinates."
     args_schema: BaseModel = ClickElementArgs
     
-    def __init__(self, page: Page):
-        super().__init__(page = page)
+    def __init__(self, page: Page, dom: DOM):
+        super().__init__(page = page, dom = dom)
 
     async def run(self, args: ClickElementArgs) -> Union[str, Dict]:
         """
-        This tool clicks on element using its coordinates or xpath.
+        This tool clicks on element using its id, or its xpath when the id is stale.
         """
         try:
-            if args.xpath:
-                # await self.page.locator(f'xpath={args.xpath}').scroll_into_view_if_needed()
-                await self.page.locator(f'xpath={args.xpath}').click()
-                return f"Successfully clicked at element with xpath: {args.xpath}"
+            if args.element_id is not None or args.xpath:
+                async with self.dom.element(args.element_id, args.xpath) as element:
+                    await element.click()
+                return f"Successfully clicked at element {args.element_id if args.element_id is not None else args.xpath}"
+            return {"error": "Either element_id or xpath is required"}
         except Exception as e:
-            return {"error": f"Failed to click element: {e}"}
\ No newline at end of file
+            return {"error": f"Failed to click element: {e}"}
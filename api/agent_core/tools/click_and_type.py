@@ -1,29 +1,35 @@
 from .base_tool import BaseTool
-from typing import Dict, Union
+from ..dom import DOM
+from typing import Dict, Union, Optional
 from pydantic import BaseModel, Field
 from playwright.async_api import Page
 import random
 
 class ClickAndTypeArgs(BaseModel):
     """Arguments for the ClickAndTypeTool."""
-    xpath: str = Field(..., description="XPath of the element to click.")
+    element_id: Optional[int] = Field(None, description="Id of the element to type into, the number in brackets in the page state.")
+    xpath: Optional[str] = Field(None, description="XPath of the element to type into, only needed when the element has no id.")
     text: str = Field(..., description="The text to type into the element.")
     x: float = Field(..., description="The x coordinate to click before typing.")
     y: float = Field(..., description="The y coordinate to click before typing.")
 
 class ClickAndTypeTool(BaseTool):
     name: str = "click_and_type_text"
-    description: str = "Clicks on an element using its XPath or coordinates and types text into it."
+    description: str = "Clicks on an element using its id from the page state and types text into it."
     args_schema: BaseModel = ClickAndTypeArgs
 
-    def __init__(self, page: Page):
-        super().__init__(page = page)
+    def __init__(self, page: Page, dom: DOM):
+        super().__init__(page = page, dom = dom)
 
     async def run(self, args: ClickAndTypeArgs) -> Union[str, Dict]:
         try:
-            if args.xpath:
-                await self.page.locator(f'xpath={args.xpath}').clear()
-                await self.page.locator(f'xpath={args.xpath}').press_sequentially(args.text, delay=random.uniform(50, 150))
-                return f"Successfully clicked and typed text into element with xpath using emunium: {args.xpath}"
+            if args.element_id is not None or args.xpath:
+                async with self.dom.element(args.element_id, args.xpath) as element:
+                    await element.fill('')
+                    # ElementHandle.type is deprecated, the keyboard types into the focused element for both kinds
+                    await element.focus()
+                    await self.page.keyboard.type(args.text, delay=random.uniform(50, 150))
+                return f"Successfully clicked and typed text into element {args.element_id if args.element_id is not None else args.xpath}"
+            return {"error": "Either element_id or xpath is required"}
         except Exception as e:
-            return {"error": f"Failed to click and type text into element: {e}"}
\ No newline at end of file
+            return {"error": f"Failed to click and type text into element: {e}"}
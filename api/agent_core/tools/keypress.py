@@ -22,7 +22,6 @@ class PressKeyTool(BaseTool):
         """
         try:
             await self.page.keyboard.press(args.key)
-            await self.page.wait_for_load_state("networkidle")
             return f"Successfully pressed the '{args.key}' key."
         except Exception as e:
             return {"error": f"Failed to press key '{args.key}': {e}"}
\ No newline at end of file
@@ -19,8 +19,8 @@ class NavigateTool(BaseTool):
 
     async def run(self, args: NavigateArgs) -> Union[str, Dict]:
         try:
-            await self.page.goto(args.url, timeout=args.timeout)
-            await self.page.wait_for_load_state("networkidle")
+            # The executor waits for the page to settle after every tool
+            await self.page.goto(args.url, timeout=args.timeout, wait_until="domcontentloaded")
             return f"Successfully navigated to {args.url}."
         except Exception as e:
             return {"error": f"Failed to navigate to {args.url}: {e}"}
\ No newline at end of file
@@ -1,31 +1,45 @@
 from .base_tool import BaseTool
-from typing import List, Type
+from ..agent.utils import dev_reload_enabled
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Type
 import os
+import inspect
 import importlib
+import threading
 
-def get_tool_classes() -> List[Type[BaseTool]]:
+TOOLS_DIR = os.path.dirname(__file__)
+
+def _tool_module_names() -> List[str]:
+    return sorted(
+        filename[:-3] for filename in os.listdir(TOOLS_DIR)
+        if filename.endswith(".py") and not filename.startswith("__") and filename != "base_tool.py" and filename != "register.py"
+    )
+
+def get_tool_classes(reload: bool = False) -> List[Type[BaseTool]]:
     """
     Dynamically discovers and returns all tool classes.
+
+    Args:
+        reload (bool): Re-import the tool modules to pick up changes to them
     
     Returns:
         List[Type[BaseTool]]: List of tool classes.
     """
 
     tool_classes = []
-    tools_dir = os.path.dirname(__file__)
 
-    for filename in os.listdir(tools_dir):
-        if filename.endswith(".py") and not filename.startswith("__") and filename != "base_tool.py" and filename != "register.py":
-            module_name = filename[:-3]
-            try:
-                module = importlib.import_module(f".{module_name}", package="api.agent_core.tools")
-                
-                for name, obj in module.__dict__.items():
-                    if isinstance(obj, type) and issubclass(obj, BaseTool) and obj is not BaseTool:
-                        tool_classes.append(obj)
+    for module_name in _tool_module_names():
+        try:
+            module = importlib.import_module(f".{module_name}", package="api.agent_core.tools")
+            if reload:
+                module = importlib.reload(module)
+            
+            for name, obj in module.__dict__.items():
+                if isinstance(obj, type) and issubclass(obj, BaseTool) and obj is not BaseTool:
+                    tool_classes.append(obj)
 
-            except ImportError as e:
-                print(f"Error importing tool module {module_name}: {e}")
+        except ImportError as e:
+            print(f"Error importing tool module {module_name}: {e}")
 
     return tool_classes
 
@@ -57,4 +71,110 @@ def generate_tools_markdown(tool_classes: List[Type[BaseTool]]) -> str:
                 
                 markdown_lines.append(f"    - Args: `{field_name}` ({arg_type}, {req_or_default}) - {arg_desc}")
 
-    return "\n".join(markdown_lines)
\ No newline at end of file
+    return "\n".join(markdown_lines)
+
+@dataclass(frozen = True)
+class ToolSpec:
+    """
+    A discovered tool class along with what it takes to instantiate it.
+
+    Attributes:
+        tool_class (Type[BaseTool]): The tool class
+        dependencies (Tuple[str, ...]): Names of the constructor parameters, e.g. ('page', 'dom')
+    """
+    tool_class: Type[BaseTool]
+    dependencies: Tuple[str, ...]
+
+@dataclass(frozen = True)
+class ToolRegistry:
+    """
+    Immutable, process-wide view of the available tools, built once by `get_tool_registry`.
+    Sessions only bind the tools to their page with `bind`.
+
+    Attributes:
+        specs (Tuple[ToolSpec, ...]): The tools offered to the agent
+        markdown (str): Description of those tools for the system prompt
+        ignored (Tuple[str, ...]): Names of the tools which were left out
+    """
+    specs: Tuple[ToolSpec, ...]
+    markdown: str
+    ignored: Tuple[str, ...]
+
+    def bind(self, dependencies: Dict[str, Any]) -> List[BaseTool]:
+        """
+        Instantiates every tool with the dependencies its constructor asks for.
+
+        Args:
+            dependencies (Dict[str, Any]): Available dependencies by parameter name, e.g. page, dom, model
+
+        Returns:
+            List[BaseTool]: The tool instances
+        """
+
+        return [
+            spec.tool_class(**{name: dependencies[name] for name in spec.dependencies if name in dependencies})
+            for spec in self.specs
+        ]
+
+def build_tool_registry(ignore_tools: Iterable[str] = (), reload: bool = False) -> ToolRegistry:
+    """
+    Discovers the tools and introspects their constructors and argument schemas.
+
+    Args:
+        ignore_tools (Iterable[str]): Names of the tools not to offer to the agent
+        reload (bool): Re-import the tool modules to pick up changes to them
+
+    Returns:
+        ToolRegistry: The registry
+    """
+
+    ignored = tuple(ignore_tools)
+    tool_classes = [tool_class for tool_class in get_tool_classes(reload = reload) if tool_class.name not in ignored]
+    specs = tuple(
+        ToolSpec(
+            tool_class = tool_class,
+            dependencies = tuple(name for name in inspect.signature(tool_class.__init__).parameters if name != 'self')
+        )
+        for tool_class in tool_classes
+    )
+    return ToolRegistry(specs = specs, markdown = generate_tools_markdown(tool_classes), ignored = ignored)
+
+_registries: Dict[Tuple[str, ...], ToolRegistry] = {}
+_registry_mtime: Optional[float] = None
+_registry_lock = threading.Lock()
+
+def _tools_mtime() -> float:
+    return max(os.path.getmtime(os.path.join(TOOLS_DIR, f"{name}.py")) for name in _tool_module_names())
+
+def get_tool_registry(ignore_tools: Iterable[str] = ()) -> ToolRegistry:
+    """
+    Returns the tool registry, built on first use and then shared by every session.
+    In dev reload mode it is rebuilt when a tool module changes.
+
+    Args:
+        ignore_tools (Iterable[str]): Names of the tools not to offer to the agent
+
+    Returns:
+        ToolRegistry: The registry
+    """
+
+    global _registry_mtime
+    key = tuple(ignore_tools)
+
+    reload = False
+    if dev_reload_enabled():
+        mtime = _tools_mtime()
+        if mtime != _registry_mtime:
+            with _registry_lock:
+                _registries.clear()
+                reload = _registry_mtime is not None
+                _registry_mtime = mtime
+
+    registry = _registries.get(key)
+    if registry is None:
+        with _registry_lock:
+            registry = _registries.get(key)
+            if registry is None:
+                registry = build_tool_registry(key, reload = reload)
+                _registries[key] = registry
+    return registry
@@ -1,13 +1,106 @@
 from .base_tool import BaseTool
 from ..dom import DOM
+from ..dom.markdown import convert_html_to_markdown
 from ..models import BaseModel
 from ..message import SystemMessage, UserMessage
 from ..agent.utils import build_scraper_prompt
 from ..agent.utils import extract_json
+from ..cache import scraper_cache, scraper_cache_key
+from ..agent.budget import BudgetTracker
 from playwright.async_api import Page
-from markdownify import markdownify as md
 from pydantic import BaseModel, Field
-from typing import Dict, Union, Any
+from typing import Dict, Union, Any, List, Optional
+import asyncio
+import copy
+import json
+import re
+
+REDUCE_PROMPT = (
+    "The page was too long for a single pass, so it was split into consecutive parts. "
+    "Below are the answers to the User Query for each part, in page order. "
+    "Combine them into the single final answer, following the output format."
+)
+
+def split_markdown(markdown: str, max_chars: int) -> List[str]:
+    """
+    Splits markdown into chunks of at most `max_chars` on structural boundaries: blocks
+    separated by blank lines, a new chunk preferably starting at a heading. Blocks which
+    are too long are split on lines, repeating the header of a table in every piece.
+    """
+
+    pieces = []
+    for block in re.split(r'\n\s*\n', markdown):
+        if not block.strip():
+            continue
+        if len(block) <= max_chars:
+            pieces.append(block)
+            continue
+
+        lines = block.split('\n')
+        header = ''
+        if len(lines) > 2 and re.match(r'^\s*\|?\s*:?-{3,}', lines[1]):
+            header = '\n'.join(lines[:2]) + '\n'
+            lines = lines[2:]
+        current = header
+        for line in lines:
+            while len(line) > max_chars - len(header):
+                # A single line longer than a chunk is cut as is
+                cut = max_chars - len(header)
+                if current != header:
+                    pieces.append(current.rstrip('\n'))
+                pieces.append(header + line[:cut])
+                current, line = header, line[cut:]
+            if len(current) + len(line) + 1 > max_chars:
+                pieces.append(current.rstrip('\n'))
+                current = header
+            current += line + '\n'
+        if current != header:
+            pieces.append(current.rstrip('\n'))
+
+    chunks, current = [], ''
+    for piece in pieces:
+        full = len(current) + len(piece) + 2 > max_chars
+        # Keep sections together: a heading starts a new chunk once the current one is half full
+        section_break = piece.lstrip().startswith('#') and len(current) > max_chars // 2
+        if current and (full or section_break):
+            chunks.append(current)
+            current = ''
+        current = f"{current}\n\n{piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+def _fingerprint(item: Any) -> str:
+    return json.dumps(item, sort_keys = True, ensure_ascii = False)
+
+def merge_scraped_responses(responses: List[Any]) -> Any:
+    """
+    Merges the structured responses of the chunks of a page: lists of items are
+    concatenated without duplicates, objects are merged key by key (lists
+    concatenated without duplicates, the first non-null value for the rest).
+    """
+
+    responses = [response for response in responses if response is not None]
+    if not responses:
+        return None
+    if all(isinstance(response, dict) for response in responses):
+        merged = {}
+        for response in responses:
+            for key, value in response.items():
+                if isinstance(value, list) and isinstance(merged.get(key), list):
+                    merged[key] = merge_scraped_responses([merged[key], value])
+                elif merged.get(key) is None:
+                    merged[key] = value
+        return merged
+
+    merged, seen = [], set()
+    for response in responses:
+        for item in response if isinstance(response, list) else [response]:
+            fingerprint = _fingerprint(item)
+            if fingerprint not in seen:
+                seen.add(fingerprint)
+                merged.append(item)
+    return merged
 
 class ScraperArgs(BaseModel):
     user_input: str = Field(..., description="""User Query""")
@@ -16,13 +109,18 @@ class ScraperTool(BaseTool):
     name: str = "scraper"
     description: str = "Scrapes the whole page based on the user given query content. Note that it will scrape the whole body of the html. It converts the body into markdown format and sends it to the LLM to scrape based on the user query."
     args_schema: BaseModel = ScraperArgs
+    # Pages with more markdown than `chunk_chars` are scraped in chunks, at most
+    # `max_concurrency` of them at once. Process-wide, set at startup.
+    chunk_chars: int = 48000
+    max_concurrency: int = 4
 
     def __init__(
             self, 
             page: Page, 
             dom: DOM, 
             model: BaseModel, 
-            scraper_response_json_format: Dict[str, Any]
+            scraper_response_json_format: Dict[str, Any],
+            budget: Optional[BudgetTracker] = None
         ):
         super().__init__(
             page = page, 
@@ -31,11 +129,16 @@ class ScraperTool(BaseTool):
             scraper_response_json_format = scraper_response_json_format
         )
         self.last_seen_markdown = ""
+        # Tokens of the extraction calls count against the session budget, cache hits cost none
+        self.budget = budget
+        # (failed, total) chunks of the last scrape, (0, 0) when it is complete
+        self.failed_chunks = (0, 0)
 
     async def run(self, args: ScraperArgs) -> Union[str, Dict]:
+        self.failed_chunks = (0, 0)
         try:
             html = await self.page.locator("body").inner_html()
-            current_markdown = md(html, strip = ["script", "style", "noscript", "iframe", "object", "embed", "link", "meta", "svg", "canvas"])
+            current_markdown = await convert_html_to_markdown(html)
             
             markdown_to_process = ""
             
@@ -56,32 +159,111 @@ class ScraperTool(BaseTool):
                 return "No new textual content found to scrape."
             
             # Update the state for the *next* time the tool is called
+            previous_markdown = self.last_seen_markdown
             self.last_seen_markdown = current_markdown
 
             system_prompt_template = build_scraper_prompt(
                 scraper_output_json_schema = self.scraper_response_json_format
             )
 
-            messages = [
-                SystemMessage(content = system_prompt_template).to_dict(),
-                UserMessage(content = f'User Query: {args.user_input}').to_dict(),
-                UserMessage(content = f'HTML Content in Markdown Format\n: {markdown_to_process}').to_dict(),
-            ]
+            # Identical content scraped for the same query, schema and model (by any session) is reused
+            cache_key = scraper_cache_key(
+                markdown_to_process,
+                args.user_input,
+                self.scraper_response_json_format,
+                getattr(self.model, 'model', type(self.model).__name__),
+                system_prompt_template
+            )
+            cached_response = await scraper_cache.get(cache_key)
+            if cached_response is not None:
+                print("Scraper cache hit, skipping the LLM call.")
+                return cached_response
+
+            chunks = split_markdown(markdown_to_process, self.chunk_chars)
+            if len(chunks) > 1:
+                print(f"Scraping {len(chunks)} chunks, {self.max_concurrency} at a time.")
+                response, failed = await self._map_reduce(system_prompt_template, args.user_input, chunks)
+            else:
+                response, failed = await self._extract(self.model, system_prompt_template, args.user_input, markdown_to_process), 0
+            final_response = {'response': response}
 
-            self.model.messages = messages
-            response = await self.model.generate()
-            response = response.choices[0].message.content
-            # response = response['choices'][0]['message']['content']
-            final_response = extract_json(response)
-            if not final_response or 'response' not in final_response:
-                raise ValueError("LLM failed to return a valid JSON object with a 'response' key.")
+            if failed:
+                # A partial result is neither cached for the page nor marks it as scraped, so it can be retried
+                self.failed_chunks = (failed, len(chunks))
+                self.last_seen_markdown = previous_markdown
+                return final_response.get('response')
 
             # --- CRITICAL CHANGE ---
             # Only update the 'last_seen_markdown' state AFTER the LLM call and parsing are successful.
             self.last_seen_markdown = current_markdown
             print("Successfully processed new content and updated tool memory.")
+
+            await scraper_cache.set(cache_key, final_response.get('response'))
             
             return final_response.get('response')
             # return final_response['response']   
         except Exception as e:
-            return str(e)
\ No newline at end of file
+            return str(e)
+
+    async def _extract(self, model: BaseModel, system_prompt: str, user_input: str, markdown: str) -> Any:
+        """
+        Runs one extraction call and returns the value of its 'response' key.
+        """
+
+        messages = [
+            SystemMessage(content = system_prompt).to_dict(),
+            UserMessage(content = f'User Query: {user_input}').to_dict(),
+            UserMessage(content = f'HTML Content in Markdown Format\n: {markdown}').to_dict(),
+        ]
+
+        model.messages = messages
+        response = await model.generate()
+        response = response.choices[0].message.content
+        if self.budget:
+            self.budget.record(
+                model.last_usage,
+                sum(len(message['content']) for message in messages),
+                len(response or ''),
+                step = False
+            )
+        final_response = extract_json(response)
+        if not final_response or 'response' not in final_response:
+            raise ValueError("LLM failed to return a valid JSON object with a 'response' key.")
+        return final_response['response']
+
+    async def _map_reduce(self, system_prompt: str, user_input: str, chunks: List[str]) -> tuple[Any, int]:
+        """
+        Extracts every chunk concurrently, each on its own copy of the model since the
+        messages live on the model instance, then merges the results. Structured results
+        are merged and deduplicated, text answers are combined by one more call.
+
+        Returns:
+            tuple[Any, int]: The merged response and the number of chunks which failed
+        """
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        model_name = getattr(self.model, 'model', type(self.model).__name__)
+
+        async def extract_chunk(chunk: str) -> Any:
+            async with semaphore:
+                key = scraper_cache_key(chunk, user_input, self.scraper_response_json_format, model_name, system_prompt)
+                cached = await scraper_cache.get(key)
+                if cached is not None:
+                    return cached
+                response = await self._extract(copy.copy(self.model), system_prompt, user_input, chunk)
+                await scraper_cache.set(key, response)
+                return response
+
+        results = await asyncio.gather(*(extract_chunk(chunk) for chunk in chunks), return_exceptions = True)
+        responses = [result for result in results if not isinstance(result, BaseException)]
+        failures = [result for result in results if isinstance(result, BaseException)]
+        if failures:
+            print(f"{len(failures)} of {len(chunks)} chunks failed to scrape: {failures[0]}")
+        if not responses:
+            raise failures[0]
+
+        if self.scraper_response_json_format or not all(isinstance(response, str) for response in responses):
+            return merge_scraped_responses(responses), len(failures)
+
+        partial_answers = '\n\n'.join(f"Part {i + 1}:\n{response}" for i, response in enumerate(responses))
+        return await self._extract(self.model, system_prompt, user_input, f"{REDUCE_PROMPT}\n\n{partial_answers}"), len(failures)
\ No newline at end of file
@@ -29,7 +29,6 @@ class ScrollSiteTool(BaseTool):
             else:
                 return {"error": "Invalid scroll direction. Use 'up' or 'down'."}
 
-            await self.page.wait_for_load_state("networkidle")
             if args.timeout:
                 await asyncio.sleep(args.timeout / 1000)
             return result_message
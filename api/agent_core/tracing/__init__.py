@@ -0,0 +1,244 @@
+"""
+Per-session latency spans of the agent loop: the LLM call, tool execution, settle
+waits, page state extraction and screenshots, with token counts and payload sizes.
+Spans are streamed as `timing` events and can be exported as OTLP/JSON, the
+OpenTelemetry wire format, to a file or a local collector.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterator, List, Optional, Protocol
+import asyncio
+import httpx
+import json
+import os
+import secrets
+import time
+
+SERVICE_NAME = 'web-agent'
+
+# Span the code currently runs in, the parent of the spans it starts
+_current_span: ContextVar[Optional['Span']] = ContextVar('current_span', default = None)
+
+# Called with every finished span of every session, e.g. to update metrics
+span_listeners: List[Callable[['Span'], None]] = []
+
+def add_span_listener(listener: Callable[['Span'], None]) -> None:
+    if listener not in span_listeners:
+        span_listeners.append(listener)
+
+def _notify(span: 'Span') -> None:
+    for listener in span_listeners:
+        try:
+            listener(span)
+        except Exception as e:
+            print(f"Error in span listener for {span.name}: {e}")
+
+@dataclass
+class Span:
+    """
+    A timed operation.
+
+    Attributes:
+        name (str): Operation name, e.g. 'llm.generate'
+        trace_id (str): Id of the session trace, 32 hex characters
+        span_id (str): Id of the span, 16 hex characters
+        parent_id (Optional[str]): Id of the enclosing span
+        start_ns (int): Start as unix time in nanoseconds
+        end_ns (int): End as unix time in nanoseconds, 0 while running
+        attributes (dict): Token counts, payload sizes and other details
+        error (Optional[str]): Error message if the operation raised
+    """
+
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    start_ns: int
+    end_ns: int = 0
+    attributes: dict = field(default_factory = dict)
+    error: Optional[str] = None
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update((key, value) for key, value in attributes.items() if value is not None)
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e6
+
+    def to_event(self) -> dict:
+        """The span as the data of a `timing` stream event."""
+        event = {
+            'name': self.name,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'start_ms': self.start_ns // 1_000_000,
+            'duration_ms': round(self.duration_ms, 2),
+            'attributes': self.attributes,
+        }
+        if self.error:
+            event['error'] = self.error
+        return event
+
+    def to_otlp(self) -> dict:
+        """The span in the OTLP/JSON encoding."""
+        span = {
+            'traceId': self.trace_id,
+            'spanId': self.span_id,
+            'name': self.name,
+            'kind': 1,
+            'startTimeUnixNano': str(self.start_ns),
+            'endTimeUnixNano': str(self.end_ns),
+            'attributes': [{'key': key, 'value': _otlp_value(value)} for key, value in self.attributes.items()],
+            'status': {'code': 2, 'message': self.error} if self.error else {'code': 1},
+        }
+        if self.parent_id:
+            span['parentSpanId'] = self.parent_id
+        return span
+
+def _otlp_value(value: Any) -> dict:
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+def otlp_payload(spans: List[Span]) -> dict:
+    """An OTLP/JSON ExportTraceServiceRequest with the spans."""
+    return {
+        'resourceSpans': [{
+            'resource': {'attributes': [{'key': 'service.name', 'value': {'stringValue': SERVICE_NAME}}]},
+            'scopeSpans': [{
+                'scope': {'name': 'api.agent_core.tracing'},
+                'spans': [span.to_otlp() for span in spans],
+            }],
+        }]
+    }
+
+class Tracer:
+    """
+    Records the spans of one session, all children of a session span.
+
+    Attributes:
+        trace_id (str): Id of the session trace
+        root (Span): The session span
+        spans (List[Span]): Finished spans, in the order they ended
+    """
+
+    def __init__(self, name: str = 'agent.session', **attributes: Any) -> None:
+        self.trace_id = secrets.token_hex(16)
+        self.root = Span(name, self.trace_id, secrets.token_hex(8), None, time.time_ns(), attributes = attributes)
+        self.spans: List[Span] = []
+        self._unsent = 0
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Span]:
+        """
+        Times the enclosed block. Attributes can be added to the yielded span while it runs.
+        """
+
+        parent = _current_span.get()
+        if parent is None or parent.trace_id != self.trace_id:
+            parent = self.root
+        span = Span(name, self.trace_id, secrets.token_hex(8), parent.span_id, time.time_ns())
+        span.set(**attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = str(e) or type(e).__name__
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end_ns = time.time_ns()
+            self.spans.append(span)
+            _notify(span)
+
+    def drain(self) -> List[Span]:
+        """
+        Returns the spans finished since the last call.
+        """
+
+        spans = self.spans[self._unsent:]
+        self._unsent = len(self.spans)
+        return spans
+
+    def finish(self) -> List[Span]:
+        """
+        Ends the session span.
+
+        Returns:
+            List[Span]: Every span of the session, the session span last
+        """
+
+        if not self.root.end_ns:
+            self.root.end_ns = time.time_ns()
+            _notify(self.root)
+        return self.spans + [self.root]
+
+class SpanExporter(Protocol):
+    async def export(self, spans: List[Span]) -> None:
+        ...
+
+class OTLPFileExporter:
+    """
+    Appends every trace as one OTLP/JSON line to a file, which the OpenTelemetry
+    collector's `otlpjsonfile` receiver can read.
+
+    Attributes:
+        path (str): The file
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+    async def export(self, spans: List[Span]) -> None:
+        line = json.dumps(otlp_payload(spans), ensure_ascii = False)
+        await asyncio.to_thread(self._append, line)
+
+    def _append(self, line: str) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok = True)
+        with open(self.path, 'a', encoding = 'utf-8') as f:
+            f.write(line + '\n')
+
+class OTLPHttpExporter:
+    """
+    Posts the traces to an OTLP/HTTP endpoint, e.g. a local collector.
+
+    Attributes:
+        endpoint (str): The traces URL, usually http://localhost:4318/v1/traces
+        timeout (float): Request timeout in seconds
+    """
+
+    def __init__(self, endpoint: str = 'http://localhost:4318/v1/traces', timeout: float = 5.0) -> None:
+        self.endpoint = endpoint
+        self.timeout = timeout
+
+    async def export(self, spans: List[Span]) -> None:
+        async with httpx.AsyncClient(timeout = self.timeout) as client:
+            response = await client.post(self.endpoint, json = otlp_payload(spans))
+            response.raise_for_status()
+
+# Set at startup when traces are exported, None keeps them in the stream only
+trace_exporter: Optional[SpanExporter] = None
+
+def set_trace_exporter(exporter: Optional[SpanExporter]) -> None:
+    global trace_exporter
+    trace_exporter = exporter
+
+async def export_trace(tracer: Tracer) -> None:
+    """
+    Ends the session span and exports the trace, if an exporter is set.
+    """
+
+    spans = tracer.finish()
+    if trace_exporter is None:
+        return
+    try:
+        await trace_exporter.export(spans)
+    except Exception as e:
+        print(f"Error exporting trace {tracer.trace_id}: {e}")
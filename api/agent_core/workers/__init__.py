@@ -0,0 +1,188 @@
+"""
+Shared, bounded executors for CPU-bound work which would otherwise run on the
+event loop serving every stream: a thread pool for work which releases the GIL or
+yields it often (Python loops, chunked encoding, image codecs) and a process pool
+for long pure-Python work (HTML to markdown).
+
+Jobs wait for a free worker on the event loop, in submission order, so the
+number of jobs queued and the time they waited are visible in the stats.
+"""
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, Callable, Optional, TypeVar
+import asyncio
+import base64
+import multiprocessing
+import time
+
+T = TypeVar('T')
+
+# 3 * 2**16 bytes, a multiple of 3 so the chunks encode without padding
+BASE64_CHUNK_BYTES = 196608
+
+@dataclass
+class PoolStats:
+    """
+    Counters of one kind of worker.
+
+    Attributes:
+        workers (int): Number of workers
+        queued (int): Jobs currently waiting for a worker
+        running (int): Jobs currently running
+        completed (int): Jobs finished successfully
+        failed (int): Jobs which raised
+        max_queued (int): Highest number of jobs seen waiting at once
+        wait_seconds (float): Total time jobs spent waiting for a worker
+        run_seconds (float): Total time jobs spent running
+        max_wait_seconds (float): Longest wait of a single job
+        max_run_seconds (float): Longest run of a single job
+    """
+
+    workers: int = 0
+    queued: int = 0
+    running: int = 0
+    completed: int = 0
+    failed: int = 0
+    max_queued: int = 0
+    wait_seconds: float = 0.0
+    run_seconds: float = 0.0
+    max_wait_seconds: float = 0.0
+    max_run_seconds: float = 0.0
+
+    def record(self, waited: float, ran: float, failed: bool) -> None:
+        if failed:
+            self.failed += 1
+        else:
+            self.completed += 1
+        self.wait_seconds += waited
+        self.run_seconds += ran
+        self.max_wait_seconds = max(self.max_wait_seconds, waited)
+        self.max_run_seconds = max(self.max_run_seconds, ran)
+
+    def to_dict(self) -> dict:
+        finished = self.completed + self.failed
+        return {
+            'workers': self.workers,
+            'queued': self.queued,
+            'running': self.running,
+            'completed': self.completed,
+            'failed': self.failed,
+            'max_queued': self.max_queued,
+            'avg_wait_ms': round(self.wait_seconds / finished * 1000, 2) if finished else 0.0,
+            'avg_run_ms': round(self.run_seconds / finished * 1000, 2) if finished else 0.0,
+            'max_wait_ms': round(self.max_wait_seconds * 1000, 2),
+            'max_run_ms': round(self.max_run_seconds * 1000, 2),
+        }
+
+class WorkerPool:
+    """
+    A thread pool and a process pool shared by every session, created on first use.
+
+    Attributes:
+        thread_workers (int): Number of threads
+        process_workers (int): Number of processes, 0 runs process jobs in the threads
+        thread_stats (PoolStats): Counters of the thread jobs
+        process_stats (PoolStats): Counters of the process jobs
+    """
+
+    def __init__(self, thread_workers: int = 4, process_workers: int = 2) -> None:
+        self.thread_workers = thread_workers
+        self.process_workers = process_workers
+        self.thread_stats = PoolStats()
+        self.process_stats = PoolStats()
+        self._threads: Optional[ThreadPoolExecutor] = None
+        self._processes: Optional[ProcessPoolExecutor] = None
+        self._thread_slots: Optional[asyncio.Semaphore] = None
+        self._process_slots: Optional[asyncio.Semaphore] = None
+
+    async def run_in_thread(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """
+        Runs `func(*args, **kwargs)` in the thread pool.
+        """
+
+        if self._threads is None:
+            self._threads = ThreadPoolExecutor(max_workers = self.thread_workers, thread_name_prefix = 'cpu-worker')
+            self._thread_slots = asyncio.Semaphore(self.thread_workers)
+            self.thread_stats.workers = self.thread_workers
+        return await self._run(self._threads, self._thread_slots, self.thread_stats, partial(func, *args, **kwargs))
+
+    async def run_in_process(self, func: Callable[..., T], *args: Any) -> T:
+        """
+        Runs `func(*args)` in the process pool. The function and its arguments must be
+        picklable, i.e. module-level functions and plain data.
+        """
+
+        if self.process_workers <= 0:
+            return await self.run_in_thread(func, *args)
+        if self._processes is None:
+            # The process already runs threads (the thread workers, asyncio.to_thread, the
+            # Playwright connection), forking it could copy a held lock into the workers
+            start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+            self._processes = ProcessPoolExecutor(
+                max_workers = self.process_workers,
+                mp_context = multiprocessing.get_context(start_method)
+            )
+            self._process_slots = asyncio.Semaphore(self.process_workers)
+            self.process_stats.workers = self.process_workers
+        processes = self._processes
+        try:
+            return await self._run(processes, self._process_slots, self.process_stats, partial(func, *args))
+        except BrokenProcessPool as e:
+            print(f"Worker process pool broke, running the job in a thread: {e}")
+            # Another job may already have replaced the broken pool
+            if self._processes is processes:
+                self._processes = None
+            processes.shutdown(wait = False, cancel_futures = True)
+            return await self.run_in_thread(func, *args)
+
+    async def _run(self, executor: Executor, slots: asyncio.Semaphore, stats: PoolStats, job: Callable[[], T]) -> T:
+        queued_at = time.perf_counter()
+        stats.queued += 1
+        stats.max_queued = max(stats.max_queued, stats.queued)
+        try:
+            await slots.acquire()
+        finally:
+            stats.queued -= 1
+
+        started_at = time.perf_counter()
+        stats.running += 1
+        failed = True
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(executor, job)
+            failed = False
+            return result
+        finally:
+            stats.running -= 1
+            stats.record(started_at - queued_at, time.perf_counter() - started_at, failed)
+            slots.release()
+
+    @property
+    def stats(self) -> dict:
+        return {'threads': self.thread_stats.to_dict(), 'processes': self.process_stats.to_dict()}
+
+    def close(self) -> None:
+        """
+        Shuts the workers down, meant for process shutdown.
+        """
+
+        for executor in (self._threads, self._processes):
+            if executor is not None:
+                executor.shutdown(wait = False, cancel_futures = True)
+        self._threads = self._processes = None
+        self._thread_slots = self._process_slots = None
+
+def encode_base64(data: bytes) -> str:
+    """
+    Base64-encodes `data` in chunks, so a thread encoding a large screenshot lets
+    the event loop take the GIL between chunks instead of holding it throughout.
+    """
+
+    view = memoryview(data)
+    return ''.join(
+        base64.b64encode(view[start:start + BASE64_CHUNK_BYTES]).decode('ascii')
+        for start in range(0, len(view), BASE64_CHUNK_BYTES)
+    )
+
+cpu_pool = WorkerPool()
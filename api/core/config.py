@@ -1,4 +1,5 @@
 from pydantic_settings import BaseSettings
+from typing import Optional
 
 class Settings(BaseSettings):
     ALLOWED_ORIGINS: str
@@ -9,9 +10,38 @@ class Settings(BaseSettings):
     RATE_LIMIT_BYPASS_KEY: str
 
     BROWSER_POOL_SIZE: int = 3
+    # Ready contexts per browser, held on top of its BROWSER_POOL_SIZE sessions until idle this long
+    BROWSER_CONTEXT_POOL_SIZE: int = 2
+    BROWSER_CONTEXT_MAX_IDLE: int = 120
     MAX_CONCURRENT_TASKS: int = 5
     RATE_LIMIT_AGENT_REQUESTS: int = 1
     RATE_LIMIT_AGENT_REQUESTS_TIME: int = 60
+    REDIS_MAX_CONNECTIONS: int = 20
+
+    # Scraper result cache, SCRAPER_CACHE_BACKEND is 'memory', 'redis' or 'disk'
+    SCRAPER_CACHE_BACKEND: str = 'memory'
+    SCRAPER_CACHE_TTL: int = 900
+    SCRAPER_CACHE_MAX_ENTRIES: int = 512
+    SCRAPER_CACHE_MAX_BYTES: int = 32 * 1024 * 1024
+    SCRAPER_CACHE_DIR: str = '.cache/scraper'
+
+    # Pages with more markdown than this are scraped in concurrent chunks
+    SCRAPER_CHUNK_CHARS: int = 48000
+    SCRAPER_MAX_CONCURRENCY: int = 4
+
+    # Shared workers for CPU-bound work (markdown conversion, encoding), 0 processes uses the threads
+    CPU_THREAD_WORKERS: int = 4
+    CPU_PROCESS_WORKERS: int = 2
+
+    # Step screenshots served by reference, kept in memory unless SCREENSHOT_STORE_DIR is set
+    SCREENSHOT_STORE_TTL: int = 3600
+    SCREENSHOT_STORE_MAX_BYTES: int = 64 * 1024 * 1024
+    SCREENSHOT_STORE_DIR: Optional[str] = None
+
+    # Export of the session latency traces as OTLP/JSON, TRACE_EXPORT is 'none', 'file' or 'otlp'
+    TRACE_EXPORT: str = 'none'
+    TRACE_FILE: str = 'traces/agent.jsonl'
+    TRACE_OTLP_ENDPOINT: str = 'http://localhost:4318/v1/traces'
 
     class Config:
         env_file = ".env"
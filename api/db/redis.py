@@ -1,7 +1,10 @@
-from upstash_redis import Redis
+import redis.asyncio as aioredis
 from ..core.config import settings
 
-redis = Redis(
-    url = settings.UPSTASH_REDIS_REST_URL, 
-    token = settings.UPSTASH_REDIS_REST_TOKEN
-)
\ No newline at end of file
+# Single pooled TCP client shared by the rate limiter and the request path
+redis = aioredis.from_url(
+    settings.UPSTASH_REDIS_TCP_URL,
+    max_connections = settings.REDIS_MAX_CONNECTIONS,
+    decode_responses = True,
+    health_check_interval = 30
+)
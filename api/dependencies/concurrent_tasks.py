@@ -2,15 +2,17 @@ from ..db.redis import redis
 from ..core.config import settings
 from fastapi import Request, Header
 
-def check_traffic(request: Request):
-    running_sessions = redis.smembers("running-sessions")
+async def check_traffic(request: Request):
+    client_ip = request.headers.get("X-Forwarded-For") or request.client.host
 
-    if running_sessions is None:
-        return True
+    async with redis.pipeline(transaction = False) as pipe:
+        pipe.scard("running-sessions")
+        pipe.sismember("running-sessions", client_ip)
+        running_count, is_running = await pipe.execute()
 
-    if len(running_sessions) >= settings.MAX_CONCURRENT_TASKS:
+    if running_count >= settings.MAX_CONCURRENT_TASKS:
         return False
 
-    if (request.headers.get("X-Forwarded-For") or request.client.host) in running_sessions:
+    if is_running:
         return False
-    return True
\ No newline at end of file
+    return True
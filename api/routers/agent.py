@@ -2,12 +2,14 @@ from fastapi import APIRouter, Request, Depends
 from ..services.agent import run_agent_stream
 from ..schemas.agent import AgentRequest
 from ..dependencies.concurrent_tasks import check_traffic
+from ..utils.metrics import sessions_rejected
 
 router = APIRouter(prefix = "/agent", tags = ["Agent"])
 
 @router.post("/run")
 async def run_agent_endpoint(request: Request, payload: AgentRequest, is_free: bool = Depends(check_traffic)):
     if not is_free:
+        sessions_rejected.labels(reason = "concurrency").inc()
         return { "type": "error", "data": { "message": "Too many concurrent tasks running. Please try again later." } }
 
     return await run_agent_stream(request, payload)
\ No newline at end of file
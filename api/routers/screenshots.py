@@ -0,0 +1,20 @@
+from fastapi import APIRouter, HTTPException, Request, Response
+from ..agent_core.cache.screenshots import screenshot_store
+
+router = APIRouter(prefix = "/agent/screenshots", tags = ["Agent"])
+
+@router.get("/{session}/{step}")
+async def get_screenshot(request: Request, session: str, step: int):
+    stored = await screenshot_store.get(session, step)
+    if stored is None:
+        raise HTTPException(status_code = 404, detail = "Screenshot not found or expired")
+
+    entry, data = stored
+    # A session step is captured once, the image never changes
+    headers = {
+        "ETag": f'"{entry.etag}"',
+        "Cache-Control": f"private, max-age={screenshot_store.ttl}, immutable",
+    }
+    if request.headers.get("If-None-Match") == headers["ETag"]:
+        return Response(status_code = 304, headers = headers)
+    return Response(content = data, media_type = entry.mime_type, headers = headers)
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from pydantic import BaseModel, Field
+from typing import Optional, Dict, Any, Literal
 
 class AgentRequest(BaseModel):
     uuid: str
@@ -7,8 +7,27 @@ class AgentRequest(BaseModel):
     scraper_schema: Optional[Dict[str, Any]] = None
     api_key: str
     wait_between_actions: int = 1
+    page_state_token_budget: Optional[int] = 6000
+    # Steps sent verbatim in the action history, older ones are summarized to stay within its budget
+    history_steps: int = Field(5, ge = 1)
+    history_token_budget: Optional[int] = Field(2000, ge = 200)
     max_tokens: int = 19334
     temperature: float = 0.4
     top_p: float = 1.0
     reasoning_effort: str = 'disable'
-    model: str = 'gemini-2.5-flash'
\ No newline at end of file
+    model: str = 'gemini-2.5-flash'
+    prefix_caching: bool = True
+    screenshot_format: Literal['png', 'jpeg', 'webp'] = 'jpeg'
+    screenshot_quality: int = Field(60, ge = 1, le = 100)
+    screenshot_max_width: Optional[int] = Field(1280, ge = 64)
+    screenshot_full_page: bool = False
+    screenshot_dedupe: bool = True
+    # Embed the screenshots in the stream instead of sending their URL
+    screenshot_inline: bool = False
+    # Stream a `timing` event for every latency span (LLM call, tool, settle, page state, screenshot)
+    timing_events: bool = False
+    # Session budgets, past any of them the agent stops and returns what it has so far
+    max_input_tokens: Optional[int] = Field(None, ge = 1)
+    max_output_tokens: Optional[int] = Field(None, ge = 1)
+    max_session_seconds: Optional[float] = Field(None, gt = 0)
+    max_llm_calls: Optional[int] = Field(None, ge = 1)
\ No newline at end of file
@@ -4,22 +4,23 @@ from ..schemas.agent import AgentRequest
 from ..agent_core.browser import Browser
 from ..agent_core.models.gemini import GeminiProvider
 from ..agent_core.agent.agent import Agent
-from ..utils.load_ws_endpoint import load_ws_endpoint
-from ..utils.update_ws_traffic import update_ws_traffic
-from ..utils.concurrent_tasks import add_session, remove_session
+from ..agent_core.browser.screenshot import ScreenshotOptions
+from ..agent_core.agent.budget import SessionBudget
+from ..agent_core.cache.screenshots import screenshot_store
+from ..utils.concurrent_tasks import start_session, end_session
+from ..utils.metrics import sessions_rejected, sessions_active, sessions_starting, count_stream_bytes
 import asyncio
 import json
 
 async def run_agent_stream(request: Request, payload: AgentRequest):
-    try:
-        ws_endpoint = load_ws_endpoint()
-        if ws_endpoint is None:
-            raise HTTPException(status_code = 503, detail="All browser instances are busy")
-
-        client_ip = request.headers.get("X-Forwarded-For") or request.client.host
-        add_session(ip = client_ip)
+    client_ip = request.headers.get("X-Forwarded-For") or request.client.host
+    lease = await start_session(ip = client_ip)
+    if lease is None:
+        sessions_rejected.labels(reason = "browsers_busy").inc()
+        raise HTTPException(status_code = 503, detail="All browser instances are busy")
 
-        browser = Browser(ws_endpoint = ws_endpoint)
+    try:
+        browser = Browser(ws_endpoint = lease.ws_endpoint)
 
         model = GeminiProvider(
             api_key = payload.api_key, 
@@ -27,21 +28,42 @@ async def run_agent_stream(request: Request, payload: AgentRequest):
             max_tokens = payload.max_tokens, 
             reasoning_effort = payload.reasoning_effort, 
             temperature = payload.temperature, 
-            top_p = payload.top_p
+            top_p = payload.top_p,
+            prefix_caching = payload.prefix_caching
         )
 
         agent = Agent(
             browser = browser, 
             model = model, 
-            scraper_response_json_format = payload.scraper_schema
+            scraper_response_json_format = payload.scraper_schema,
+            page_state_token_budget = payload.page_state_token_budget,
+            history_steps = payload.history_steps,
+            history_token_budget = payload.history_token_budget,
+            screenshot_options = ScreenshotOptions(
+                format = payload.screenshot_format,
+                quality = payload.screenshot_quality,
+                max_width = payload.screenshot_max_width,
+                full_page = payload.screenshot_full_page,
+                dedupe_distance = ScreenshotOptions.dedupe_distance if payload.screenshot_dedupe else None
+            ),
+            screenshot_store = None if payload.screenshot_inline else screenshot_store,
+            budget = SessionBudget(
+                max_input_tokens = payload.max_input_tokens,
+                max_output_tokens = payload.max_output_tokens,
+                max_seconds = payload.max_session_seconds,
+                max_llm_calls = payload.max_llm_calls
+            )
         )
 
-        update_ws_traffic(ws_endpoint, increment = True)
-
         async def event_stream():
+            sessions_active.inc()
             try:
                 yield f"{json.dumps({"type": "browser_init", "data": "Initializing browser..."}, ensure_ascii=False)}\n"
-                await browser.init_browser()
+                sessions_starting.inc()
+                try:
+                    await browser.init_browser()
+                finally:
+                    sessions_starting.dec()
                 yield f"{json.dumps({"type": "browser_init_done", "data": "Browser initialized"}, ensure_ascii=False)}\n"
 
                 yield f"{json.dumps({"type": "agent_start", "data": "Running agent..."}, ensure_ascii=False)}\n"
@@ -49,7 +71,8 @@ async def run_agent_stream(request: Request, payload: AgentRequest):
                     query = payload.prompt,
                     verbose = True,
                     wait_between_actions = payload.wait_between_actions,
-                    screenshot_each_step = True
+                    screenshot_each_step = True,
+                    timing_events = payload.timing_events
                 ):
                     if await request.is_disconnected():
                         yield f"{json.dumps({"type": "cancelled", "data": "Client disconnected"}, ensure_ascii=False)}\n"
@@ -62,11 +85,12 @@ async def run_agent_stream(request: Request, payload: AgentRequest):
             except Exception as e:
                 yield f"{json.dumps({"type": "error", "data": str(e)}, ensure_ascii=False)}\n"
             finally:
-                remove_session(client_ip)
-                update_ws_traffic(ws_endpoint, decrement=True)
+                sessions_active.dec()
+                await end_session(client_ip, lease)
                 print("Stream completed")
                 yield f"{json.dumps({"type": "done", "data": "Stream completed"}, ensure_ascii=False)}\n\n"
 
-        return StreamingResponse(event_stream(), media_type="text/event-stream")
+        return StreamingResponse(count_stream_bytes(event_stream()), media_type="text/event-stream")
     except Exception as e:
+         await end_session(client_ip, lease)
          raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
@@ -1,13 +1,80 @@
 from ..db.redis import redis
+from .ws_lease import WSEndpointLease, queue_acquire_ws_endpoint
 
-def add_session(ip: str):
+RUNNING_SESSIONS_KEY = "running-sessions"
+
+async def add_session(ip: str):
     try:
-        redis.sadd("running-sessions", ip)
+        await redis.sadd(RUNNING_SESSIONS_KEY, ip)
     except Exception as e:
         print(f"Error adding ip to running-sessions: {e}")
 
-def remove_session(ip: str):
+async def remove_session(ip: str):
+    try:
+        await redis.srem(RUNNING_SESSIONS_KEY, ip)
+    except Exception as e:
+        print(f"Error removing ip from running-sessions: {e}")
+
+async def start_session(ip: str) -> WSEndpointLease | None:
+    """
+    Reserves a browser slot and registers the session in a single round trip.
+
+    Returns:
+        WSEndpointLease | None: The lease, or None if every browser instance is busy
+    """
+
     try:
-        redis.srem("running-sessions", ip)
+        async with redis.pipeline(transaction = False) as pipe:
+            queue_acquire_ws_endpoint(pipe)
+            pipe.sadd(RUNNING_SESSIONS_KEY, ip)
+            # Errors are returned per command, a slot taken by the script must not be lost
+            acquired, registered = await pipe.execute(raise_on_error = False)
     except Exception as e:
-        print(f"Error removing ip from running-sessions: {e}")
\ No newline at end of file
+        print(f"Error starting session in Redis: {e}")
+        await remove_session(ip)
+        return None
+
+    if isinstance(acquired, Exception):
+        print(f"Error acquiring ws-endpoint lease from Redis: {acquired}")
+        await remove_session(ip)
+        return None
+
+    lease = WSEndpointLease.from_result(acquired)
+    if lease is None:
+        await remove_session(ip)
+        return None
+
+    if isinstance(registered, Exception):
+        print(f"Error adding ip to running-sessions: {registered}")
+        await lease.release()
+        return None
+    return lease
+
+async def end_session(ip: str, lease: WSEndpointLease) -> None:
+    """
+    Releases the browser slot and unregisters the session in a single round trip.
+    """
+
+    try:
+        async with redis.pipeline(transaction = False) as pipe:
+            queued = await lease.release(pipe = pipe)
+            pipe.srem(RUNNING_SESSIONS_KEY, ip)
+            results = await pipe.execute(raise_on_error = False)
+    except Exception as e:
+        print(f"Error ending session in Redis: {e}")
+        results = None
+
+    if results is None:
+        # Retried on its own, the lease is still held since the pipeline never ran
+        await lease.release()
+        await remove_session(ip)
+        return
+
+    if queued:
+        if isinstance(results[0], Exception):
+            print(f"Error releasing ws-endpoint lease in Redis: {results[0]}")
+            await lease.release()
+        else:
+            lease.released = True
+    if isinstance(results[-1], Exception):
+        print(f"Error removing ip from running-sessions: {results[-1]}")
@@ -0,0 +1,160 @@
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from ..core.config import settings
+from ..db.redis import redis
+from ..agent_core.tracing import Span, add_span_listener
+from ..agent_core.cache import scraper_cache
+from ..agent_core.cache.screenshots import screenshot_store
+from ..agent_core.models import PREFIX_CACHE_STATS
+from ..agent_core.workers import cpu_pool
+from .concurrent_tasks import RUNNING_SESSIONS_KEY
+from .ws_lease import WS_ENDPOINTS_KEY
+from typing import AsyncIterator
+import json
+
+registry = CollectorRegistry()
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+TOKEN_BUCKETS = (100, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000, 250000)
+
+browser_endpoint_sessions = Gauge(
+    'web_agent_browser_endpoint_sessions', 'Sessions leased on a browser endpoint', ['endpoint'], registry = registry
+)
+browser_endpoint_capacity = Gauge(
+    'web_agent_browser_endpoint_capacity', 'Sessions a browser endpoint accepts (BROWSER_POOL_SIZE)', registry = registry
+)
+browser_endpoint_utilization = Gauge(
+    'web_agent_browser_endpoint_utilization', 'Leased sessions over capacity of a browser endpoint', ['endpoint'], registry = registry
+)
+sessions_running = Gauge(
+    'web_agent_sessions_running', 'Sessions registered as running in Redis, across workers', registry = registry
+)
+sessions_concurrency_limit = Gauge(
+    'web_agent_sessions_concurrency_limit', 'MAX_CONCURRENT_TASKS', registry = registry
+)
+sessions_active = Gauge(
+    'web_agent_sessions_active', 'Sessions streaming in this worker', registry = registry
+)
+sessions_starting = Gauge(
+    'web_agent_sessions_starting', 'Sessions in this worker holding a browser lease and waiting for their browser context', registry = registry
+)
+sessions_rejected = Counter(
+    'web_agent_sessions_rejected', 'Rejected run requests', ['reason'], registry = registry
+)
+session_iterations = Histogram(
+    'web_agent_session_iterations', 'Iterations of a session', buckets = (1, 2, 5, 10, 20, 30, 50, 75, 100), registry = registry
+)
+session_duration = Histogram(
+    'web_agent_session_duration_seconds', 'Duration of a session', buckets = LATENCY_BUCKETS + (300, 600), registry = registry
+)
+llm_latency = Histogram(
+    'web_agent_llm_latency_seconds', 'Duration of a model call', ['model'], buckets = LATENCY_BUCKETS, registry = registry
+)
+llm_tokens = Histogram(
+    'web_agent_llm_tokens', 'Tokens of a model call', ['model', 'kind'], buckets = TOKEN_BUCKETS, registry = registry
+)
+tool_latency = Histogram(
+    'web_agent_tool_latency_seconds', 'Duration of a tool call', ['tool', 'status'], buckets = LATENCY_BUCKETS, registry = registry
+)
+page_settle = Histogram(
+    'web_agent_page_settle_seconds', 'Wait for the page to settle after a tool', ['settled'], buckets = LATENCY_BUCKETS, registry = registry
+)
+stream_bytes = Counter(
+    'web_agent_stream_bytes', 'Bytes sent on the agent run streams', registry = registry
+)
+
+def observe_span(span: Span) -> None:
+    """
+    Updates the per-session, LLM and tool metrics from the finished latency spans.
+    """
+
+    seconds = span.duration_ms / 1000
+    attributes = span.attributes
+    if span.name == 'llm.generate':
+        model = str(attributes.get('model', 'unknown'))
+        llm_latency.labels(model = model).observe(seconds)
+        for kind in ('prompt_tokens', 'completion_tokens', 'cached_tokens'):
+            if kind in attributes:
+                llm_tokens.labels(model = model, kind = kind.removesuffix('_tokens')).observe(attributes[kind])
+    elif span.name == 'tool.execute':
+        tool_latency.labels(tool = str(attributes.get('tool', 'unknown')), status = 'error' if span.error else 'ok').observe(seconds)
+    elif span.name == 'page.settle':
+        page_settle.labels(settled = str(bool(attributes.get('settled'))).lower()).observe(seconds)
+    elif span.name == 'agent.session':
+        session_duration.observe(seconds)
+        if 'iterations' in attributes:
+            session_iterations.observe(attributes['iterations'])
+
+add_span_listener(observe_span)
+
+class RuntimeCollector:
+    """
+    Reports the in-process caches and workers when scraped.
+    """
+
+    def collect(self):
+        cache = scraper_cache.stats
+        hits = CounterMetricFamily('web_agent_scraper_cache_hits', 'Scraper cache hits', labels = ['tier'])
+        hits.add_metric(['memory'], cache.hits - cache.backend_hits)
+        hits.add_metric(['backend'], cache.backend_hits)
+        yield hits
+        yield CounterMetricFamily('web_agent_scraper_cache_misses', 'Scraper cache misses', value = cache.misses)
+        yield GaugeMetricFamily('web_agent_scraper_cache_bytes', 'Size of the in-memory scraper cache', value = cache.bytes)
+
+        yield CounterMetricFamily('web_agent_prefix_cache_hits', 'Model calls which reused a cached prompt prefix', value = PREFIX_CACHE_STATS.hits)
+        yield CounterMetricFamily('web_agent_prefix_cache_misses', 'Model calls billed for the whole prompt prefix', value = PREFIX_CACHE_STATS.misses)
+        yield CounterMetricFamily('web_agent_prefix_cache_cached_tokens', 'Prompt tokens served from the prefix cache', value = PREFIX_CACHE_STATS.cached_tokens)
+
+        workers = GaugeMetricFamily('web_agent_cpu_workers', 'Jobs of the shared CPU workers', labels = ['pool', 'state'])
+        for pool, stats in (('threads', cpu_pool.thread_stats), ('processes', cpu_pool.process_stats)):
+            workers.add_metric([pool, 'queued'], stats.queued)
+            workers.add_metric([pool, 'running'], stats.running)
+        yield workers
+
+        store = screenshot_store.stats
+        yield GaugeMetricFamily('web_agent_screenshot_store_bytes', 'Size of the stored screenshots', value = store['bytes'])
+
+registry.register(RuntimeCollector())
+
+async def refresh_shared_metrics() -> None:
+    """
+    Reads the browser endpoint leases and running sessions shared by every worker from Redis.
+    """
+
+    browser_endpoint_capacity.set(settings.BROWSER_POOL_SIZE)
+    sessions_concurrency_limit.set(settings.MAX_CONCURRENT_TASKS)
+    try:
+        async with redis.pipeline(transaction = False) as pipe:
+            pipe.execute_command('JSON.GET', WS_ENDPOINTS_KEY, '$')
+            pipe.scard(RUNNING_SESSIONS_KEY)
+            raw_endpoints, running = await pipe.execute()
+    except Exception as e:
+        print(f"Error reading metrics from Redis: {e}")
+        return
+
+    sessions_running.set(running or 0)
+    endpoints = json.loads(raw_endpoints)[0] if raw_endpoints else {}
+    browser_endpoint_sessions.clear()
+    browser_endpoint_utilization.clear()
+    for key, endpoint in endpoints.items():
+        traffic = max(0, int(endpoint.get('traffic') or 0))
+        browser_endpoint_sessions.labels(endpoint = key).set(traffic)
+        browser_endpoint_utilization.labels(endpoint = key).set(traffic / settings.BROWSER_POOL_SIZE if settings.BROWSER_POOL_SIZE else 0)
+
+async def count_stream_bytes(stream: AsyncIterator[str]) -> AsyncIterator[str]:
+    """
+    Passes a text stream through, counting the bytes sent.
+    """
+
+    async for chunk in stream:
+        stream_bytes.inc(len(chunk.encode('utf-8')))
+        yield chunk
+
+async def render_metrics() -> tuple[bytes, str]:
+    """
+    Returns:
+        tuple[bytes, str]: The metrics in the Prometheus text format and its content type
+    """
+
+    await refresh_shared_metrics()
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,132 @@
+from ..core.config import settings
+from ..db.redis import redis
+from redis.asyncio.client import Pipeline
+
+WS_ENDPOINTS_KEY = "ws-endpoints"
+
+# Picks the least loaded endpoint which still has a free slot and increments its
+# traffic in the same script, so two concurrent requests can never be handed the
+# same last slot of a browser.
+# KEYS[1] = ws-endpoints json key, ARGV[1] = max connections per browser
+ACQUIRE_SCRIPT = """
+local raw = redis.call('JSON.GET', KEYS[1], '$')
+if not raw then
+    return nil
+end
+
+local ws_map = cjson.decode(raw)[1]
+local max_traffic = tonumber(ARGV[1])
+local best_key = nil
+local best_endpoint = nil
+local best_traffic = nil
+
+for key, val in pairs(ws_map) do
+    local traffic = tonumber(val['traffic']) or 0
+    if traffic >= 0 and traffic + 1 <= max_traffic and (best_traffic == nil or traffic < best_traffic) then
+        best_key = key
+        best_endpoint = val['ws_endpoint']
+        best_traffic = traffic
+    end
+end
+
+if best_key == nil then
+    return nil
+end
+
+redis.call('JSON.NUMINCRBY', KEYS[1], '$["' .. best_key .. '"].traffic', 1)
+return {best_key, best_endpoint}
+"""
+
+# Decrements the traffic of the leased endpoint, never going below zero.
+# KEYS[1] = ws-endpoints json key, ARGV[1] = endpoint key inside the json
+RELEASE_SCRIPT = """
+local path = '$["' .. ARGV[1] .. '"].traffic'
+local raw = redis.call('JSON.GET', KEYS[1], path)
+if not raw then
+    return 0
+end
+
+local traffic = tonumber(cjson.decode(raw)[1])
+if traffic == nil or traffic - 1 < 0 then
+    return 0
+end
+
+redis.call('JSON.NUMINCRBY', KEYS[1], path, -1)
+return 1
+"""
+
+class WSEndpointLease:
+    """
+    A slot on a browser instance, held for the lifetime of an agent session.
+
+    Attributes:
+        key (str): The key of the endpoint inside the `ws-endpoints` json
+        ws_endpoint (str): The websocket endpoint of the browser instance
+        released (bool): Whether the slot has already been given back
+    """
+
+    def __init__(self, key: str, ws_endpoint: str) -> None:
+        self.key = key
+        self.ws_endpoint = ws_endpoint
+        self.released = False
+
+    @classmethod
+    def from_result(cls, result: list | None) -> "WSEndpointLease | None":
+        """
+        Builds a lease from the raw reply of the acquire script.
+        """
+
+        if not result:
+            return None
+
+        key, ws_endpoint = result
+        return cls(key = key, ws_endpoint = ws_endpoint)
+
+    async def release(self, pipe: Pipeline | None = None) -> bool:
+        """
+        Gives the slot back to the pool. Safe to call more than once, and to retry
+        after a failure: the lease only counts as released once Redis ran the release.
+
+        Args:
+            pipe (Pipeline | None): If given, the release is only queued on the pipeline
+                and is sent when the caller executes it. The caller then sets `released`
+                once the pipeline executed without an error for it.
+        """
+
+        if self.released:
+            return False
+
+        if pipe is not None:
+            pipe.eval(RELEASE_SCRIPT, 1, WS_ENDPOINTS_KEY, self.key)
+            return True
+
+        try:
+            result = await redis.eval(RELEASE_SCRIPT, 1, WS_ENDPOINTS_KEY, self.key)
+        except Exception as e:
+            print(f"Error releasing ws-endpoint lease in Redis: {e}")
+            return False
+        self.released = True
+        return bool(result)
+
+def queue_acquire_ws_endpoint(pipe: Pipeline) -> None:
+    """
+    Queues the acquire script on a pipeline, its reply can be turned into a lease
+    with `WSEndpointLease.from_result`.
+    """
+
+    pipe.eval(ACQUIRE_SCRIPT, 1, WS_ENDPOINTS_KEY, settings.BROWSER_POOL_SIZE)
+
+async def acquire_ws_endpoint() -> WSEndpointLease | None:
+    """
+    Atomically selects the least loaded browser instance and reserves a slot on it.
+
+    Returns:
+        WSEndpointLease | None: The lease, or None if every browser is at BROWSER_POOL_SIZE
+    """
+
+    try:
+        result = await redis.eval(ACQUIRE_SCRIPT, 1, WS_ENDPOINTS_KEY, settings.BROWSER_POOL_SIZE)
+        return WSEndpointLease.from_result(result)
+    except Exception as e:
+        print(f"Error acquiring ws-endpoint lease from Redis: {e}")
+        return None
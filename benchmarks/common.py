@@ -0,0 +1,55 @@
+"""
+Shared helpers for the benchmark scripts: launching a local Chromium and serving
+fixture pages over a local HTTP server.
+"""
+from playwright.async_api import Browser, Playwright
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+from contextlib import contextmanager
+from functools import partial
+from typing import Iterator
+import os
+import statistics
+import tempfile
+import threading
+
+VIEWPORT = {'width': 1920, 'height': 1080}
+
+async def launch_browser(playwright: Playwright) -> Browser:
+    """
+    Launches a local headless Chromium, CHROMIUM_EXECUTABLE overrides the bundled build.
+    """
+
+    return await playwright.chromium.launch(executable_path = os.getenv("CHROMIUM_EXECUTABLE"))
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args) -> None:
+        pass
+
+@contextmanager
+def serve_fixtures(pages: dict[str, str]) -> Iterator[str]:
+    """
+    Writes the given pages into a temporary directory and serves it on localhost.
+
+    Args:
+        pages (dict[str, str]): File name -> HTML
+
+    Yields:
+        str: The base URL of the server
+    """
+
+    with tempfile.TemporaryDirectory() as directory:
+        for name, html in pages.items():
+            with open(os.path.join(directory, name), "w", encoding = "utf-8") as f:
+                f.write(html)
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), partial(QuietHandler, directory = directory))
+        thread = threading.Thread(target = server.serve_forever, daemon = True)
+        thread.start()
+        try:
+            yield f"http://127.0.0.1:{server.server_address[1]}"
+        finally:
+            server.shutdown()
+            server.server_close()
+
+def median_ms(timings: list[float]) -> float:
+    return statistics.median(timings) * 1000
@@ -0,0 +1,154 @@
+"""
+Offline benchmark of page observation as pages grow: `DOM.get_state` (full and
+incremental), `DOM.format_elements_for_prompt` and `ScraperTool.run`, on generated
+fixtures (long tables, infinite lists, deep nesting, shadow-heavy markup) served
+from a local HTTP server to a locally launched Chromium.
+
+The scraper runs against a canned model, so its timing only covers the page
+work (pulling the html and converting it to markdown), not the LLM call.
+
+Usage:
+    python -m benchmarks.dom_extraction [--fixtures long_table shadow_heavy]
+        [--sizes 1000 10000 50000] [--runs 5] [--scrolls 3] [--json results.json]
+
+Set CHROMIUM_EXECUTABLE to use a specific Chromium build.
+"""
+from playwright.async_api import Page, async_playwright
+from api.agent_core.dom import DOM, CATEGORIES
+from api.agent_core.models import BaseModel
+from api.agent_core.tools.scraper import ScraperTool, ScraperArgs
+from .common import VIEWPORT, launch_browser, serve_fixtures, median_ms
+from .fixtures import FIXTURES
+from types import SimpleNamespace
+import argparse
+import asyncio
+import json
+import time
+
+class CannedModel(BaseModel):
+    """
+    Stand-in model which answers instantly and remembers the size of what it was sent.
+    """
+
+    def __init__(self) -> None:
+        self._messages = []
+        self.last_prompt_chars = 0
+
+    @property
+    def messages(self) -> list:
+        return self._messages
+
+    @messages.setter
+    def messages(self, messages: list):
+        self._messages = messages
+
+    def add_message(self, message):
+        self._messages.append(message)
+
+    async def generate(self):
+        self.last_prompt_chars = sum(len(message['content']) for message in self._messages)
+        return SimpleNamespace(choices = [SimpleNamespace(message = SimpleNamespace(content = '{"response": "ok"}'))])
+
+    def configure(self, **kwargs):
+        pass
+
+async def timed(call) -> tuple[float, object]:
+    start = time.perf_counter()
+    result = await call()
+    return time.perf_counter() - start, result
+
+async def measure_dom(page: Page, runs: int) -> dict:
+    dom = DOM(page = page, incremental = False)
+    timings, state = [], None
+    for _ in range(runs):
+        elapsed, state = await timed(dom.get_state)
+        timings.append(elapsed)
+    if isinstance(state, Exception):
+        raise state
+
+    format_timings, prompt_chars = [], 0
+    for _ in range(runs):
+        start = time.perf_counter()
+        prompt_chars = sum(len(dom.format_elements_for_prompt(state[category])) for category in CATEGORIES)
+        format_timings.append(time.perf_counter() - start)
+    compact_chars = sum(len(dom.format_elements_for_prompt(state[category], compact = True)) for category in CATEGORIES)
+
+    incremental = DOM(page = page)
+    full_elapsed, _ = await timed(incremental.get_state)
+    delta_timings = []
+    for _ in range(runs):
+        elapsed, _ = await timed(incremental.get_state)
+        delta_timings.append(elapsed)
+
+    return {
+        'get_state_ms': median_ms(timings),
+        'incremental_first_ms': full_elapsed * 1000,
+        'incremental_unchanged_ms': median_ms(delta_timings),
+        'elements': sum(len(state[category]) for category in CATEGORIES),
+        'payload_bytes': len(json.dumps(state, ensure_ascii = False).encode('utf-8')),
+        'format_ms': median_ms(format_timings),
+        'prompt_chars': prompt_chars,
+        'compact_chars': compact_chars,
+    }
+
+async def measure_scraper(page: Page, runs: int) -> dict:
+    timings, markdown_chars = [], 0
+    for _ in range(runs):
+        model = CannedModel()
+        tool = ScraperTool(page = page, dom = DOM(page = page), model = model, scraper_response_json_format = None)
+        elapsed, _ = await timed(lambda: tool.run(ScraperArgs(user_input = 'List every item on the page')))
+        timings.append(elapsed)
+        markdown_chars = model.last_prompt_chars
+    return {'scraper_ms': median_ms(timings), 'scraper_prompt_chars': markdown_chars}
+
+async def main(fixtures: list[str], sizes: list[int], runs: int, scrolls: int, json_path: str | None) -> None:
+    pages = {f"{name}_{size}.html": FIXTURES[name](size) for name in fixtures for size in sizes}
+    results = []
+
+    with serve_fixtures(pages) as base_url:
+        async with async_playwright() as playwright:
+            browser = await launch_browser(playwright)
+            header = (f"{'fixture':<14} {'size':>7} {'nodes':>7} {'get_state':>10} {'incr 1st':>9} {'incr =':>8} "
+                      f"{'elements':>9} {'payload B':>10} {'format':>8} {'prompt ch':>10} {'compact ch':>11} {'scraper':>9} {'scrape ch':>10}")
+            print(header)
+
+            for name in fixtures:
+                for size in sizes:
+                    context = await browser.new_context(viewport = VIEWPORT)
+                    page = await context.new_page()
+                    await page.goto(f"{base_url}/{name}_{size}.html", wait_until = "load")
+
+                    if name == 'infinite_list':
+                        for _ in range(scrolls):
+                            await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+                            await page.wait_for_timeout(50)
+
+                    row = {
+                        'fixture': name,
+                        'size': size,
+                        'nodes': await page.evaluate("document.getElementsByTagName('*').length"),
+                        **await measure_dom(page, runs),
+                        **await measure_scraper(page, runs),
+                    }
+                    results.append(row)
+                    print(f"{name:<14} {size:>7} {row['nodes']:>7} {row['get_state_ms']:>8.1f}ms {row['incremental_first_ms']:>7.1f}ms "
+                          f"{row['incremental_unchanged_ms']:>6.1f}ms {row['elements']:>9} {row['payload_bytes']:>10} "
+                          f"{row['format_ms']:>6.1f}ms {row['prompt_chars']:>10} {row['compact_chars']:>11} {row['scraper_ms']:>7.1f}ms {row['scraper_prompt_chars']:>10}")
+                    await context.close()
+
+            await browser.close()
+
+    if json_path:
+        with open(json_path, "w", encoding = "utf-8") as f:
+            json.dump(results, f, indent = 4)
+        print(f"Results written to {json_path}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fixtures", nargs = "+", choices = list(FIXTURES), default = list(FIXTURES))
+    parser.add_argument("--sizes", type = int, nargs = "+", default = [1000, 10000, 50000])
+    parser.add_argument("--runs", type = int, default = 5)
+    parser.add_argument("--scrolls", type = int, default = 3, help = "Bottom-of-page scrolls for infinite_list")
+    parser.add_argument("--json", dest = "json_path", default = None, help = "Also write the results as JSON")
+    args = parser.parse_args()
+    asyncio.run(main(args.fixtures, args.sizes, args.runs, args.scrolls, args.json_path))
@@ -0,0 +1,82 @@
+"""
+Shows how `getElements` scales with the size of the page, with the viewport at the
+top and at the bottom of a long list. At the bottom every visible item has tens of
+thousands of previous siblings, which is where the old per-element `getXPath`
+walk was quadratic; its cost for the same visible items is reported alongside.
+
+Usage:
+    python -m benchmarks.dom_scaling [--sizes 10000 20000 50000 100000] [--runs 5]
+
+Set CHROMIUM_EXECUTABLE to use a specific Chromium build.
+"""
+from playwright.async_api import async_playwright
+from api.agent_core.dom import DOM_SCRIPT
+from .common import VIEWPORT, launch_browser
+import argparse
+import asyncio
+import statistics
+
+# Each list item is <li><a/><span/></li>, so a list of n items is ~3n nodes
+NODES_PER_ITEM = 3
+
+TIME_GET_ELEMENTS = """async () => {
+    const start = performance.now();
+    const result = await getElements();
+    return [performance.now() - start, result.interactiveElements.length + result.informativeElements.length];
+}"""
+
+# Old XPath cost: getXPath for every list item currently in the viewport
+TIME_LEGACY_XPATH = """() => {
+    const visible = Array.from(document.querySelectorAll('li')).filter(el => {
+        const rect = el.getBoundingClientRect();
+        return rect.bottom >= 0 && rect.top <= window.innerHeight;
+    });
+    const start = performance.now();
+    for (const el of visible) {
+        getXPath(el);
+        for (const child of el.children) getXPath(child);
+    }
+    return performance.now() - start;
+}"""
+
+def build_page(nodes: int) -> str:
+    items = "".join(
+        f'<li><a href="/item/{i}">Item {i}</a><span>detail {i}</span></li>'
+        for i in range(nodes // NODES_PER_ITEM)
+    )
+    return f"<html><body><h1>List</h1><ul>{items}</ul></body></html>"
+
+async def measure(page, runs: int) -> tuple[float, int, float]:
+    timings, legacy = [], []
+    count = 0
+    for _ in range(runs):
+        elapsed, count = await page.evaluate(TIME_GET_ELEMENTS)
+        timings.append(elapsed)
+        legacy.append(await page.evaluate(TIME_LEGACY_XPATH))
+    return statistics.median(timings), count, statistics.median(legacy)
+
+async def main(sizes: list[int], runs: int) -> None:
+    async with async_playwright() as playwright:
+        browser = await launch_browser(playwright)
+        print(f"{'nodes':>8} {'position':>8} {'getElements ms':>15} {'ms / 1k nodes':>14} {'elements':>9} {'legacy xpath ms':>16}")
+        for size in sizes:
+            # Fresh page per size, the script's top-level declarations cannot be added twice
+            page = await browser.new_page(viewport = VIEWPORT)
+            await page.set_content(build_page(size))
+            await page.add_script_tag(content = DOM_SCRIPT)
+            node_count = await page.evaluate("document.getElementsByTagName('*').length")
+
+            for position, scroll in (("top", "window.scrollTo(0, 0)"), ("bottom", "window.scrollTo(0, document.body.scrollHeight)")):
+                await page.evaluate(scroll)
+                elapsed, count, legacy = await measure(page, runs)
+                print(f"{node_count:>8} {position:>8} {elapsed:>15.1f} {elapsed / node_count * 1000:>14.2f} {count:>9} {legacy:>16.1f}")
+            await page.close()
+
+        await browser.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type = int, nargs = "+", default = [10000, 20000, 50000, 100000])
+    parser.add_argument("--runs", type = int, default = 5)
+    args = parser.parse_args()
+    asyncio.run(main(args.sizes, args.runs))
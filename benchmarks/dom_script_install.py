@@ -0,0 +1,60 @@
+"""
+Measures the per-observation cost of re-sending `script.js` through `page.evaluate`
+(previous behaviour of `DOM.get_state`) against calling the pre-installed helper.
+
+Usage:
+    python -m benchmarks.dom_script_install [--rows 5000] [--runs 20]
+
+Set CHROMIUM_EXECUTABLE to use a specific Chromium build.
+"""
+from playwright.async_api import async_playwright
+from api.agent_core.dom import DOM, DOM_SCRIPT
+from .common import VIEWPORT, launch_browser
+import argparse
+import asyncio
+import statistics
+import time
+
+def build_page(rows: int) -> str:
+    items = "\n".join(
+        f'<tr><td><a href="/item/{i}">Item {i}</a></td><td><p>Description of item {i}</p></td>'
+        f'<td><button data-id="{i}">Buy</button></td></tr>'
+        for i in range(rows)
+    )
+    return f"<html><body><h1>Large page</h1><table><tbody>{items}</tbody></table></body></html>"
+
+async def time_runs(runs: int, call) -> list[float]:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        await call()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+def report(label: str, timings: list[float]) -> None:
+    print(f"{label:<12} median {statistics.median(timings):8.1f} ms   min {min(timings):8.1f} ms   max {max(timings):8.1f} ms")
+
+async def main(rows: int, runs: int) -> None:
+    async with async_playwright() as playwright:
+        browser = await launch_browser(playwright)
+        page = await browser.new_page(viewport = VIEWPORT)
+        await page.set_content(build_page(rows))
+
+        dom = DOM(page = page)
+        await dom.install()
+
+        before = await time_runs(runs, lambda: page.evaluate(f"""{DOM_SCRIPT}\ngetElements()"""))
+        after = await time_runs(runs, lambda: dom._evaluate_elements(['interactiveElements', 'informativeElements', 'scrollableElements']))
+
+        node_count = await page.evaluate("document.getElementsByTagName('*').length")
+        print(f"Rows: {rows}, DOM nodes: {node_count}, script: {len(DOM_SCRIPT)} bytes")
+        report("re-send", before)
+        report("installed", after)
+        await browser.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type = int, default = 5000)
+    parser.add_argument("--runs", type = int, default = 20)
+    args = parser.parse_args()
+    asyncio.run(main(args.rows, args.runs))
@@ -0,0 +1,90 @@
+"""
+Generated HTML fixtures for the DOM benchmarks. Every generator takes the rough
+number of element nodes wanted and returns a standalone page, so the same page
+shape can be measured as it grows.
+"""
+
+def long_table(nodes: int) -> str:
+    # tr + 4 td + a + p + button
+    rows = max(1, nodes // 8)
+    body = "".join(
+        f'<tr><td><a href="/row/{i}">Row {i}</a></td><td>{i * 7 % 1000}</td>'
+        f'<td><p>Description of row {i}</p></td><td><button data-id="{i}">Select</button></td></tr>'
+        for i in range(rows)
+    )
+    return (
+        "<html><body><h1>Long table</h1>"
+        "<table><thead><tr><th>Name</th><th>Value</th><th>Description</th><th>Action</th></tr></thead>"
+        f"<tbody>{body}</tbody></table></body></html>"
+    )
+
+def infinite_list(nodes: int, batch: int = 50) -> str:
+    """
+    A list which appends `batch` items every time the bottom is reached.
+    """
+
+    # li + a + span
+    items = max(1, nodes // 3)
+    initial = "".join(
+        f'<li class="card"><a href="/post/{i}">Post {i}</a><span>by user {i % 97}</span></li>'
+        for i in range(items)
+    )
+    return f"""<html><body><h1>Feed</h1><ul id="feed">{initial}</ul>
+<script>
+let next = {items};
+window.addEventListener('scroll', () => {{
+    if (window.innerHeight + window.scrollY < document.body.scrollHeight - 10) return;
+    const feed = document.getElementById('feed');
+    for (let i = 0; i < {batch}; i++, next++) {{
+        const li = document.createElement('li');
+        li.className = 'card';
+        li.innerHTML = `<a href="/post/${{next}}">Post ${{next}}</a><span>by user ${{next % 97}}</span>`;
+        feed.appendChild(li);
+    }}
+}});
+</script></body></html>"""
+
+def deep_nesting(nodes: int, depth: int = 200) -> str:
+    """
+    Branches of `depth` nested divs, each level with a link and a paragraph.
+    Chromium's parser caps nesting at 512 levels, so size grows with the branches.
+    """
+
+    # div + p + a per level
+    breadth = max(1, nodes // (3 * depth))
+
+    def branch(index: int) -> str:
+        opening = "".join(
+            f'<div class="level-{level}"><p>Level {level} of branch {index}</p><a href="/b/{index}/{level}">Open {level}</a>'
+            for level in range(depth)
+        )
+        return opening + "</div>" * depth
+
+    return f"<html><body><h1>Deep nesting</h1>{''.join(branch(i) for i in range(breadth))}</body></html>"
+
+def shadow_heavy(nodes: int) -> str:
+    """
+    Custom elements, each rendering its content inside an open shadow root.
+    """
+
+    # host + div + h3 + p + button + a
+    components = max(1, nodes // 6)
+    hosts = "".join(f'<product-card data-index="{i}"></product-card>' for i in range(components))
+    return f"""<html><body><h1>Shadow DOM</h1><section>{hosts}</section>
+<script>
+customElements.define('product-card', class extends HTMLElement {{
+    connectedCallback() {{
+        const index = this.dataset.index;
+        this.attachShadow({{ mode: 'open' }}).innerHTML =
+            `<div class="card"><h3>Product ${{index}}</h3><p>Price ${{index * 3}} USD</p>` +
+            `<button aria-label="Add product ${{index}}">Add to cart</button><a href="/p/${{index}}">Details</a></div>`;
+    }}
+}});
+</script></body></html>"""
+
+FIXTURES = {
+    'long_table': long_table,
+    'infinite_list': infinite_list,
+    'deep_nesting': deep_nesting,
+    'shadow_heavy': shadow_heavy,
+}
@@ -0,0 +1,60 @@
+"""
+Compares `api.agent_core.dom.markdown.html_to_markdown` with `markdownify` (what
+`ScraperTool` used before) on the generated fixtures: conversion time and how close
+the outputs are. Both converters get the same HTML with the non-content elements
+removed, as markdownify would keep the text of the ones it is told to strip.
+
+No browser is needed, the fixture HTML is converted directly.
+
+Usage:
+    python -m benchmarks.markdown_conversion [--fixtures long_table deep_nesting]
+        [--sizes 1000 10000 50000] [--runs 5]
+"""
+from api.agent_core.dom.markdown import SKIPPED_ELEMENTS, etree, html_to_markdown
+from markdownify import markdownify
+from .common import median_ms
+from .fixtures import FIXTURES
+import argparse
+import difflib
+import re
+import time
+
+def remove_skipped(html: str) -> str:
+    for tag in SKIPPED_ELEMENTS:
+        html = re.sub(rf'<{tag}\b.*?</{tag}>', '', html, flags = re.DOTALL | re.IGNORECASE)
+    return html
+
+def body(html: str) -> str:
+    match = re.search(r'<body[^>]*>(.*)</body>', html, flags = re.DOTALL | re.IGNORECASE)
+    return match.group(1) if match else html
+
+def time_runs(runs: int, convert, html: str) -> tuple[float, str]:
+    timings, result = [], ''
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = convert(html)
+        timings.append(time.perf_counter() - start)
+    return median_ms(timings), result
+
+def similarity(a: str, b: str) -> float:
+    # Line based, character ratios are quadratic on large outputs
+    return difflib.SequenceMatcher(None, a.splitlines(), b.splitlines(), autojunk = False).ratio()
+
+def main(fixtures: list[str], sizes: list[int], runs: int) -> None:
+    print(f"Parser: {'lxml' if etree is not None else 'html.parser'}")
+    print(f"{'fixture':<14} {'size':>7} {'html KB':>8} {'markdownify':>12} {'streaming':>10} {'speedup':>8} {'identical':>10} {'similarity':>11}")
+    for name in fixtures:
+        for size in sizes:
+            html = body(remove_skipped(FIXTURES[name](size)))
+            before, expected = time_runs(runs, markdownify, html)
+            after, actual = time_runs(runs, html_to_markdown, html)
+            print(f"{name:<14} {size:>7} {len(html) / 1024:>8.0f} {before:>10.1f}ms {after:>8.1f}ms {before / after:>7.1f}x "
+                  f"{str(expected == actual):>10} {similarity(expected, actual):>11.4f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fixtures", nargs = "+", choices = list(FIXTURES), default = list(FIXTURES))
+    parser.add_argument("--sizes", type = int, nargs = "+", default = [1000, 10000, 50000])
+    parser.add_argument("--runs", type = int, default = 5)
+    args = parser.parse_args()
+    main(args.fixtures, args.sizes, args.runs)
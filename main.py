@@ -1,12 +1,23 @@
-from fastapi import FastAPI, Depends
+from fastapi import FastAPI, Depends, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi_limiter import FastAPILimiter
 from fastapi_limiter.depends import RateLimiter
 from api.routers.agent import router as agent_router
+from api.routers.screenshots import router as screenshots_router
 from contextlib import asynccontextmanager
 from api.core.config import settings
 from api.utils.cold_start import wait_for_browser
-import redis.asyncio as redis
+from api.db.redis import redis
+from api.agent_core.browser.manager import browser_manager
+from api.agent_core.browser.pool import context_pool
+from api.agent_core.agent.executor import preload as preload_agent
+from api.agent_core.cache import scraper_cache
+from api.agent_core.cache.backends import RedisCacheBackend, DiskCacheBackend
+from api.agent_core.cache.screenshots import screenshot_store
+from api.agent_core.tools.scraper import ScraperTool
+from api.agent_core.workers import cpu_pool
+from api.agent_core.tracing import set_trace_exporter, OTLPFileExporter, OTLPHttpExporter
+from api.utils.metrics import render_metrics
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import asyncio, time, requests, httpx
 from dotenv import load_dotenv
@@ -14,16 +25,41 @@ load_dotenv()
 
 @asynccontextmanager
 async def lifespan(_app: FastAPI):
-    redis_connection = redis.from_url(settings.UPSTASH_REDIS_TCP_URL)
-    await FastAPILimiter.init(redis_connection)
+    await FastAPILimiter.init(redis)
     print("Redis connected for rate limiter")
+    context_pool.size = settings.BROWSER_CONTEXT_POOL_SIZE
+    context_pool.max_idle = settings.BROWSER_CONTEXT_MAX_IDLE
+    preload_agent()
+
+    scraper_cache.ttl = settings.SCRAPER_CACHE_TTL
+    scraper_cache.max_entries = settings.SCRAPER_CACHE_MAX_ENTRIES
+    scraper_cache.max_bytes = settings.SCRAPER_CACHE_MAX_BYTES
+    if settings.SCRAPER_CACHE_BACKEND == 'redis':
+        scraper_cache.backend = RedisCacheBackend(redis)
+    elif settings.SCRAPER_CACHE_BACKEND == 'disk':
+        scraper_cache.backend = DiskCacheBackend(settings.SCRAPER_CACHE_DIR)
+    ScraperTool.chunk_chars = settings.SCRAPER_CHUNK_CHARS
+    ScraperTool.max_concurrency = settings.SCRAPER_MAX_CONCURRENCY
+    cpu_pool.thread_workers = settings.CPU_THREAD_WORKERS
+    cpu_pool.process_workers = settings.CPU_PROCESS_WORKERS
+    screenshot_store.ttl = settings.SCREENSHOT_STORE_TTL
+    screenshot_store.max_bytes = settings.SCREENSHOT_STORE_MAX_BYTES
+    screenshot_store.directory = settings.SCREENSHOT_STORE_DIR
+    if settings.TRACE_EXPORT == 'file':
+        set_trace_exporter(OTLPFileExporter(settings.TRACE_FILE))
+    elif settings.TRACE_EXPORT == 'otlp':
+        set_trace_exporter(OTLPHttpExporter(settings.TRACE_OTLP_ENDPOINT))
     
     yield
     
-    await redis_connection.close()
+    await redis.aclose()
     print("Redis disconnected")
     await FastAPILimiter.close()
     print("Rate limiter disconnected")
+    await context_pool.close()
+    await browser_manager.close()
+    print("Browser connections closed")
+    cpu_pool.close()
 
 app = FastAPI(
     title = "Dumb Web Agent - Browser Autonomous AI Agent Backend",
@@ -48,11 +84,27 @@ app.include_router(
     ))]
 )
 
+# Fetched once per step screenshot, not rate limited like the runs
+app.include_router(screenshots_router)
+
 BROWSER_INSTANCE_URLS = [
     'https://playwright-browser-instance.onrender.com/',
     # 'https://playwright-browser-instance-1.onrender.com/'
 ]
 
+@app.get("/stats/scraper-cache")
+async def scraper_cache_stats():
+    return scraper_cache.stats.to_dict()
+
+@app.get("/stats/workers")
+async def worker_stats():
+    return cpu_pool.stats
+
+@app.get("/metrics")
+async def metrics():
+    content, content_type = await render_metrics()
+    return Response(content = content, media_type = content_type)
+
 @app.get("/")
 async def root():
     results = {}